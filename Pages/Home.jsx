@@ -32,7 +32,7 @@ export default function Home() {
 
       // Validação com o backend usando o modelo selecionado
       const analysis = await apiClient.documents.validate({
-        texto_extraido: uploadResult.texto_extraido,
+        document_id: uploadResult.document_id,
         modelo_id: selectedModel || 'default',
       });
 
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark da extração de texto de DOCX
+
+Uso:
+    python benchmark_docx.py pasta_ou_arquivos.docx [...]
+
+Compara o python-docx (modelo de objetos completo, só parágrafos do corpo)
+com a leitura direta do OOXML. Cada extrator roda num processo separado para
+que o pico de memória (RSS) medido seja só dele. Requer Linux/macOS.
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+# Permite importar o pacote src a partir da raiz do backend
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python_docx(path):
+    import docx
+    d = docx.Document(path)
+    return "\n".join([p.text for p in d.paragraphs])
+
+
+def _ooxml(path):
+    from src.services.docx_extractor import extract_text_docx_xml
+    return extract_text_docx_xml(path)
+
+
+EXTRATORES = {
+    "python-docx": _python_docx,
+    "ooxml": _ooxml,
+}
+
+
+def _run(nome, arquivos, queue):
+    """Extrai todos os arquivos com um extrator (executa no processo filho)"""
+    extrator = EXTRATORES[nome]
+    caracteres = 0
+    inicio = time.perf_counter()
+    for arquivo in arquivos:
+        caracteres += len(extrator(arquivo))
+    tempo = time.perf_counter() - inicio
+    # ru_maxrss: KB no Linux, bytes no macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        maxrss //= 1024
+    queue.put((caracteres, tempo, maxrss))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da extração de DOCX")
+    parser.add_argument("paths", nargs="+", help="DOCX ou pastas com DOCX")
+    args = parser.parse_args()
+
+    arquivos = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            arquivos.extend(sorted(glob.glob(os.path.join(path, "**", "*.docx"), recursive=True)))
+        else:
+            arquivos.append(path)
+    print(f"📄 {len(arquivos)} arquivos\n")
+
+    ctx = multiprocessing.get_context("spawn")
+    for nome in EXTRATORES:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(nome, arquivos, queue))
+        proc.start()
+        caracteres, tempo, maxrss = queue.get()
+        proc.join()
+        print(f"{nome:12s} {caracteres:10d} caracteres  {tempo:8.2f}s  pico RSS {maxrss / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark do OCR de PDFs escaneados
+
+Uso:
+    python benchmark_ocr.py arquivo.pdf [--paginas 20] [--concorrencia 1 4 16]
+
+Compara o caminho antigo (pytesseract, um processo do Tesseract por página e
+get_languages() por documento) com o motor de workers persistentes, e mede
+páginas/s com vários uploads simultâneos disputando o orçamento de CPU.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Permite importar o pacote src a partir da raiz do backend
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _render(pdf_path, paginas, tmp_dir):
+    """Rasteriza as páginas uma única vez, fora da medição"""
+    from pdf2image import convert_from_path
+    from src.services.ocr_service import OCR_DPI
+    return sorted(convert_from_path(
+        pdf_path, dpi=OCR_DPI, last_page=paginas, grayscale=True,
+        output_folder=tmp_dir, paths_only=True,
+    ))
+
+
+def bench_pytesseract(image_paths):
+    """Caminho antigo: get_languages() + um subprocesso por página"""
+    import pytesseract
+    inicio = time.perf_counter()
+    langs = pytesseract.get_languages()
+    lang = 'por+eng' if 'por' in langs else 'eng'
+    for image_path in image_paths:
+        pytesseract.image_to_string(image_path, lang=lang)
+    return time.perf_counter() - inicio
+
+
+def bench_engine(image_paths, workers):
+    """Motor com workers persistentes (modelos carregados antes da medição)"""
+    from src.services.ocr_engine import OCREngine, TESSEROCR_AVAILABLE
+    engine = OCREngine(workers=workers)
+    engine.start()
+    try:
+        inicio = time.perf_counter()
+        engine.ocr_pages(image_paths)
+        return time.perf_counter() - inicio, TESSEROCR_AVAILABLE
+    finally:
+        engine.shutdown()
+
+
+def bench_concurrency(image_paths, uploads):
+    """
+    Simula `uploads` extrações simultâneas, cada uma com todas as páginas,
+    compartilhando o mesmo motor (e portanto o mesmo orçamento de CPU)
+    """
+    from src.services.ocr_engine import OCREngine
+    engine = OCREngine()
+    engine.start()
+    try:
+        threads = [
+            threading.Thread(target=engine.ocr_pages, args=(image_paths,))
+            for _ in range(uploads)
+        ]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - inicio
+    finally:
+        engine.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do OCR")
+    parser.add_argument("pdf", help="PDF escaneado usado no teste")
+    parser.add_argument("--paginas", type=int, default=20, help="Número máximo de páginas")
+    parser.add_argument("--concorrencia", type=int, nargs="*", default=[1, 4, 16],
+                        help="Números de uploads simultâneos a medir")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_ocr_") as tmp_dir:
+        image_paths = _render(args.pdf, args.paginas, tmp_dir)
+        n = len(image_paths)
+        print(f"📄 {n} páginas rasterizadas\n")
+
+        t = bench_pytesseract(image_paths)
+        print(f"pytesseract sequencial       : {t:8.2f}s  {n / t:6.2f} páginas/s")
+
+        for workers in sorted({1, os.cpu_count() or 1}):
+            t, tesserocr_ok = bench_engine(image_paths, workers)
+            backend = "tesserocr" if tesserocr_ok else "pytesseract"
+            print(f"motor persistente ({backend}, {workers} workers): {t:8.2f}s  {n / t:6.2f} páginas/s")
+
+        print()
+        for uploads in args.concorrencia:
+            t = bench_concurrency(image_paths, uploads)
+            total = n * uploads
+            print(f"{uploads:3d} uploads simultâneos: {t:8.2f}s  {total / t:6.2f} páginas/s")
+
+
+if __name__ == "__main__":
+    main()
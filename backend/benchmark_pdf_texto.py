@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos extratores da camada de texto de PDFs
+
+Uso:
+    python benchmark_pdf_texto.py pasta_ou_arquivos.pdf [...]
+
+Cada backend roda num processo separado para que o pico de memória (RSS)
+medido seja só dele. Mostra tempo por página e pico de RSS por backend.
+Requer Linux/macOS (módulo resource).
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+# Permite importar o pacote src a partir da raiz do backend
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_backend(nome, arquivos, queue):
+    """Extrai todos os arquivos com um backend (executa no processo filho)"""
+    from src.services.pdf_text_extractors import get_text_extractor
+    extractor = get_text_extractor(nome)
+    paginas = 0
+    inicio = time.perf_counter()
+    for arquivo in arquivos:
+        for _ in extractor.iter_pages(arquivo):
+            paginas += 1
+    tempo = time.perf_counter() - inicio
+    # ru_maxrss: KB no Linux, bytes no macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        maxrss //= 1024
+    queue.put((paginas, tempo, maxrss))
+
+
+def _collect(paths):
+    arquivos = []
+    for path in paths:
+        if os.path.isdir(path):
+            arquivos.extend(sorted(glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True)))
+        else:
+            arquivos.append(path)
+    return arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos extratores de texto de PDF")
+    parser.add_argument("paths", nargs="+", help="PDFs ou pastas com PDFs")
+    args = parser.parse_args()
+
+    from src.services.pdf_text_extractors import PDF_TEXT_BACKENDS
+
+    arquivos = _collect(args.paths)
+    print(f"📄 {len(arquivos)} arquivos\n")
+
+    ctx = multiprocessing.get_context("spawn")
+    for nome in PDF_TEXT_BACKENDS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_backend, args=(nome, arquivos, queue))
+        proc.start()
+        paginas, tempo, maxrss = queue.get()
+        proc.join()
+        por_pagina = (tempo / paginas * 1000) if paginas else 0.0
+        print(f"{nome:12s} {paginas:6d} páginas  {tempo:8.2f}s  "
+              f"{por_pagina:7.2f} ms/página  pico RSS {maxrss / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca de termos do RuleValidator
+
+Uso:
+    python benchmark_regras.py [textos.txt ...] [--tamanhos 1 10]
+
+Compara a verificação antiga (`any(termo in texto ...)` para cada lista de
+cada regra, ~25 listas por validação) com a passada única do TermMatcher,
+que também devolve os offsets de todas as ocorrências. As duas rodam sobre o
+texto normalizado (text_normalizer), cujo custo aparece à parte, assim como a
+montagem do índice posicional (document_index) e uma consulta de proximidade
+sobre ele (processo + securitização + valor >= 2.5M a até 50 tokens). Sem arquivos, gera
+textos sintéticos de 1MB e 10MB em dois perfis:
+- "esparso": os termos aparecem espalhados pelo texto (~1% das palavras)
+- "ausente": nenhum termo aparece (pior caso para a busca antiga, que não
+  encerra cedo em nenhuma lista)
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Permite importar o pacote src a partir da raiz do backend
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.services.rule_validator import (  # noqa: E402
+    RuleValidator,
+    TERMOS_AREA,
+    TERMOS_CERTIDAO,
+    TERMOS_CONTABIL,
+    TERMOS_CONTABIL_SECURITIZACAO,
+    TERMOS_DEBENTURES,
+    TERMOS_DEFESA,
+    TERMOS_DEFESA_SECURITIZACAO,
+    TERMOS_DOCUMENTOS,
+    TERMOS_HISTORICO,
+    TERMOS_HISTORICO_SECURITIZACAO,
+    TERMOS_PREVIDENCIARIO,
+    TERMOS_PROCESSO,
+    TERMOS_PROCESSO_SECURITIZACAO,
+    TERMOS_REGRAS,
+    TERMOS_SECURITIZACAO,
+    TERMOS_SENTENCA,
+    TERMOS_SUCESSO,
+    TERMOS_SUCESSO_HISTORICO,
+    TERMOS_SUCESSO_JUDICIAL,
+    TERMOS_TRIBUTARIO,
+)
+from src.services.document_features import extract_features  # noqa: E402
+from src.services.document_index import DocumentIndex  # noqa: E402
+from src.services.term_matcher import TermMatcher  # noqa: E402
+from src.services.text_normalizer import normalize_term, normalize_text  # noqa: E402
+
+# Listas na ordem em que as regras as consultam numa validação
+LISTAS_POR_VALIDACAO = [
+    TERMOS_TRIBUTARIO, TERMOS_PREVIDENCIARIO,
+    TERMOS_DEFESA, TERMOS_SUCESSO,
+    TERMOS_PROCESSO, TERMOS_SUCESSO_JUDICIAL,
+    TERMOS_HISTORICO, TERMOS_AREA, TERMOS_SUCESSO_HISTORICO,
+    TERMOS_CONTABIL,
+    TERMOS_DEFESA_SECURITIZACAO, TERMOS_SECURITIZACAO, TERMOS_SUCESSO,
+    TERMOS_PROCESSO_SECURITIZACAO, TERMOS_SECURITIZACAO, TERMOS_SUCESSO_JUDICIAL,
+    TERMOS_HISTORICO_SECURITIZACAO, TERMOS_SECURITIZACAO, TERMOS_SUCESSO,
+    TERMOS_CONTABIL_SECURITIZACAO, TERMOS_SECURITIZACAO, TERMOS_DEBENTURES, TERMOS_DOCUMENTOS,
+    TERMOS_SENTENCA, TERMOS_CERTIDAO,
+]
+
+# Vocabulário neutro (não contém nenhum dos termos)
+PALAVRAS = (
+    "o escritório atuou em diversas demandas perante tribunais com análise de mérito e recursos "
+    "no período indicado pelo contratante relatório anual de atividades jurídicas"
+).split()
+
+
+def _texto_sintetico(tamanho: int, perfil: str, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    termos = sorted({termo for termos in TERMOS_REGRAS for termo in termos})
+    partes, total = [], 0
+    while total < tamanho:
+        if perfil == "esparso" and rnd.random() < 0.01:
+            palavra = rnd.choice(termos)
+        else:
+            palavra = rnd.choice(PALAVRAS)
+        partes.append(palavra)
+        total += len(palavra) + 1
+    texto = " ".join(partes)
+    assert perfil != "ausente" or not any(termo in texto for termo in termos)
+    return texto
+
+
+def _medir(func, repeticoes: int = 3) -> float:
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor
+
+
+def _comparar(nome: str, texto: str, matcher: TermMatcher):
+    original = texto
+    normalizacao = _medir(lambda: normalize_text(original), repeticoes=1)
+    texto = normalize_text(original).texto
+    listas = [[normalize_term(termo) for termo in termos] for termos in LISTAS_POR_VALIDACAO]
+    antigo = _medir(lambda: [any(termo in texto for termo in termos) for termos in listas])
+    unico = _medir(lambda: matcher.scan(texto))
+    hits = matcher.scan(texto)
+    # As duas abordagens precisam concordar em todas as listas
+    assert [any(termo in texto for termo in termos) for termos in listas] == \
+        [hits.any(termos) for termos in listas]
+    validacao = _medir(lambda: RuleValidator({}).validate(original), repeticoes=1)
+    ocorrencias = sum(len(posicoes) for posicoes in hits.posicoes.values())
+    indexacao = _medir(lambda: DocumentIndex(texto), repeticoes=1)
+    doc = extract_features(texto, matcher, indexar=True)
+    grupos = [
+        doc.hits.offsets(normalize_term(termo) for termo in TERMOS_PROCESSO_SECURITIZACAO),
+        doc.hits.offsets(normalize_term(termo) for termo in TERMOS_SECURITIZACAO),
+        doc.valores_minimos(2500000),
+    ]
+    proximidade = _medir(lambda: doc.indice.janela(grupos, 50))
+    print(f"{nome:28s} {len(texto) / 1e6:6.1f}MB  normalização {normalizacao * 1000:8.1f}ms  "
+          f"any/in {antigo * 1000:8.1f}ms  passada única {unico * 1000:8.1f}ms  ({ocorrencias} ocorrências)  "
+          f"validate() completo {validacao * 1000:8.1f}ms  índice {indexacao * 1000:8.1f}ms  "
+          f"proximidade {proximidade * 1000:6.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da busca de termos das regras")
+    parser.add_argument("arquivos", nargs="*", help="Textos (UTF-8) para medir além dos sintéticos")
+    parser.add_argument("--tamanhos", nargs="+", type=float, default=[1, 10], help="Tamanhos sintéticos em MB")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    matcher = TermMatcher(normalize_term(termo) for termos in TERMOS_REGRAS for termo in termos)
+    print(f"🔎 {len(matcher.termos)} termos compilados em {(time.perf_counter() - inicio) * 1000:.1f}ms\n")
+
+    for tamanho in args.tamanhos:
+        for perfil in ("esparso", "ausente"):
+            texto = _texto_sintetico(int(tamanho * 1_000_000), perfil)
+            _comparar(f"sintético {perfil}", texto, matcher)
+    for arquivo in args.arquivos:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            _comparar(os.path.basename(arquivo), f.read(), matcher)
+
+
+if __name__ == "__main__":
+    main()
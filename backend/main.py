@@ -1,12 +1,13 @@
 """
 API FastAPI para Validação Automática de Documentos Jurídicos
 """
+import asyncio
 import logging
 import os
 from pathlib import Path
 
 from dotenv import load_dotenv  # type: ignore
-from fastapi import FastAPI  # type: ignore
+from fastapi import FastAPI, Request  # type: ignore
 from fastapi.middleware.cors import CORSMiddleware  # type: ignore
 from fastapi.responses import JSONResponse  # type: ignore
 
@@ -14,7 +15,10 @@ from fastapi.responses import JSONResponse  # type: ignore
 load_dotenv()
 
 # Importa rotas
-from src.routes import upload_routes, validation_routes
+from src.routes import upload_routes, validation_routes, job_routes, metrics_routes, document_routes
+from src.services.job_service import get_job_manager
+from src.services.ocr_engine import get_engine
+from src.utils.executors import cliente_atual, shutdown_executors
 
 # Configura logging
 logging.basicConfig(
@@ -26,6 +30,9 @@ logger = logging.getLogger(__name__)
 # Limites de upload configuráveis
 MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 100 * 1024 * 1024))  # 100MB padrão
 
+# Só vale o X-Cliente-Id quando um proxy confiável o define (e descarta o do cliente)
+CLIENTE_ID_CONFIAVEL = os.getenv("CLIENTE_ID_CONFIAVEL", "false").lower() == "true"
+
 # Cria app FastAPI
 app = FastAPI(
     title="Validador Jurídico API",
@@ -48,9 +55,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def identifica_cliente(request: Request, call_next):
+    """
+    Identifica o cliente para a fila justa do agendador pelo IP de origem
+    O cabeçalho X-Cliente-Id só é usado com CLIENTE_ID_CONFIAVEL (definido
+    por um proxy confiável): vindo do próprio cliente, bastaria trocar o
+    valor a cada requisição para ganhar uma fila nova e tomar as raias
+    """
+    cliente = request.client.host if request.client else "anonimo"
+    if CLIENTE_ID_CONFIAVEL:
+        cliente = request.headers.get("x-cliente-id") or cliente
+    token = cliente_atual.set(cliente)
+    try:
+        return await call_next(request)
+    finally:
+        cliente_atual.reset(token)
+
+
 # Registra rotas
 app.include_router(upload_routes.router)
 app.include_router(validation_routes.router)
+app.include_router(job_routes.router)
+app.include_router(metrics_routes.router)
+app.include_router(document_routes.router)
+
+
+@app.on_event("startup")
+async def startup():
+    """Sobe os workers de OCR, com os modelos de idioma já carregados"""
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, get_engine().start)
+        logger.info(f"Workers de OCR prontos (idiomas: {get_engine().lang})")
+    except Exception as e:
+        logger.warning(f"Não foi possível pré-carregar os workers de OCR: {e}")
+    await get_job_manager().start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Encerra a fila de jobs, os workers de OCR e os executores de trabalho bloqueante"""
+    await get_job_manager().shutdown()
+    shutdown_executors()
+    get_engine().shutdown()
 
 
 @app.get("/")
@@ -62,7 +110,10 @@ async def root():
         "endpoints": {
             "upload": "/api/uploadDocumento",
             "modelo": "/api/uploadModelo",
-            "validar": "/api/validar"
+            "validar": "/api/validar",
+            "documentos": "/api/documentos/{document_id}",
+            "jobs": "/api/jobs/{job_id}",
+            "metricas": "/api/metricas"
         }
     }
 
@@ -0,0 +1,63 @@
+"""
+Controller para os documentos guardados no servidor (document_id)
+"""
+from fastapi import HTTPException  # type: ignore
+import logging
+import os
+from ..services.document_store import DocumentNotFoundError, document_store
+from ..utils.executors import run_in
+
+logger = logging.getLogger(__name__)
+
+# Caracteres por leitura de texto (padrão e máximo por requisição)
+DOCUMENTO_LEITURA_PADRAO = int(os.getenv("DOCUMENTO_LEITURA_PADRAO", 50000))
+DOCUMENTO_LEITURA_MAX = int(os.getenv("DOCUMENTO_LEITURA_MAX", 500000))
+
+
+class DocumentController:
+    """Controller para consultar e descartar documentos extraídos"""
+    
+    @staticmethod
+    async def get(document_id: str) -> dict:
+        """Metadados do documento (nome, caracteres, tamanho comprimido)"""
+        try:
+            return await run_in("arquivos", document_store.get, document_id)
+        except DocumentNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    
+    @staticmethod
+    async def read_text(document_id: str, inicio: int = 0, limite: int = None) -> dict:
+        """
+        Trecho do texto a partir do caractere `inicio`, com até `limite`
+        caracteres; `proximo_inicio` é None quando o texto acabou
+        """
+        limite = limite or DOCUMENTO_LEITURA_PADRAO
+        if inicio < 0 or limite < 1:
+            raise HTTPException(status_code=400, detail="inicio deve ser >= 0 e limite >= 1")
+        limite = min(limite, DOCUMENTO_LEITURA_MAX)
+        try:
+            meta = await run_in("arquivos", document_store.get, document_id)
+            texto = await run_in("arquivos", document_store.read, document_id, inicio, inicio + limite)
+        except DocumentNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        
+        total = meta["caracteres"]
+        fim = min(inicio + len(texto), total)
+        return {
+            "document_id": document_id,
+            "inicio": min(inicio, total),
+            "fim": fim,
+            "caracteres": total,
+            "proximo_inicio": fim if fim < total else None,
+            "texto": texto,
+        }
+    
+    @staticmethod
+    async def delete(document_id: str) -> dict:
+        """Descarta o documento"""
+        try:
+            await run_in("arquivos", document_store.get, document_id)
+        except DocumentNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        await run_in("arquivos", document_store.delete, document_id)
+        return {"success": True, "message": f"Documento {document_id} removido"}
@@ -3,10 +3,34 @@ Controller para upload de arquivos
 """
 from fastapi import UploadFile, HTTPException  # type: ignore
 from pathlib import Path
+from typing import AsyncIterator
 import logging
 import os
-from ..services.extraction_service import extract_text
-from ..utils.file_handler import save_uploaded_file, save_modelo_json
+import time
+from ..services.document_store import document_store
+from ..services.extraction_service import extract_text, iter_extract_text
+from ..services.job_service import Job, JobQueueFullError, get_job_manager
+from ..services.ocr_engine import OCR_PERFIS
+from ..services.preflight_service import (
+    AdmissionRejectedError,
+    DECISAO_ACEITAR,
+    DECISAO_ADIAR,
+    DECISAO_REJEITAR,
+    estimate_cost,
+    get_admission,
+)
+from ..services.rule_engine import RuleCompileError
+from ..services.rule_validator import compile_modelo
+from ..utils.cancellation import (
+    CancelToken,
+    MOTIVO_DESCONECTOU,
+    MOTIVO_PRAZO,
+    OperationCancelledError,
+    check_cancel,
+)
+from ..utils.executors import iterate_in, run_in
+from ..utils.metrics import record_cancellation
+from ..utils.file_handler import discard_upload, save_modelo_json, spool_upload, UploadTooLargeError
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +39,9 @@ logger = logging.getLogger(__name__)
 MAX_FILE_SIZE_DOCUMENTO = int(os.getenv("MAX_FILE_SIZE_DOCUMENTO", 50 * 1024 * 1024))  # 50MB padrão
 MAX_FILE_SIZE_MODELO = int(os.getenv("MAX_FILE_SIZE_MODELO", 20 * 1024 * 1024))  # 20MB padrão
 
+# Prazo da extração de um documento na requisição (inclui a espera por orçamento e por vaga); 0 desativa
+EXTRACAO_PRAZO_SEGUNDOS = float(os.getenv("EXTRACAO_PRAZO_SEGUNDOS", 900))
+
 
 class UploadController:
     """Controller para gerenciar uploads"""
@@ -29,76 +56,283 @@ class UploadController:
         return f"{size_bytes:.2f} TB"
     
     @staticmethod
-    async def upload_documento(file: UploadFile) -> dict:
+    def _write_json(path: Path, data: dict):
+        """Grava o JSON do modelo (executado no executor de arquivos)"""
+        import json
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    
+    @staticmethod
+    async def _preflight(file_path: Path, filename: str, perfil_ocr: str = None) -> tuple:
         """
-        Faz upload e extrai texto de documento (PDF/DOCX)
+        Estima o custo da extração e aplica o controle de admissão
+        Retorna (estimativa, admissao); levanta 413 se exceder o orçamento por requisição
         """
+        estimativa = await run_in("arquivos", estimate_cost, file_path, filename, perfil_ocr)
         try:
-            # Valida extensão
-            filename = file.filename
-            if not filename:
-                raise HTTPException(status_code=400, detail="Nome de arquivo não fornecido")
-            
-            ext = Path(filename).suffix.lower()
-            if ext not in [".pdf", ".docx", ".doc"]:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Formato não suportado: {ext}. Use PDF ou DOCX."
-                )
-            
-            # Lê arquivo em chunks para verificar tamanho antes de processar tudo
-            file_content = b""
-            total_size = 0
-            
-            while True:
-                chunk = await file.read(1024 * 1024)  # Lê em chunks de 1MB
-                if not chunk:
-                    break
-                total_size += len(chunk)
-                
-                # Verifica limite durante o upload
-                if total_size > MAX_FILE_SIZE_DOCUMENTO:
-                    max_size_mb = MAX_FILE_SIZE_DOCUMENTO / (1024 * 1024)
-                    raise HTTPException(
-                        status_code=413,
-                        detail=f"Arquivo muito grande. Tamanho máximo permitido: {max_size_mb:.0f}MB. "
-                               f"Tamanho do arquivo: {UploadController._format_file_size(total_size)}"
-                    )
-                file_content += chunk
+            admissao = get_admission().decide(estimativa)
+        except AdmissionRejectedError as e:
+            logger.warning(f"Documento {filename} recusado pelo controle de admissão: {e}")
+            raise HTTPException(status_code=413, detail={"erro": str(e), "estimativa": e.estimativa})
+        if admissao["decisao"] != DECISAO_ACEITAR:
+            logger.info(f"Documento {filename}: {admissao['decisao']} (custo estimado {admissao['custo']}s, "
+                        f"perfil {admissao['perfil_ocr']})")
+        return estimativa, admissao
+    
+    @staticmethod
+    def _extraction_lane(estimativa: dict) -> str:
+        """Raia da extração: a de OCR se houver páginas escaneadas, senão a de texto"""
+        return "ocr" if estimativa.get("paginas_ocr") else "texto"
+    
+    @staticmethod
+    async def _process_documento(file_path: Path, filename: str, file_size: int, file_hash: str,
+                                 estimativa: dict, admissao: dict, job: Job = None,
+                                 cancel: CancelToken = None) -> dict:
+        """
+        Extrai o texto de um documento já gravado em disco, dentro do orçamento
+        global de processamento (espera se ele estiver esgotado)
+        Com `job`, registra o progresso da extração página a página
+        cancel: CancelToken repassado à extração (páginas e OCR)
+        """
+        perfil_ocr = admissao["perfil_ocr"]
+        if job is not None:
+            job.set_stage("extracao", "aguardando_orcamento")
+
+        def registrar_pagina(page):
+            job.increment_stage("extracao", "paginas_processadas")
+            job.increment_stage("extracao", f"paginas_{page['metodo']}")
+
+        on_page = registrar_pagina if job is not None else None
+
+        async with get_admission().reserve(admissao["custo"]):
+            check_cancel(cancel)
+            if job is not None:
+                job.set_stage("extracao", "processando", paginas_total=estimativa["paginas"], paginas_processadas=0)
             
-            # Verifica tamanho final
-            if len(file_content) > MAX_FILE_SIZE_DOCUMENTO:
-                max_size_mb = MAX_FILE_SIZE_DOCUMENTO / (1024 * 1024)
-                raise HTTPException(
-                    status_code=413,
-                    detail=f"Arquivo muito grande. Tamanho máximo permitido: {max_size_mb:.0f}MB. "
-                           f"Tamanho do arquivo: {UploadController._format_file_size(len(file_content))}"
+            # Extrai texto (fora do event loop, na raia de OCR se houver páginas escaneadas)
+            texto_extraido = await run_in(
+                UploadController._extraction_lane(estimativa), extract_text, file_path, filename,
+                file_hash=file_hash, perfil_ocr=perfil_ocr, on_page=on_page, cancel=cancel
+            )
+        
+        if not texto_extraido or len(texto_extraido.strip()) < 10:
+            if job is not None:
+                job.set_stage("extracao", "erro")
+            raise HTTPException(
+                status_code=400,
+                detail="Não foi possível extrair texto do documento. Verifique se o arquivo está válido."
+            )
+        if job is not None:
+            job.set_stage("extracao", "concluido", caracteres=len(texto_extraido))
+        
+        # Texto fica no servidor: validação e relatório recebem só o document_id
+        documento = await run_in(
+            "arquivos", document_store.save, texto_extraido, filename=filename, file_hash=file_hash
+        )
+        
+        file_size_mb = file_size / (1024 * 1024)
+        logger.info(f"Documento processado: {filename} ({file_size_mb:.2f}MB)")
+        
+        return {
+            "success": True,
+            "message": "Documento processado com sucesso",
+            "document_id": documento["document_id"],
+            "caracteres": documento["caracteres"],
+            "texto_extraido": texto_extraido,
+            "filename": filename,
+            "file_size": file_size,
+            "file_size_mb": round(file_size_mb, 2),
+            "estimativa": estimativa,
+            "admissao": admissao,
+        }
+    
+    @staticmethod
+    async def _enqueue_documento(file_path: Path, filename: str, file_size: int, file_hash: str,
+                                 estimativa: dict, admissao: dict) -> dict:
+        """
+        Coloca a extração na fila de jobs e retorna o job id imediatamente
+        O arquivo passa a ser do job, que o remove ao terminar
+        """
+        async def work(job: Job) -> dict:
+            try:
+                return await UploadController._process_documento(
+                    file_path, filename, file_size, file_hash, estimativa, admissao, job=job, cancel=job.cancel
                 )
-            
-            # Salva arquivo temporariamente
-            file_path = save_uploaded_file(file_content, filename)
-            
-            # Extrai texto
-            texto_extraido = extract_text(file_path, filename)
-            
-            if not texto_extraido or len(texto_extraido.strip()) < 10:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Não foi possível extrair texto do documento. Verifique se o arquivo está válido."
+            except (HTTPException, OperationCancelledError):
+                raise
+            except Exception as e:
+                job.set_stage("extracao", "erro")
+                raise HTTPException(status_code=500, detail=f"Erro ao processar documento: {str(e)}")
+            finally:
+                await run_in("arquivos", discard_upload, file_path)
+        
+        try:
+            job = await get_job_manager().submit("documento", ["upload", "preflight", "extracao"], work)
+        except JobQueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        job.set_stage("upload", "concluido", bytes=file_size)
+        job.set_stage("preflight", "concluido", decisao=admissao["decisao"], perfil_ocr=admissao["perfil_ocr"],
+                      custo_estimado=admissao["custo"], tempo_estimado_s=estimativa["tempo_estimado_s"])
+        logger.info(f"Documento {filename} na fila de processamento (job {job.id})")
+        
+        return {
+            "success": True,
+            "message": "Documento recebido; processamento em segundo plano",
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/jobs/{job.id}",
+            "filename": filename,
+            "file_size": file_size,
+            "estimativa": estimativa,
+            "admissao": admissao,
+        }
+    
+    @staticmethod
+    async def _dispatch_documento(file_path: Path, filename: str, file_size: int, file_hash: str,
+                                  perfil_ocr: str = None, assincrono: bool = False,
+                                  cancel: CancelToken = None, manter_em_erro: bool = False) -> dict:
+        """
+        Preflight + admissão e, em seguida, extração síncrona ou em job
+        Documentos adiados pelo orçamento global viram job mesmo sem assincrono
+        cancel vale só para a extração síncrona (o job tem o próprio token)
+        O arquivo enviado é removido ao final (ou pelo job, se for para a fila);
+        com manter_em_erro ele fica no disco se a extração falhar, para nova tentativa
+        """
+        descartar = not manter_em_erro
+        try:
+            estimativa, admissao = await UploadController._preflight(file_path, filename, perfil_ocr)
+            if assincrono or admissao["decisao"] == DECISAO_ADIAR:
+                resultado = await UploadController._enqueue_documento(
+                    file_path, filename, file_size, file_hash, estimativa, admissao
                 )
+                descartar = False
+                return resultado
+            resultado = await UploadController._process_documento(
+                file_path, filename, file_size, file_hash, estimativa, admissao, cancel=cancel
+            )
+            descartar = True
+            return resultado
+        finally:
+            if descartar:
+                await run_in("arquivos", discard_upload, file_path)
+    
+    @staticmethod
+    def _check_perfil_ocr(perfil_ocr: str = None):
+        """Levanta 400 se o perfil de OCR não existir"""
+        if perfil_ocr and perfil_ocr not in OCR_PERFIS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Perfil de OCR inválido: {perfil_ocr}. Use: {', '.join(OCR_PERFIS)}"
+            )
+    
+    @staticmethod
+    def _check_documento_filename(filename: str):
+        """Levanta 400 se o nome estiver vazio ou a extensão não for suportada"""
+        if not filename:
+            raise HTTPException(status_code=400, detail="Nome de arquivo não fornecido")
+        
+        ext = Path(filename).suffix.lower()
+        if ext not in [".pdf", ".docx", ".doc"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Formato não suportado: {ext}. Use PDF ou DOCX."
+            )
+    
+    @staticmethod
+    async def _receive_documento(file: UploadFile, perfil_ocr: str = None) -> tuple:
+        """
+        Valida perfil e extensão e grava o upload em disco
+        Retorna (file_path, filename, file_size, file_hash)
+        """
+        UploadController._check_perfil_ocr(perfil_ocr)
+        filename = file.filename
+        UploadController._check_documento_filename(filename)
+        
+        # Grava em disco em chunks, verificando o tamanho e calculando o hash
+        try:
+            file_path, file_size, file_hash = await spool_upload(file, filename, MAX_FILE_SIZE_DOCUMENTO)
+        except UploadTooLargeError as e:
+            max_size_mb = MAX_FILE_SIZE_DOCUMENTO / (1024 * 1024)
+            raise HTTPException(
+                status_code=413,
+                detail=f"Arquivo muito grande. Tamanho máximo permitido: {max_size_mb:.0f}MB. "
+                       f"Tamanho do arquivo: {UploadController._format_file_size(e.size)}"
+            )
+        return file_path, filename, file_size, file_hash
+    
+    @staticmethod
+    async def upload_documento(file: UploadFile, perfil_ocr: str = None, assincrono: bool = False,
+                               cancel: CancelToken = None) -> dict:
+        """
+        Faz upload e extrai texto de documento (PDF/DOCX)
+        perfil_ocr: perfil de OCR para páginas escaneadas ("fast", "balanced" ou "best")
+        assincrono: se True, retorna um job id logo após o upload e extrai em segundo plano
+        cancel: CancelToken da requisição (cliente desconectou / prazo esgotado)
+        """
+        try:
+            file_path, filename, file_size, file_hash = await UploadController._receive_documento(file, perfil_ocr)
+            return await UploadController._dispatch_documento(
+                file_path, filename, file_size, file_hash, perfil_ocr, assincrono, cancel
+            )
             
-            file_size_mb = len(file_content) / (1024 * 1024)
-            logger.info(f"Documento processado: {filename} ({file_size_mb:.2f}MB)")
-            
+        except (HTTPException, OperationCancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao processar upload: {e}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Erro ao processar documento: {str(e)}"
+            )
+    
+    @staticmethod
+    async def preflight_documento(file: UploadFile, perfil_ocr: str = None) -> dict:
+        """
+        Só a estimativa de custo e a decisão de admissão, sem extrair o texto
+        """
+        try:
+            file_path, filename, file_size, _ = await UploadController._receive_documento(file, perfil_ocr)
+            try:
+                estimativa = await run_in("arquivos", estimate_cost, file_path, filename, perfil_ocr)
+            finally:
+                await run_in("arquivos", discard_upload, file_path)
+            try:
+                admissao = get_admission().decide(estimativa, registrar=False)
+            except AdmissionRejectedError as e:
+                admissao = {"decisao": DECISAO_REJEITAR, "motivo": str(e)}
             return {
                 "success": True,
-                "message": "Documento processado com sucesso",
-                "texto_extraido": texto_extraido,
                 "filename": filename,
-                "file_size": len(file_content),
-                "file_size_mb": round(file_size_mb, 2)
+                "file_size": file_size,
+                "estimativa": estimativa,
+                "admissao": admissao,
             }
-            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Erro no preflight: {e}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Erro ao estimar custo do documento: {str(e)}"
+            )
+    
+    @staticmethod
+    async def upload_documento_stream(file: UploadFile, perfil_ocr: str = None) -> AsyncIterator[dict]:
+        """
+        Faz upload e retorna um iterador assíncrono de eventos da extração:
+        a estimativa de custo, um por página assim que fica pronta e, ao final,
+        um evento "resumo". Erros de validação/upload/admissão são levantados
+        antes do primeiro evento; se o orçamento global estiver esgotado, o
+        stream espera antes da primeira página
+        Se o cliente fechar a conexão, a extração (páginas e OCR) é cancelada;
+        se o prazo esgotar, o stream termina com um evento "erro"
+        """
+        try:
+            file_path, filename, file_size, file_hash = await UploadController._receive_documento(file, perfil_ocr)
+            try:
+                estimativa, admissao = await UploadController._preflight(file_path, filename, perfil_ocr)
+            except BaseException:
+                await run_in("arquivos", discard_upload, file_path)
+                raise
         except HTTPException:
             raise
         except Exception as e:
@@ -107,6 +341,72 @@ class UploadController:
                 status_code=500,
                 detail=f"Erro ao processar documento: {str(e)}"
             )
+        
+        async def events():
+            inicio = time.perf_counter()
+            contagem = {}
+            caracteres = 0
+            partes = []
+            cancel = CancelToken(EXTRACAO_PRAZO_SEGUNDOS)
+            concluido = False
+            yield {"evento": "estimativa", **estimativa, "admissao": admissao}
+            try:
+                async with get_admission().reserve(admissao["custo"]):
+                    check_cancel(cancel)
+                    async for event in iterate_in(
+                        UploadController._extraction_lane(estimativa), iter_extract_text, file_path, filename,
+                        file_hash=file_hash, perfil_ocr=admissao["perfil_ocr"], cancel=cancel
+                    ):
+                        contagem[event["metodo"]] = contagem.get(event["metodo"], 0) + 1
+                        caracteres += len(event["texto"])
+                        partes.append((event.get("pagina", 0), event["texto"]))
+                        yield event
+                concluido = True
+            except OperationCancelledError as e:
+                concluido = True
+                record_cancellation("stream", e.motivo)
+                logger.warning(f"Extração incremental de {filename} cancelada: {e.motivo}")
+                status = "Prazo de processamento esgotado" if e.motivo == MOTIVO_PRAZO else "Processamento cancelado"
+                yield {"evento": "erro", "motivo": e.motivo, "detail": status}
+                return
+            except Exception as e:
+                concluido = True
+                logger.error(f"Erro na extração incremental de {filename}: {e}")
+                yield {"evento": "erro", "detail": f"Erro ao processar documento: {str(e)}"}
+                return
+            finally:
+                if not concluido:
+                    # O consumidor parou no meio (cliente fechou a conexão)
+                    cancel.cancel(MOTIVO_DESCONECTOU)
+                    record_cancellation("stream", MOTIVO_DESCONECTOU)
+                    logger.info(f"Cliente desconectou durante a extração de {filename}")
+                # O texto já está nas páginas: o arquivo enviado não é mais necessário
+                await run_in("arquivos", discard_upload, file_path)
+            
+            # Páginas chegam fora de ordem (texto antes do OCR): guarda na ordem do documento
+            partes.sort(key=lambda parte: parte[0])
+            texto = "\n".join(texto for _, texto in partes).strip()
+            document_id = None
+            if len(texto) >= 10:
+                documento = await run_in(
+                    "arquivos", document_store.save, texto, filename=filename, file_hash=file_hash
+                )
+                document_id = documento["document_id"]
+            
+            logger.info(f"Documento processado (stream): {filename} ({file_size / (1024 * 1024):.2f}MB)")
+            yield {
+                "evento": "resumo",
+                "success": caracteres >= 10,
+                "document_id": document_id,
+                "filename": filename,
+                "file_size": file_size,
+                "paginas": sum(n for metodo, n in contagem.items() if metodo in ("texto", "ocr")),
+                "por_metodo": contagem,
+                "caracteres": caracteres,
+                "tempo_total_ms": round((time.perf_counter() - inicio) * 1000, 1),
+            }
+        
+        return events()
     
     @staticmethod
     async def upload_modelo(nome: str, file: UploadFile = None, modelo_data: dict = None) -> dict:
@@ -115,13 +415,11 @@ class UploadController:
         Aceita arquivo Word (.docx) ou JSON com estrutura do modelo
         """
         try:
-            import json
-            import os
             from datetime import datetime
             
             # Cria diretório de modelos se não existir
             modelos_dir = Path("modelos")
-            modelos_dir.mkdir(exist_ok=True)
+            await run_in("arquivos", modelos_dir.mkdir, exist_ok=True)
             
             modelo_id = f"modelo_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             modelo_info = {
@@ -139,39 +437,23 @@ class UploadController:
                         detail=f"Formato não suportado: {ext}. Use DOCX, DOC ou PDF."
                     )
                 
-                # Lê arquivo em chunks para verificar tamanho
-                file_content = b""
-                total_size = 0
-                
-                while True:
-                    chunk = await file.read(1024 * 1024)  # Lê em chunks de 1MB
-                    if not chunk:
-                        break
-                    total_size += len(chunk)
-                    
-                    # Verifica limite durante o upload
-                    if total_size > MAX_FILE_SIZE_MODELO:
-                        max_size_mb = MAX_FILE_SIZE_MODELO / (1024 * 1024)
-                        raise HTTPException(
-                            status_code=413,
-                            detail=f"Arquivo modelo muito grande. Tamanho máximo permitido: {max_size_mb:.0f}MB. "
-                                   f"Tamanho do arquivo: {UploadController._format_file_size(total_size)}"
-                        )
-                    file_content += chunk
-                
-                # Verifica tamanho final
-                if len(file_content) > MAX_FILE_SIZE_MODELO:
+                # Grava em disco em chunks, verificando o tamanho e calculando o hash
+                try:
+                    file_path, _, file_hash = await spool_upload(file, file.filename, MAX_FILE_SIZE_MODELO)
+                except UploadTooLargeError as e:
                     max_size_mb = MAX_FILE_SIZE_MODELO / (1024 * 1024)
                     raise HTTPException(
                         status_code=413,
                         detail=f"Arquivo modelo muito grande. Tamanho máximo permitido: {max_size_mb:.0f}MB. "
-                               f"Tamanho do arquivo: {UploadController._format_file_size(len(file_content))}"
+                               f"Tamanho do arquivo: {UploadController._format_file_size(e.size)}"
                     )
                 
-                file_path = save_uploaded_file(file_content, file.filename)
-                
-                # Extrai texto do arquivo
-                texto_modelo = extract_text(file_path, file.filename)
+                # Extrai texto do arquivo (fora do event loop)
+                lane = "ocr" if ext == ".pdf" else "texto"
+                try:
+                    texto_modelo = await run_in(lane, extract_text, file_path, file.filename, file_hash=file_hash)
+                finally:
+                    await run_in("arquivos", discard_upload, file_path)
                 
                 if not texto_modelo or len(texto_modelo.strip()) < 10:
                     raise HTTPException(
@@ -190,6 +472,14 @@ class UploadController:
                         status_code=400,
                         detail="Estrutura do modelo inválida. Deve conter 'modelo' e 'requisitos'"
                     )
+                # Compila os requisitos já no envio: erro de regra aparece aqui, não na validação
+                try:
+                    compile_modelo(modelo_data)
+                except RuleCompileError as e:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Requisitos do modelo inválidos: {str(e)}"
+                    )
                 modelo_info.update(modelo_data)
                 modelo_info["tipo"] = "json"
             
@@ -203,8 +493,7 @@ class UploadController:
             modelo_filename = f"{modelo_id}.json"
             modelo_path = modelos_dir / modelo_filename
             
-            with open(modelo_path, "w", encoding="utf-8") as f:
-                json.dump(modelo_info, f, ensure_ascii=False, indent=2)
+            await run_in("arquivos", UploadController._write_json, modelo_path, modelo_info)
             
             return {
                 "success": True,
@@ -0,0 +1,174 @@
+"""
+Controller para uploads retomáveis (sessões com partes numeradas)
+"""
+from fastapi import HTTPException  # type: ignore
+from pathlib import Path
+from typing import AsyncIterator, Optional
+import logging
+from .upload_controller import UploadController, MAX_FILE_SIZE_DOCUMENTO
+from ..services.extraction_cache import hash_file
+from ..utils.cancellation import CancelToken, OperationCancelledError
+from ..services.upload_session_service import (
+    UploadSessionStore,
+    UploadSessionNotFoundError,
+    UploadSessionConflictError,
+    ESTADO_RECEBENDO,
+)
+from ..utils.executors import run_in
+from ..utils.file_handler import UPLOAD_CHUNK_SIZE, UploadTooLargeError
+
+logger = logging.getLogger(__name__)
+
+upload_sessions = UploadSessionStore(Path("uploads") / "sessoes", MAX_FILE_SIZE_DOCUMENTO)
+
+
+def _session_status(session: dict) -> dict:
+    """Estado público da sessão (o que o cliente precisa para retomar)"""
+    return {
+        "upload_id": session["id"],
+        "filename": session["filename"],
+        "tamanho_total": session.get("tamanho_total"),
+        "tamanho_parte": session["tamanho_parte"],
+        "recebido": session["recebido"],
+        "proxima_parte": session["partes"],
+        "estado": session.get("estado", ESTADO_RECEBENDO),
+        "completo": bool(session.get("ultima_parte_recebida"))
+                    or session["recebido"] == session.get("tamanho_total"),
+    }
+
+
+class UploadSessionController:
+    """Controller para uploads retomáveis"""
+    
+    @staticmethod
+    def _too_large(e: UploadTooLargeError) -> HTTPException:
+        max_size_mb = MAX_FILE_SIZE_DOCUMENTO / (1024 * 1024)
+        return HTTPException(
+            status_code=413,
+            detail=f"Arquivo muito grande. Tamanho máximo permitido: {max_size_mb:.0f}MB. "
+                   f"Tamanho do arquivo: {UploadController._format_file_size(e.size)}"
+        )
+    
+    @staticmethod
+    def _conflict(e: UploadSessionConflictError) -> HTTPException:
+        return HTTPException(status_code=409, detail={"erro": str(e), "recebido": e.recebido})
+    
+    @staticmethod
+    async def create(filename: str, tamanho_total: Optional[int] = None) -> dict:
+        """Cria a sessão; o cliente envia as partes de tamanho_parte bytes a partir da 0"""
+        UploadController._check_documento_filename(filename)
+        if tamanho_total is not None and tamanho_total <= 0:
+            raise HTTPException(status_code=400, detail="tamanho_total deve ser positivo")
+        try:
+            session = await run_in("arquivos", upload_sessions.create, filename, tamanho_total)
+        except UploadTooLargeError as e:
+            raise UploadSessionController._too_large(e)
+        logger.info(f"Sessão de upload {session['id']} criada para {session['filename']}")
+        return _session_status(session)
+    
+    @staticmethod
+    async def status(upload_id: str) -> dict:
+        """Offset recebido e próxima parte esperada"""
+        try:
+            session = await run_in("arquivos", upload_sessions.get, upload_id)
+        except UploadSessionNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return _session_status(session)
+    
+    @staticmethod
+    async def put_chunk(upload_id: str, numero: int, stream: AsyncIterator[bytes]) -> dict:
+        """
+        Grava a parte `numero` direto no spool da sessão, à medida que chega
+        Reenviar uma parte já recebida não tem efeito (retorna o estado atual)
+        """
+        if numero < 0:
+            raise HTTPException(status_code=400, detail="Número da parte deve ser >= 0")
+        try:
+            writer = await run_in("arquivos", upload_sessions.open_chunk, upload_id, numero)
+        except UploadSessionNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except UploadSessionConflictError as e:
+            raise UploadSessionController._conflict(e)
+        
+        if writer is None:
+            # Parte já recebida: o corpo é descartado
+            async for _ in stream:
+                pass
+            return await UploadSessionController.status(upload_id)
+        
+        try:
+            buffer = bytearray()
+            async for data in stream:
+                buffer += data
+                if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    await run_in("arquivos", writer.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await run_in("arquivos", writer.write, bytes(buffer))
+        except UploadTooLargeError as e:
+            await run_in("arquivos", writer.abort)
+            raise UploadSessionController._too_large(e)
+        except UploadSessionConflictError as e:
+            await run_in("arquivos", writer.abort)
+            raise UploadSessionController._conflict(e)
+        except BaseException:
+            # Conexão caiu no meio da parte: descarta o que veio dela
+            await run_in("arquivos", writer.abort)
+            raise
+        try:
+            session = await run_in("arquivos", writer.commit)
+        except UploadSessionConflictError as e:
+            # commit() já descartou a parte e liberou a sessão
+            raise UploadSessionController._conflict(e)
+        return _session_status(session)
+    
+    @staticmethod
+    async def finalize(upload_id: str, perfil_ocr: str = None, assincrono: bool = False,
+                       cancel: CancelToken = None) -> dict:
+        """
+        Fecha a sessão e passa o arquivo para a extração (síncrona ou em job)
+        A sessão só deixa de existir quando o job é aceito ou o resultado sai;
+        se a extração falhar, pode-se finalizar de novo sem reenviar as partes
+        """
+        UploadController._check_perfil_ocr(perfil_ocr)
+        try:
+            session = await run_in("arquivos", upload_sessions.finalize, upload_id)
+        except UploadSessionNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except UploadSessionConflictError as e:
+            raise UploadSessionController._conflict(e)
+        
+        concluido = False
+        try:
+            file_path = Path(session["file_path"])
+            file_size = session["recebido"]
+            file_hash = await run_in("arquivos", hash_file, file_path)
+            resultado = await UploadController._dispatch_documento(
+                file_path, session["filename"], file_size, file_hash, perfil_ocr, assincrono, cancel,
+                manter_em_erro=True
+            )
+            concluido = True
+            return resultado
+        except (HTTPException, OperationCancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao processar upload {upload_id}: {e}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Erro ao processar documento: {str(e)}"
+            )
+        finally:
+            await run_in("arquivos", upload_sessions.finish, upload_id, concluido)
+    
+    @staticmethod
+    async def delete(upload_id: str) -> dict:
+        """Cancela a sessão e descarta os bytes recebidos"""
+        try:
+            await run_in("arquivos", upload_sessions.get, upload_id)
+        except UploadSessionNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        try:
+            await run_in("arquivos", upload_sessions.delete, upload_id)
+        except UploadSessionConflictError as e:
+            raise UploadSessionController._conflict(e)
+        return {"success": True, "message": f"Sessão de upload {upload_id} cancelada"}
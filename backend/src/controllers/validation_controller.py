@@ -2,9 +2,14 @@
 Controller para validação de documentos
 """
 from fastapi import HTTPException  # type: ignore
+import asyncio
 import logging
+from ..services.document_store import DocumentNotFoundError, document_store
+from ..services.rule_engine import RuleCompileError
 from ..services.validation_service import ValidationService
 from ..services.report_service import ReportService
+from ..utils.cancellation import CancelToken, OperationCancelledError
+from ..utils.executors import run_in
 from ..utils.file_handler import load_modelo_json
 from pathlib import Path
 import os
@@ -16,29 +21,51 @@ class ValidationController:
     """Controller para gerenciar validações"""
     
     @staticmethod
-    def validate_documento(texto_documento: str, modelo_id: str = "default", use_ai: bool = True) -> dict:
+    def _load_modelo(modelo_id: str = "default") -> dict:
+        """Carrega o modelo pelo id (ou o modelo.json padrão)"""
+        import json
+        
+        if modelo_id != "default":
+            # Tenta carregar modelo específico
+            modelo_path = Path("modelos") / f"{modelo_id}.json"
+            if not modelo_path.exists():
+                # Se não encontrar, usa o padrão
+                modelo_path = Path("modelo.json")
+        else:
+            modelo_path = Path("modelo.json")
+        
+        if not modelo_path.exists():
+            raise FileNotFoundError(f"Modelo não encontrado: {modelo_path}")
+        
+        with open(modelo_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    
+    @staticmethod
+    async def _resolve_texto(texto_documento: str = None, document_id: str = None) -> str:
+        """Texto a validar: o enviado na requisição ou o guardado no servidor (document_id)"""
+        if document_id:
+            try:
+                return await run_in("arquivos", document_store.read, document_id)
+            except DocumentNotFoundError as e:
+                raise HTTPException(status_code=404, detail=str(e))
+        if not texto_documento:
+            raise HTTPException(status_code=400, detail="Informe document_id ou texto_documento")
+        return texto_documento
+    
+    @staticmethod
+    async def validate_documento(texto_documento: str = None, modelo_id: str = "default", use_ai: bool = True,
+                                 cancel: CancelToken = None, document_id: str = None) -> dict:
         """
         Valida documento contra modelo oficial
+        O texto vem de document_id (retornado pelo upload) ou de texto_documento
         Se modelo_id for especificado, compara com o texto do modelo
+        Regras e IA rodam em paralelo, cada uma na sua raia do agendador
+        cancel: CancelToken repassado às regras e à chamada de IA
         """
+        texto_documento = await ValidationController._resolve_texto(texto_documento, document_id)
         try:
-            import json
-            
             # Carrega modelo
-            if modelo_id != "default":
-                # Tenta carregar modelo específico
-                modelo_path = Path("modelos") / f"{modelo_id}.json"
-                if not modelo_path.exists():
-                    # Se não encontrar, usa o padrão
-                    modelo_path = Path("modelo.json")
-            else:
-                modelo_path = Path("modelo.json")
-            
-            if not modelo_path.exists():
-                raise FileNotFoundError(f"Modelo não encontrado: {modelo_path}")
-            
-            with open(modelo_path, "r", encoding="utf-8") as f:
-                modelo = json.load(f)
+            modelo = await run_in("arquivos", ValidationController._load_modelo, modelo_id)
             
             # Se o modelo tem texto extraído, usa para comparação
             texto_modelo = modelo.get("texto_extraido", "")
@@ -63,11 +90,21 @@ class ValidationController:
             )
             
             # Executa validação usando o texto completo (modelo + documento)
-            resultado = validation_service.validate(texto_completo)
+            if validation_service.use_ai:
+                resultado_regras, resultado_ai = await asyncio.gather(
+                    run_in("regras", validation_service.validate_rules, texto_completo, cancel),
+                    run_in("ia", validation_service.validate_ai, texto_completo, cancel),
+                )
+            else:
+                resultado_regras = await run_in("regras", validation_service.validate_rules, texto_completo, cancel)
+                resultado_ai = {}
+            resultado = validation_service.consolidate_results(resultado_regras, resultado_ai)
             
             # Adiciona informações do modelo usado
             resultado["modelo_usado"] = modelo.get("nome", "Padrão")
             resultado["modelo_id"] = modelo_id
+            if document_id:
+                resultado["document_id"] = document_id
             
             return resultado
             
@@ -77,6 +114,14 @@ class ValidationController:
                 status_code=404,
                 detail=f"Modelo {modelo_id} não encontrado"
             )
+        except RuleCompileError as e:
+            logger.error(f"Requisitos inválidos no modelo {modelo_id}: {e}")
+            raise HTTPException(
+                status_code=400,
+                detail=f"Requisitos do modelo {modelo_id} inválidos: {str(e)}"
+            )
+        except (HTTPException, OperationCancelledError):
+            raise
         except Exception as e:
             logger.error(f"Erro na validação: {e}")
             raise HTTPException(
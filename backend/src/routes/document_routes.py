@@ -0,0 +1,41 @@
+"""
+Rotas para os documentos guardados no servidor
+"""
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse
+from typing import Optional
+import logging
+from ..controllers.document_controller import DocumentController
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["documentos"])
+
+
+@router.get("/documentos/{document_id}")
+async def metadados_documento(document_id: str):
+    """
+    Metadados do texto extraído (nome do arquivo, caracteres, tamanho comprimido)
+    """
+    return JSONResponse(content=await DocumentController.get(document_id))
+
+
+@router.get("/documentos/{document_id}/texto")
+async def texto_documento(
+    document_id: str,
+    inicio: int = Query(0, description="Caractere inicial"),
+    limite: Optional[int] = Query(None, description="Máximo de caracteres retornados")
+):
+    """
+    Trecho do texto extraído, para exibição paginada
+    Continue a partir de `proximo_inicio` até ele vir null
+    """
+    return JSONResponse(content=await DocumentController.read_text(document_id, inicio, limite))
+
+
+@router.delete("/documentos/{document_id}")
+async def remover_documento(document_id: str):
+    """
+    Descarta o texto guardado no servidor
+    """
+    return JSONResponse(content=await DocumentController.delete(document_id))
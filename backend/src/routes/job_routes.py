@@ -0,0 +1,57 @@
+"""
+Rotas para acompanhamento de jobs em segundo plano
+"""
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+import logging
+from ..services.job_service import get_job_manager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["jobs"])
+
+
+@router.get("/jobs")
+async def estatisticas_jobs():
+    """
+    Ocupação da fila e contagem de jobs por status
+    """
+    return JSONResponse(content=get_job_manager().stats())
+
+
+@router.get("/agendador")
+async def estatisticas_agendador():
+    """
+    Ocupação, fila e tempo de espera de cada raia do agendador
+    """
+    from ..utils.executors import lanes_stats
+    return JSONResponse(content=lanes_stats())
+
+
+@router.get("/jobs/{job_id}")
+async def status_job(
+    job_id: str,
+    incluir_texto: bool = Query(True, description="Inclui texto_extraido no resultado (use o document_id)")
+):
+    """
+    Status, progresso por etapa e (quando concluído) o resultado do job
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} não encontrado")
+    data = job.to_dict()
+    if not incluir_texto and data.get("resultado"):
+        data["resultado"] = {k: v for k, v in data["resultado"].items() if k != "texto_extraido"}
+    return JSONResponse(content=data)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancelar_job(job_id: str):
+    """
+    Cancela um job na fila ou em processamento
+    As páginas ainda não processadas são abandonadas; o job termina com status "cancelado"
+    """
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} não encontrado")
+    return JSONResponse(content=job.to_dict(), status_code=202)
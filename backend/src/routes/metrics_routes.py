@@ -0,0 +1,31 @@
+"""
+Rotas de métricas de operação
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+import logging
+from ..services.job_service import get_job_manager
+from ..services.ocr_engine import get_engine
+from ..services.preflight_service import get_admission
+from ..utils.executors import lanes_stats
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["metricas"])
+
+
+@router.get("/metricas")
+async def metricas():
+    """
+    Contadores do processo (cancelamentos por etapa e motivo, páginas
+    abandonadas, chamadas de IA canceladas) e a ocupação atual das raias, do
+    orçamento de CPU do OCR, do controle de admissão e da fila de jobs
+    """
+    return JSONResponse(content={
+        "contadores": metrics.snapshot(),
+        "raias": lanes_stats(),
+        "ocr": get_engine().budget.stats(),
+        "admissao": get_admission().stats(),
+        "jobs": get_job_manager().stats(),
+    })
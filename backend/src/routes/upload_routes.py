@@ -1,11 +1,17 @@
 """
 Rotas para upload de arquivos
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse
-from typing import Dict, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import Optional
+import json
 import logging
 from ..controllers.upload_controller import UploadController
+from ..controllers.upload_session_controller import UploadSessionController
+from ..controllers.upload_controller import EXTRACAO_PRAZO_SEGUNDOS
+from ..utils.cancellation import CancelToken, OperationCancelledError, cancel_scope, to_http_exception
+from ..utils.executors import run_in
 
 logger = logging.getLogger(__name__)
 
@@ -13,13 +19,36 @@ router = APIRouter(prefix="/api", tags=["upload"])
 
 
 @router.post("/uploadDocumento")
-async def upload_documento(file: UploadFile = File(...)):
+async def upload_documento(
+    request: Request,
+    file: UploadFile = File(...),
+    perfil_ocr: Optional[str] = Query(None, description="Perfil de OCR: fast, balanced ou best"),
+    assincrono: bool = Query(False, description="Retorna um job id e processa em segundo plano"),
+    incluir_texto: bool = Query(True, description="Inclui texto_extraido na resposta (use o document_id)")
+):
     """
     Upload de documento (PDF ou DOCX) e extração de texto
+    O texto fica guardado no servidor: a resposta traz o document_id, aceito
+    por /api/validar e /api/validar/relatorio. Com incluir_texto=false o
+    texto não volta na resposta (leia trechos em /api/documentos/{id}/texto)
+    Com assincrono=true responde 202 com o job id; acompanhe em /api/jobs/{job_id}
+    Documentos adiados pelo controle de admissão também respondem 202 com job id
+    Na extração síncrona, se o cliente desconectar ou o prazo esgotar, as
+    páginas restantes (e o OCR) são abandonadas
     """
     try:
-        resultado = await UploadController.upload_documento(file)
+        async with cancel_scope(CancelToken(EXTRACAO_PRAZO_SEGUNDOS), request) as cancel:
+            resultado = await UploadController.upload_documento(
+                file, perfil_ocr=perfil_ocr, assincrono=assincrono, cancel=cancel
+            )
+        if not incluir_texto:
+            resultado.pop("texto_extraido", None)
+        if "job_id" in resultado:
+            # Processamento em segundo plano (pedido ou adiado pelo controle de admissão)
+            return JSONResponse(content=resultado, status_code=202)
         return JSONResponse(content=resultado)
+    except OperationCancelledError as e:
+        raise to_http_exception(e, "extracao")
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -27,6 +56,126 @@ async def upload_documento(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/preflight")
+async def preflight_documento(
+    file: UploadFile = File(...),
+    perfil_ocr: Optional[str] = Query(None, description="Perfil de OCR: fast, balanced ou best")
+):
+    """
+    Estimativa de custo (páginas, páginas com texto, páginas de OCR, segundos
+    de CPU) e a decisão que o controle de admissão tomaria, sem extrair o texto
+    """
+    resultado = await UploadController.preflight_documento(file, perfil_ocr=perfil_ocr)
+    return JSONResponse(content=resultado)
+
+
+@router.get("/admissao")
+async def estatisticas_admissao():
+    """
+    Orçamentos, custo em execução e contagem de decisões do controle de admissão
+    """
+    from ..services.preflight_service import get_admission
+    return JSONResponse(content=get_admission().stats())
+
+
+@router.post("/uploadDocumento/stream")
+async def upload_documento_stream(
+    file: UploadFile = File(...),
+    perfil_ocr: Optional[str] = Query(None, description="Perfil de OCR: fast, balanced ou best"),
+    formato: str = Query("ndjson", description="Formato do stream: ndjson ou sse")
+):
+    """
+    Upload de documento com extração transmitida página a página
+    Cada página gera um evento (número, método, tempo e texto) assim que fica
+    pronta; o último evento é o resumo. Formatos: NDJSON (uma linha JSON por
+    evento) ou Server-Sent Events
+    """
+    if formato not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {formato}. Use ndjson ou sse.")
+    
+    events = await UploadController.upload_documento_stream(file, perfil_ocr=perfil_ocr)
+    
+    async def body():
+        async for event in events:
+            data = json.dumps(event, ensure_ascii=False)
+            if formato == "sse":
+                yield f"event: {event['evento']}\ndata: {data}\n\n"
+            else:
+                yield data + "\n"
+    
+    media_type = "text/event-stream" if formato == "sse" else "application/x-ndjson"
+    # X-Accel-Buffering: evita que proxies (nginx) segurem os eventos
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class UploadSessionRequest(BaseModel):
+    """Request body para criar uma sessão de upload retomável"""
+    filename: str
+    tamanho_total: Optional[int] = None
+
+
+@router.post("/uploads")
+async def criar_sessao_upload(request: UploadSessionRequest):
+    """
+    Cria uma sessão de upload retomável
+    Retorna upload_id e tamanho_parte; envie as partes em ordem a partir da 0
+    """
+    resultado = await UploadSessionController.create(request.filename, request.tamanho_total)
+    return JSONResponse(content=resultado, status_code=201)
+
+
+@router.get("/uploads/{upload_id}")
+async def status_sessao_upload(upload_id: str):
+    """
+    Offset já recebido e próxima parte esperada (para retomar após queda)
+    """
+    return JSONResponse(content=await UploadSessionController.status(upload_id))
+
+
+@router.put("/uploads/{upload_id}/partes/{numero}")
+async def enviar_parte(upload_id: str, numero: int, request: Request):
+    """
+    Envia a parte `numero` (corpo binário cru, tamanho_parte bytes; só a
+    última pode ser menor). Parte fora de ordem retorna 409 com o offset recebido
+    """
+    resultado = await UploadSessionController.put_chunk(upload_id, numero, request.stream())
+    return JSONResponse(content=resultado)
+
+
+@router.post("/uploads/{upload_id}/finalizar")
+async def finalizar_upload(
+    upload_id: str,
+    request: Request,
+    perfil_ocr: Optional[str] = Query(None, description="Perfil de OCR: fast, balanced ou best"),
+    assincrono: bool = Query(False, description="Retorna um job id e processa em segundo plano"),
+    incluir_texto: bool = Query(True, description="Inclui texto_extraido na resposta (use o document_id)")
+):
+    """
+    Fecha a sessão e extrai o texto (mesma resposta de /uploadDocumento)
+    """
+    try:
+        async with cancel_scope(CancelToken(EXTRACAO_PRAZO_SEGUNDOS), request) as cancel:
+            resultado = await UploadSessionController.finalize(
+                upload_id, perfil_ocr=perfil_ocr, assincrono=assincrono, cancel=cancel
+            )
+    except OperationCancelledError as e:
+        raise to_http_exception(e, "extracao")
+    if not incluir_texto:
+        resultado.pop("texto_extraido", None)
+    if "job_id" in resultado:
+        return JSONResponse(content=resultado, status_code=202)
+    return JSONResponse(content=resultado)
+
+
+@router.delete("/uploads/{upload_id}")
+async def cancelar_upload(upload_id: str):
+    """
+    Cancela a sessão e descarta os bytes recebidos
+    """
+    return JSONResponse(content=await UploadSessionController.delete(upload_id))
+
+
 @router.post("/uploadModelo")
 async def upload_modelo(
     nome: str = Form(...),
@@ -57,7 +206,7 @@ async def listar_modelos():
     """
     try:
         from ..utils.file_handler import list_modelos
-        modelos = list_modelos()
+        modelos = await run_in("arquivos", list_modelos)
         return JSONResponse(content={"modelos": modelos})
     except Exception as e:
         logger.error(f"Erro ao listar modelos: {e}")
@@ -71,7 +220,7 @@ async def deletar_modelo(modelo_id: str):
     """
     try:
         from ..utils.file_handler import delete_modelo
-        resultado = delete_modelo(modelo_id)
+        resultado = await run_in("arquivos", delete_modelo, modelo_id)
         return JSONResponse(content=resultado)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -80,3 +229,14 @@ async def deletar_modelo(modelo_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/cache/extracao")
+async def estatisticas_cache_extracao():
+    """
+    Estatísticas do cache de extração (acertos, erros, ocupação)
+    Separadas entre o cache de documentos inteiros e o de páginas de OCR
+    """
+    from ..services.extraction_cache import extraction_cache, page_cache
+    # stats() pode varrer o diretório do cache em disco
+    documentos = await run_in("arquivos", extraction_cache.stats)
+    paginas = await run_in("arquivos", page_cache.stats)
+    return JSONResponse(content={"documentos": documentos, "paginas": paginas})
@@ -1,38 +1,51 @@
 """
 Rotas para validação de documentos
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
 from typing import Optional
 import logging
+import os
 from ..controllers.validation_controller import ValidationController
+from ..utils.cancellation import CancelToken, OperationCancelledError, cancel_scope, to_http_exception
+from ..utils.executors import run_in
 
 logger = logging.getLogger(__name__)
 
+# Prazo da validação (regras + IA); 0 desativa
+VALIDACAO_PRAZO_SEGUNDOS = float(os.getenv("VALIDACAO_PRAZO_SEGUNDOS", 180))
+
 router = APIRouter(prefix="/api", tags=["validation"])
 
 
 class ValidationRequest(BaseModel):
-    """Request body para validação"""
-    texto_documento: str
+    """Request body para validação (document_id do upload ou o texto inteiro)"""
+    document_id: Optional[str] = None
+    texto_documento: Optional[str] = None
     modelo_id: Optional[str] = "default"
     use_ai: Optional[bool] = True
 
 
 @router.post("/validar")
-async def validar(request: ValidationRequest):
+async def validar(request: ValidationRequest, http_request: Request):
     """
     Valida documento contra modelo oficial
     Retorna resultado completo da validação
+    Se o cliente desconectar ou o prazo esgotar, a chamada de IA é abandonada
     """
     try:
-        resultado = ValidationController.validate_documento(
-            texto_documento=request.texto_documento,
-            modelo_id=request.modelo_id,
-            use_ai=request.use_ai
-        )
+        async with cancel_scope(CancelToken(VALIDACAO_PRAZO_SEGUNDOS), http_request) as cancel:
+            resultado = await ValidationController.validate_documento(
+                texto_documento=request.texto_documento,
+                modelo_id=request.modelo_id,
+                use_ai=request.use_ai,
+                cancel=cancel,
+                document_id=request.document_id
+            )
         return JSONResponse(content=resultado)
+    except OperationCancelledError as e:
+        raise to_http_exception(e, "validacao")
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -41,26 +54,31 @@ async def validar(request: ValidationRequest):
 
 
 @router.post("/validar/relatorio")
-async def gerar_relatorio(request: ValidationRequest):
+async def gerar_relatorio(request: ValidationRequest, http_request: Request):
     """
     Valida documento e gera relatório PDF
     """
     try:
-        # Valida documento
-        resultado = ValidationController.validate_documento(
-            texto_documento=request.texto_documento,
-            modelo_id=request.modelo_id,
-            use_ai=request.use_ai
-        )
-        
-        # Gera relatório
-        report_path = ValidationController.generate_report(resultado)
+        async with cancel_scope(CancelToken(VALIDACAO_PRAZO_SEGUNDOS), http_request) as cancel:
+            # Valida documento
+            resultado = await ValidationController.validate_documento(
+                texto_documento=request.texto_documento,
+                modelo_id=request.modelo_id,
+                use_ai=request.use_ai,
+                cancel=cancel,
+                document_id=request.document_id
+            )
+            
+            # Gera relatório
+            report_path = await run_in("relatorio", ValidationController.generate_report, resultado)
         
         return FileResponse(
             path=str(report_path),
             filename=report_path.name,
             media_type="application/pdf"
         )
+    except OperationCancelledError as e:
+        raise to_http_exception(e, "relatorio")
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -6,6 +6,9 @@ import json
 import logging
 from typing import Dict, Optional
 
+from ..utils.cancellation import CancelToken, OperationCancelledError, check_cancel
+from ..utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 # Tenta importar diferentes clientes de IA
@@ -59,10 +62,12 @@ class AIValidator:
         else:
             logger.warning(f"Provider {self.provider} não disponível ou não configurado")
     
-    def validate(self, texto_documento: str, modelo: Dict) -> Dict:
+    def validate(self, texto_documento: str, modelo: Dict, cancel: Optional[CancelToken] = None) -> Dict:
         """
         Valida documento usando IA
         Retorna resultado estruturado
+        cancel: CancelToken; a chamada não é feita se já estiver cancelado e,
+        com prazo, o timeout da requisição HTTP é o tempo restante
         """
         if not self.client:
             logger.warning("Cliente de IA não disponível, retornando resultado vazio")
@@ -77,9 +82,17 @@ class AIValidator:
         prompt = self._build_prompt(texto_documento, modelo)
         
         try:
-            response = self._call_ai(prompt)
+            check_cancel(cancel)
+            response = self._call_ai(prompt, cancel)
             return self._parse_response(response)
+        except OperationCancelledError:
+            metrics.incr("chamadas_ia_canceladas")
+            raise
         except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                # Timeout da chamada provocado pelo prazo
+                metrics.incr("chamadas_ia_canceladas")
+                raise OperationCancelledError(cancel.motivo)
             logger.error(f"Erro ao validar com IA: {e}")
             return {
                 "atende": [],
@@ -151,8 +164,11 @@ IMPORTANTE:
 """
         return prompt
     
-    def _call_ai(self, prompt: str) -> str:
+    def _call_ai(self, prompt: str, cancel: Optional[CancelToken] = None) -> str:
         """Chama a API de IA"""
+        opcoes = {}
+        if cancel is not None and cancel.remaining() is not None:
+            opcoes["timeout"] = max(1.0, cancel.remaining())
         if self.provider == "openai" and self.client:
             response = self.client.chat.completions.create(
                 model="gpt-4o-mini",  # ou gpt-4, gpt-3.5-turbo
@@ -161,7 +177,8 @@ IMPORTANTE:
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=2000
+                max_tokens=2000,
+                **opcoes
             )
             return response.choices[0].message.content
         
@@ -173,7 +190,8 @@ IMPORTANTE:
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=2000
+                max_tokens=2000,
+                **opcoes
             )
             return response.choices[0].message.content
         
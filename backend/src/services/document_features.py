@@ -0,0 +1,179 @@
+"""
+Características do documento usadas pelas regras, extraídas uma única vez
+Valores monetários, menções de quantidade, de período e de resultados e as
+ocorrências dos termos são levantados numa passada de cada padrão
+(pré-compilado) e compartilhados por todas as regras: o custo da validação
+deixa de crescer com o número de regras.
+
+O texto chega normalizado (text_normalizer: sem acentos, casefold, espaços
+reduzidos), então os padrões são escritos nessa forma ("ultimos", "minimo").
+O resultado fica em cache por conteúdo do texto, de modo que validar e gerar
+o relatório do mesmo documento extrai as características uma vez só. O
+índice posicional (document_index) só é montado quando pedido (regras com
+proximidade) e fica junto das características em cache.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+from .document_index import DocumentIndex
+from .term_matcher import TermHits, TermMatcher
+
+# Números por extenso aceitos nas menções de quantidade e de período (normalizados)
+NUMEROS_EXTENSO = {
+    1: "um", 2: "dois", 3: "tres", 4: "quatro", 5: "cinco",
+    6: "seis", 7: "sete", 8: "oito", 9: "nove", 10: "dez",
+}
+
+# Valores como "R$ 2.500.000,00", "2.500.000" ou "2500000"
+VALOR_PADRAO = r'(?:r\$\s*)?([\d\.]+(?:\.\d{3})*(?:,\d{2})?)'
+# Menções a resultados de processos
+RESULTADOS_PADRAO = r'(resultados?|obtidos?|conduzidos?)'
+
+
+def quantidade_padrao(n: int) -> str:
+    """
+    Quantidade mínima ("5", "cinco", "pelo menos 5"...); "ao menos 5" também
+    casa pelo "5" isolado, então o mesmo padrão serve às duas formas
+    """
+    extenso = f"|{NUMEROS_EXTENSO[n]}" if n in NUMEROS_EXTENSO else ""
+    return rf'\b({n}{extenso}|pelo menos {n}|minimo de {n})\b'
+
+
+def periodo_padrao(anos: int) -> str:
+    """Janela de tempo ("últimos 5 anos", "5 anos", "cinco anos")"""
+    extenso = f"|{NUMEROS_EXTENSO[anos]}\\s*anos?" if anos in NUMEROS_EXTENSO else ""
+    return rf'(ultimos?\s*{anos}\s*anos?|{anos}\s*anos?{extenso})'
+
+
+@lru_cache(maxsize=128)
+def _regex(padrao: str) -> Pattern:
+    return re.compile(padrao)
+
+
+# Documentos (textos distintos) com características em cache
+FEATURES_CACHE_ITENS = 32
+
+
+def parse_valor(value_str: str) -> float:
+    """Converte string de valor para float (formato brasileiro: 2.500.000,00)"""
+    try:
+        # Remove espaços e caracteres especiais
+        cleaned = value_str.strip().replace("R$", "").replace("r$", "").strip()
+
+        # Se tem vírgula, assume formato brasileiro (2.500.000,00)
+        if "," in cleaned:
+            # Remove pontos (separadores de milhar) e substitui vírgula por ponto
+            cleaned = cleaned.replace(".", "").replace(",", ".")
+        else:
+            # Se não tem vírgula, pode ser formato simples (2500000) ou com pontos (2.500.000)
+            # Remove pontos e assume que são separadores de milhar
+            cleaned = cleaned.replace(".", "")
+
+        return float(cleaned)
+    except:
+        return 0.0
+
+
+class DocumentFeatures:
+    """Características extraídas do texto (normalizado) de um documento"""
+
+    def __init__(self, hits: TermHits, valores: List[Tuple[int, float]], quantidades: Dict[int, List[int]],
+                 periodos: Dict[int, List[int]], resultados: List[int], caracteres: int,
+                 indice: Optional[DocumentIndex] = None):
+        self.hits = hits
+        # (offset, valor) de cada valor monetário maior que zero
+        self.valores = valores
+        self.maior_valor = max((valor for _, valor in valores), default=0.0)
+        # Offsets de início de cada menção (quantidades e períodos: por N)
+        self.quantidades = quantidades
+        self.periodos = periodos
+        self.resultados = resultados
+        self.caracteres = caracteres
+        # Posições de tokens e frases (só quando pedido na extração)
+        self.indice = indice
+
+    def tem_valor_minimo(self, minimo: float) -> bool:
+        """Há algum valor monetário >= minimo"""
+        return self.maior_valor >= minimo
+
+    def tem_quantidade(self, n: int = 5) -> bool:
+        """Há menção à quantidade n (precisa ter sido pedida na extração)"""
+        return bool(self.quantidades[n])
+
+    def tem_periodo(self, anos: int = 5) -> bool:
+        """Há menção à janela de `anos` anos (precisa ter sido pedida na extração)"""
+        return bool(self.periodos[anos])
+
+    def valores_minimos(self, minimo: float) -> List[int]:
+        """Offsets dos valores monetários >= minimo"""
+        return [offset for offset, valor in self.valores if valor >= minimo]
+
+    @property
+    def tem_resultados(self) -> bool:
+        return bool(self.resultados)
+
+
+def extract_features(texto: str, matcher: TermMatcher, quantidades: Iterable[int] = (5,),
+                     anos: Iterable[int] = (5,), indexar: bool = False) -> DocumentFeatures:
+    """
+    Extrai as características do texto (já normalizado)
+    quantidades/anos: valores de N cujas menções ("5", "ultimos 5 anos") são levantadas
+    indexar: monta também o índice posicional (consultas de proximidade)
+    """
+    valores = []
+    # A mesma string (ex.: "." de fim de frase) aparece milhares de vezes: converte uma vez
+    convertidos: Dict[str, float] = {}
+    for m in _regex(VALOR_PADRAO).finditer(texto):
+        bruto = m.group(1)
+        valor = convertidos.get(bruto)
+        if valor is None:
+            valor = convertidos[bruto] = parse_valor(bruto)
+        if valor > 0:
+            valores.append((m.start(1), valor))
+    return DocumentFeatures(
+        hits=matcher.scan(texto),
+        valores=valores,
+        quantidades={
+            n: [m.start() for m in _regex(quantidade_padrao(n)).finditer(texto)]
+            for n in quantidades
+        },
+        periodos={
+            n: [m.start() for m in _regex(periodo_padrao(n)).finditer(texto)]
+            for n in anos
+        },
+        resultados=[m.start() for m in _regex(RESULTADOS_PADRAO).finditer(texto)],
+        caracteres=len(texto),
+        indice=DocumentIndex(texto) if indexar else None,
+    )
+
+
+_cache: "OrderedDict[Tuple, DocumentFeatures]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_document_features(texto: str, matcher: TermMatcher, quantidades: Iterable[int] = (5,),
+                          anos: Iterable[int] = (5,), indexar: bool = False) -> DocumentFeatures:
+    """Características do texto (já normalizado), do cache quando o mesmo texto já foi visto"""
+    quantidades = tuple(sorted(set(quantidades)))
+    anos = tuple(sorted(set(anos)))
+    chave = (hashlib.sha256(texto.encode("utf-8", "surrogatepass")).hexdigest(), matcher.termos, quantidades, anos)
+    with _cache_lock:
+        features = _cache.get(chave)
+        if features is not None:
+            _cache.move_to_end(chave)
+    if features is not None:
+        if indexar and features.indice is None:
+            # Extraído antes de haver regras com proximidade: completa só o índice
+            features.indice = DocumentIndex(texto)
+        return features
+
+    features = extract_features(texto, matcher, quantidades, anos, indexar)
+    with _cache_lock:
+        _cache[chave] = features
+        while len(_cache) > FEATURES_CACHE_ITENS:
+            _cache.popitem(last=False)
+    return features
@@ -0,0 +1,72 @@
+"""
+Índice posicional do documento: tokens e frases
+Guarda, em arrays compactos, o offset de início de cada token (palavra) e de
+cada frase do texto normalizado. Com ele, os offsets das ocorrências já
+levantadas (termos, valores, quantidades, períodos) viram posições em tokens
+ou em frases por busca binária, e as perguntas de proximidade ("valor >= V a
+até N tokens de 'processo judicial' e de 'securitização'") custam em função
+do número de ocorrências, não do tamanho do documento.
+"""
+import re
+from array import array
+from bisect import bisect_right
+from typing import List, Sequence, Tuple
+
+# Unidades de distância nas consultas de proximidade
+PROXIMIDADE_TOKENS = "tokens"
+PROXIMIDADE_FRASES = "frases"
+
+_TOKEN_RE = re.compile(r"\w+")
+# Fim de frase: pontuação seguida de espaço ou do fim do texto ("3.000.000,00" não quebra)
+_FIM_FRASE_RE = re.compile(r"[.!?]+(?= |$)")
+
+
+class DocumentIndex:
+    """Posições de tokens e frases do texto (normalizado)"""
+
+    def __init__(self, texto: str):
+        self.tokens = array("q", [m.start() for m in _TOKEN_RE.finditer(texto)])
+        self.frases = array("q", [0])
+        self.frases.extend(m.end() for m in _FIM_FRASE_RE.finditer(texto))
+
+    def token(self, offset: int) -> int:
+        """Posição do token que contém o offset (ou do anterior a ele)"""
+        return max(0, bisect_right(self.tokens, offset) - 1)
+
+    def frase(self, offset: int) -> int:
+        """Posição da frase que contém o offset"""
+        return bisect_right(self.frases, offset) - 1
+
+    def janela(self, grupos: Sequence[Sequence[int]], largura: int,
+               unidade: str = PROXIMIDADE_TOKENS) -> Tuple[int, int, int]:
+        """
+        Maior número de grupos com ocorrência dentro de uma mesma janela de
+        `largura` tokens (ou frases: 0 = mesma frase)
+        grupos: offsets das ocorrências de cada grupo
+        Retorna (grupos presentes, offset da primeira e da última ocorrência
+        da janela); (0, -1, -1) se nenhum grupo ocorre
+        """
+        posicao = self.token if unidade == PROXIMIDADE_TOKENS else self.frase
+        eventos: List[Tuple[int, int]] = sorted(
+            (offset, grupo) for grupo, offsets in enumerate(grupos) for offset in offsets
+        )
+        posicoes = [posicao(offset) for offset, _ in eventos]
+        contagem = [0] * len(grupos)
+        presentes = 0
+        melhor = (0, -1, -1)
+        inicio = 0
+        for fim, (offset, grupo) in enumerate(eventos):
+            if contagem[grupo] == 0:
+                presentes += 1
+            contagem[grupo] += 1
+            while posicoes[fim] - posicoes[inicio] > largura:
+                saida = eventos[inicio][1]
+                contagem[saida] -= 1
+                if contagem[saida] == 0:
+                    presentes -= 1
+                inicio += 1
+            if presentes > melhor[0]:
+                melhor = (presentes, eventos[inicio][0], offset)
+                if presentes == len(grupos):
+                    break
+        return melhor
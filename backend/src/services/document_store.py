@@ -0,0 +1,166 @@
+"""
+Armazenamento dos textos extraídos no servidor (document handles)
+O upload devolve um document_id; a validação e o relatório recebem o id em
+vez do texto inteiro, que assim não precisa ir e voltar pelo navegador.
+
+Formato em disco (DOCUMENTOS_DIR): {id}.bin com o texto comprimido em blocos
+independentes de BLOCO_CARACTERES caracteres (zlib) e {id}.json com os
+metadados e o índice dos blocos. Uma leitura por intervalo descomprime só os
+blocos que cobrem o trecho pedido.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DOCUMENTOS_DIR = os.getenv("DOCUMENTOS_DIR", "uploads/documentos")
+# Documentos sem acesso por mais tempo que isso são descartados
+DOCUMENTOS_TTL_SEGUNDOS = int(os.getenv("DOCUMENTOS_TTL_SEGUNDOS", 24 * 3600))
+# Caracteres por bloco comprimido (granularidade das leituras por intervalo)
+BLOCO_CARACTERES = 64 * 1024
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class DocumentNotFoundError(Exception):
+    """Documento inexistente ou expirado"""
+
+
+class DocumentStore:
+    """Textos extraídos comprimidos em disco, endereçados por document_id"""
+
+    def __init__(self, base_dir: Path, ttl: int = DOCUMENTOS_TTL_SEGUNDOS,
+                 bloco_caracteres: int = BLOCO_CARACTERES):
+        self.base_dir = Path(base_dir)
+        self.ttl = ttl
+        self.bloco_caracteres = bloco_caracteres
+        self._lock = threading.Lock()
+
+    def _data_path(self, document_id: str) -> Path:
+        return self.base_dir / f"{document_id}.bin"
+
+    def _meta_path(self, document_id: str) -> Path:
+        return self.base_dir / f"{document_id}.json"
+
+    def save(self, texto: str, filename: str = None, file_hash: str = None, **extra) -> Dict:
+        """Comprime e grava o texto; retorna os metadados com o document_id"""
+        self.prune()
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        document_id = uuid.uuid4().hex
+        data_path = self._data_path(document_id)
+        tmp_path = data_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        blocos = []
+        offset = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for inicio in range(0, len(texto), self.bloco_caracteres):
+                    dados = zlib.compress(texto[inicio:inicio + self.bloco_caracteres].encode("utf-8"), 6)
+                    f.write(dados)
+                    blocos.append([offset, len(dados)])
+                    offset += len(dados)
+            os.replace(tmp_path, data_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        meta = {
+            "document_id": document_id,
+            "filename": filename,
+            "file_hash": file_hash,
+            "caracteres": len(texto),
+            "bytes_comprimidos": offset,
+            "bloco_caracteres": self.bloco_caracteres,
+            "blocos": blocos,
+            "criado_em": time.time(),
+            **extra,
+        }
+        meta_tmp = self._meta_path(document_id).with_suffix(".json.tmp")
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_tmp, self._meta_path(document_id))
+        return self._public(meta)
+
+    @staticmethod
+    def _public(meta: Dict) -> Dict:
+        """Metadados sem o índice de blocos"""
+        return {chave: valor for chave, valor in meta.items() if chave != "blocos"}
+
+    def _load_meta(self, document_id: str) -> Dict:
+        if not _ID_RE.match(document_id or ""):
+            raise DocumentNotFoundError(f"Documento {document_id} não encontrado")
+        meta_path = self._meta_path(document_id)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise DocumentNotFoundError(f"Documento {document_id} não encontrado")
+        if meta_path.stat().st_mtime < time.time() - self.ttl:
+            self.delete(document_id)
+            raise DocumentNotFoundError(f"Documento {document_id} expirado")
+        # Acesso renova a validade
+        os.utime(meta_path)
+        return meta
+
+    def get(self, document_id: str) -> Dict:
+        """Metadados do documento (levanta DocumentNotFoundError)"""
+        return self._public(self._load_meta(document_id))
+
+    def read(self, document_id: str, inicio: int = 0, fim: Optional[int] = None) -> str:
+        """
+        Texto do documento entre os caracteres [inicio, fim) (fim=None: até o final)
+        Só os blocos que cobrem o intervalo são lidos e descomprimidos
+        """
+        meta = self._load_meta(document_id)
+        total = meta["caracteres"]
+        inicio = max(0, min(inicio, total))
+        fim = total if fim is None else max(inicio, min(fim, total))
+        if inicio == fim:
+            return ""
+
+        tamanho_bloco = meta["bloco_caracteres"]
+        primeiro = inicio // tamanho_bloco
+        ultimo = (fim - 1) // tamanho_bloco
+        blocos = meta["blocos"][primeiro:ultimo + 1]
+        partes = []
+        try:
+            with open(self._data_path(document_id), "rb") as f:
+                f.seek(blocos[0][0])
+                dados = f.read(blocos[-1][0] + blocos[-1][1] - blocos[0][0])
+        except FileNotFoundError:
+            raise DocumentNotFoundError(f"Documento {document_id} não encontrado")
+        base = blocos[0][0]
+        for offset, tamanho in blocos:
+            partes.append(zlib.decompress(dados[offset - base:offset - base + tamanho]).decode("utf-8"))
+        texto = "".join(partes)
+        deslocamento = primeiro * tamanho_bloco
+        return texto[inicio - deslocamento:fim - deslocamento]
+
+    def delete(self, document_id: str):
+        """Descarta o documento"""
+        self._data_path(document_id).unlink(missing_ok=True)
+        self._meta_path(document_id).unlink(missing_ok=True)
+
+    def prune(self):
+        """Remove documentos sem acesso há mais de `ttl` segundos"""
+        if not self.base_dir.exists():
+            return
+        limite = time.time() - self.ttl
+        with self._lock:
+            for meta_path in self.base_dir.glob("*.json"):
+                try:
+                    if meta_path.stat().st_mtime < limite:
+                        logger.info(f"Descartando documento expirado {meta_path.stem}")
+                        self.delete(meta_path.stem)
+                except FileNotFoundError:
+                    continue
+
+
+document_store = DocumentStore(Path(DOCUMENTOS_DIR))
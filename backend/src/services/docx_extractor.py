@@ -0,0 +1,151 @@
+"""
+Extração de texto de DOCX lendo o OOXML diretamente
+Percorre as partes XML do pacote de forma incremental (iterparse), sem montar
+o modelo de objetos do python-docx, e inclui o que o python-docx deixava de
+fora: tabelas, cabeçalhos, rodapés e notas de rodapé/fim.
+
+Ordem de leitura: cabeçalhos, corpo (parágrafos e tabelas na ordem em que
+aparecem), notas de rodapé, notas de fim e rodapés.
+"""
+import logging
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, List
+
+logger = logging.getLogger(__name__)
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_P = _W + "p"
+_T = _W + "t"
+_TAB = _W + "tab"
+_BR = _W + "br"
+_CR = _W + "cr"
+_TBL = _W + "tbl"
+_TR = _W + "tr"
+_TC = _W + "tc"
+_FOOTNOTE = _W + "footnote"
+_ENDNOTE = _W + "endnote"
+_TYPE = _W + "type"
+# Propriedades de parágrafo/trecho: as definições de tabulação (<w:tabs><w:tab>)
+# ficam aqui e não são texto
+_PROPRIEDADES = (_W + "pPr", _W + "rPr")
+
+# Separador entre células de uma linha de tabela
+SEPARADOR_CELULAS = " | "
+
+
+def _part_names(zf: zipfile.ZipFile) -> List[str]:
+    """Partes com texto, na ordem de leitura, a partir das relações do document.xml"""
+    by_type = {"header": [], "footnotes": [], "endnotes": [], "footer": []}
+    try:
+        with zf.open("word/_rels/document.xml.rels") as f:
+            for rel in ET.parse(f).getroot().iter(_REL + "Relationship"):
+                rel_type = rel.get("Type", "").rsplit("/", 1)[-1]
+                if rel_type in by_type and rel.get("TargetMode") != "External":
+                    target = posixpath.normpath(posixpath.join("word", rel.get("Target", "")))
+                    by_type[rel_type].append(target)
+    except KeyError:
+        pass
+    names = set(zf.namelist())
+    ordered = sorted(by_type["header"]) + ["word/document.xml"]
+    ordered += by_type["footnotes"] + by_type["endnotes"] + sorted(by_type["footer"])
+    return [name for name in ordered if name in names]
+
+
+def _iter_part_blocks(zf: zipfile.ZipFile, name: str) -> Iterator[str]:
+    """
+    Gera os blocos de texto de uma parte XML: um por parágrafo fora de tabela
+    e um por linha de tabela (células separadas por SEPARADOR_CELULAS)
+    Cada bloco é removido da árvore assim que emitido, mantendo a memória estável
+    """
+    stack = []          # elementos abertos (para remover blocos do pai)
+    paragraphs = []     # pilha de parágrafos abertos (caixas de texto ficam aninhadas)
+    rows = []           # pilha de células da linha atual (uma por tabela aberta)
+    cells = []          # pilha de parágrafos da célula atual
+    skip_depth = None   # profundidade da nota separadora ou das propriedades sendo ignoradas
+
+    with zf.open(name) as f:
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                stack.append(elem)
+                if skip_depth is not None:
+                    continue
+                if tag in _PROPRIEDADES:
+                    skip_depth = len(stack)
+                elif tag in (_FOOTNOTE, _ENDNOTE) and elem.get(_TYPE) in ("separator", "continuationSeparator"):
+                    skip_depth = len(stack)
+                elif tag == _P:
+                    paragraphs.append([])
+                elif tag == _TBL:
+                    rows.append([])
+                elif tag == _TC:
+                    cells.append([])
+                continue
+
+            depth = len(stack)
+            stack.pop()
+            if skip_depth is not None:
+                if depth == skip_depth:
+                    skip_depth = None
+                    if stack:
+                        stack[-1].remove(elem)
+                continue
+
+            if tag == _T and paragraphs:
+                paragraphs[-1].append(elem.text or "")
+            elif tag == _TAB and paragraphs:
+                paragraphs[-1].append("\t")
+            elif tag in (_BR, _CR) and paragraphs:
+                paragraphs[-1].append("\n")
+            elif tag == _P:
+                text = "".join(paragraphs.pop())
+                if paragraphs:
+                    # Parágrafo de caixa de texto: entra no parágrafo que a contém
+                    paragraphs[-1].append(" " + text)
+                elif cells:
+                    cells[-1].append(text)
+                elif text.strip():
+                    yield text
+            elif tag == _TC:
+                text = " ".join(t.strip() for t in cells.pop() if t.strip())
+                if rows and text:
+                    rows[-1].append(text)
+            elif tag == _TR and rows:
+                row, rows[-1] = rows[-1], []
+                if row:
+                    line = SEPARADOR_CELULAS.join(row)
+                    if cells:
+                        # Tabela aninhada: a linha vira texto da célula externa
+                        cells[-1].append(line)
+                    else:
+                        yield line
+            elif tag == _TBL and rows:
+                rows.pop()
+
+            # Blocos de nível superior (fora de tabelas) já foram emitidos
+            if tag in (_P, _TBL, _FOOTNOTE, _ENDNOTE) and not rows and not paragraphs and stack:
+                stack[-1].remove(elem)
+
+
+def iter_text_docx(path) -> Iterator[str]:
+    """Gera os blocos de texto do DOCX na ordem de leitura"""
+    with zipfile.ZipFile(path) as zf:
+        seen_headers = set()
+        for name in _part_names(zf):
+            is_repeated_part = name != "word/document.xml" and "footnotes" not in name and "endnotes" not in name
+            for block in _iter_part_blocks(zf, name):
+                # Cabeçalhos/rodapés se repetem por seção: emite cada texto uma vez
+                if is_repeated_part:
+                    if block in seen_headers:
+                        continue
+                    seen_headers.add(block)
+                yield block
+
+
+def extract_text_docx_xml(path) -> str:
+    """Extrai o texto completo do DOCX (corpo, tabelas, cabeçalhos, rodapés e notas)"""
+    return "\n".join(iter_text_docx(path))
@@ -0,0 +1,204 @@
+"""
+Cache de extração de texto endereçado por conteúdo
+Chave: SHA-256 dos bytes do arquivo + configuração do extrator
+Dois níveis: memória (LRU, limitado em bytes) na frente do disco (LRU por mtime)
+
+Há duas instâncias: uma por documento inteiro e outra por página de OCR
+(chave: impressão digital da página), que permite reaproveitar as páginas
+já vistas quando uma nova versão do dossiê é enviada
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Diretório e tamanho máximo do cache em disco (0 desativa o nível de disco)
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "cache/extracao")
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 500 * 1024 * 1024))  # 500MB padrão
+# Tamanho máximo do nível em memória (0 desativa o nível de memória)
+EXTRACTION_CACHE_MEMORIA_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MEMORIA_MAX_BYTES", 64 * 1024 * 1024))  # 64MB padrão
+
+# Cache por página de OCR
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", "cache/paginas")
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 500 * 1024 * 1024))  # 500MB padrão
+PAGE_CACHE_MEMORIA_MAX_BYTES = int(os.getenv("PAGE_CACHE_MEMORIA_MAX_BYTES", 16 * 1024 * 1024))  # 16MB padrão
+
+
+def hash_file(file_path, chunk_size: int = 1024 * 1024) -> str:
+    """Calcula o SHA-256 de um arquivo lendo em chunks"""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ExtractionCache:
+    """Cache LRU em dois níveis (memória + disco) para textos extraídos"""
+
+    def __init__(self, cache_dir: str, max_bytes: int, memory_max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None  # calculado sob demanda na primeira escrita
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits_memoria": 0,
+            "hits_disco": 0,
+            "misses": 0,
+            "escritas": 0,
+            "remocoes_disco": 0,
+        }
+
+    @staticmethod
+    def make_key(file_hash: str, config: Dict) -> str:
+        """Combina o hash do arquivo com a configuração do extrator"""
+        config_json = json.dumps(config, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{file_hash}:{config_json}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.txt.gz"
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna o texto em cache ou None"""
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits_memoria"] += 1
+                return text
+
+        text = self._read_disk(key)
+        with self._lock:
+            if text is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits_disco"] += 1
+            self._remember(key, text)
+        return text
+
+    def set(self, key: str, text: str):
+        """Guarda o texto nos dois níveis"""
+        with self._lock:
+            self._stats["escritas"] += 1
+            self._remember(key, text)
+        self._write_disk(key, text)
+
+    def _remember(self, key: str, text: str):
+        """Insere no nível de memória respeitando o limite em bytes (chamar com lock)"""
+        size = len(text)
+        if size > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = text
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        if self.max_bytes <= 0:
+            return None
+        path = self._disk_path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                text = f.read()
+            # Atualiza mtime para a ordem LRU do disco
+            os.utime(path)
+            return text
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Entrada de cache corrompida {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, text: str):
+        if self.max_bytes <= 0:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(text)
+            with self._lock:
+                # Regravação da mesma chave: conta só a diferença para o arquivo substituído
+                try:
+                    anterior = path.stat().st_size
+                except FileNotFoundError:
+                    anterior = 0
+                os.replace(tmp_path, path)
+                if self._disk_bytes is None:
+                    self._disk_bytes = self._scan_disk_bytes()
+                else:
+                    self._disk_bytes += path.stat().st_size - anterior
+                if self._disk_bytes > self.max_bytes:
+                    self._evict_disk()
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de extração: {e}")
+
+    def _scan_disk_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.cache_dir.glob("*/*.txt.gz"))
+
+    def _evict_disk(self):
+        """Remove as entradas menos usadas até voltar a 90% do limite (chamar com lock)"""
+        entries = []
+        for p in self.cache_dir.glob("*/*.txt.gz"):
+            try:
+                st = p.stat()
+                entries.append((st.st_mtime, st.st_size, p))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+                total -= size
+                self._stats["remocoes_disco"] += 1
+            except FileNotFoundError:
+                continue
+        self._disk_bytes = total
+
+    def stats(self) -> Dict:
+        """Contadores de acertos/erros e ocupação do cache"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["itens_memoria"] = len(self._memory)
+            stats["bytes_memoria"] = self._memory_bytes
+            stats["bytes_disco"] = self._disk_bytes if self._disk_bytes is not None else self._scan_disk_bytes_safe()
+            total = stats["hits_memoria"] + stats["hits_disco"] + stats["misses"]
+            stats["taxa_acerto"] = round((stats["hits_memoria"] + stats["hits_disco"]) / total, 4) if total else 0.0
+        return stats
+
+    def _scan_disk_bytes_safe(self) -> int:
+        try:
+            return self._scan_disk_bytes()
+        except Exception:
+            return 0
+
+
+extraction_cache = ExtractionCache(
+    EXTRACTION_CACHE_DIR,
+    EXTRACTION_CACHE_MAX_BYTES,
+    EXTRACTION_CACHE_MEMORIA_MAX_BYTES,
+)
+
+page_cache = ExtractionCache(
+    PAGE_CACHE_DIR,
+    PAGE_CACHE_MAX_BYTES,
+    PAGE_CACHE_MEMORIA_MAX_BYTES,
+)
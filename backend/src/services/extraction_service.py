@@ -1,14 +1,103 @@
 import os
-from .ocr_service import extract_text_pdf, extract_text_docx
+import logging
+import time
+from typing import Callable, Dict, Iterator
+from .ocr_service import extract_text_pdf, extract_text_docx, get_extraction_config, iter_text_pdf
+from .extraction_cache import extraction_cache, hash_file
+from ..utils.cancellation import CancelToken, check_cancel
+
+logger = logging.getLogger(__name__)
 
-def extract_text(file_path: str, filename: str) -> str:
-    ext = os.path.splitext(filename)[1].lower()
 
+def _extract_text_uncached(file_path: str, ext: str, perfil_ocr: str = None, backend_texto: str = None,
+                           on_page: Callable = None, cancel: CancelToken = None) -> str:
+    check_cancel(cancel)
     if ext == ".pdf":
-        return extract_text_pdf(file_path)
+        return extract_text_pdf(file_path, perfil_ocr, backend_texto, on_page, cancel)
 
     elif ext == ".docx":
         return extract_text_docx(file_path)
 
     else:
         return ""
+
+
+def _cache_key(file_path: str, ext: str, file_hash: str = None,
+               perfil_ocr: str = None, backend_texto: str = None) -> str:
+    return extraction_cache.make_key(
+        file_hash or hash_file(file_path),
+        {"ext": ext, **get_extraction_config(perfil_ocr, backend_texto)},
+    )
+
+
+def extract_text(file_path: str, filename: str, file_hash: str = None,
+                 perfil_ocr: str = None, backend_texto: str = None, on_page: Callable = None,
+                 cancel: CancelToken = None) -> str:
+    """
+    Extrai o texto de um PDF/DOCX, passando pelo cache de extração
+    on_page: chamado com cada página de PDF extraída (não é chamado em acertos do cache)
+    cancel: CancelToken; se acionado, levanta OperationCancelledError (nada vai para o cache)
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in (".pdf", ".docx"):
+        return ""
+
+    # Cache endereçado por conteúdo: mesmo arquivo + mesma configuração
+    key = _cache_key(file_path, ext, file_hash, perfil_ocr, backend_texto)
+    text = extraction_cache.get(key)
+    if text is not None:
+        logger.info(f"Texto de {filename} obtido do cache de extração")
+        return text
+
+    text = _extract_text_uncached(file_path, ext, perfil_ocr, backend_texto, on_page, cancel)
+    # Não guarda resultados vazios (podem ser falhas transitórias do OCR)
+    if text and text.strip():
+        extraction_cache.set(key, text)
+    return text
+
+
+def iter_extract_text(file_path: str, filename: str, file_hash: str = None,
+                      perfil_ocr: str = None, backend_texto: str = None,
+                      cancel: CancelToken = None) -> Iterator[Dict]:
+    """
+    Versão incremental de extract_text: gera um evento por página de PDF assim
+    que ela fica pronta ({"evento": "pagina", "pagina", "metodo", "texto",
+    "tempo_ms", "decorrido_ms", ...}). DOCX e documentos já no cache geram um
+    único evento "documento" com o texto inteiro.
+    Ao final o texto completo vai para o cache de extração, como em extract_text
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in (".pdf", ".docx"):
+        return
+
+    inicio = time.perf_counter()
+    key = _cache_key(file_path, ext, file_hash, perfil_ocr, backend_texto)
+    text = extraction_cache.get(key)
+    if text is not None:
+        elapsed = round((time.perf_counter() - inicio) * 1000, 1)
+        yield {"evento": "documento", "metodo": "cache", "texto": text, "tempo_ms": elapsed, "decorrido_ms": elapsed}
+        return
+
+    check_cancel(cancel)
+    if ext == ".docx":
+        text = extract_text_docx(file_path)
+        elapsed = round((time.perf_counter() - inicio) * 1000, 1)
+        yield {"evento": "documento", "metodo": "docx", "texto": text, "tempo_ms": elapsed, "decorrido_ms": elapsed}
+    else:
+        pages = []
+        anterior = inicio
+        for page in iter_text_pdf(file_path, perfil_ocr, backend_texto, cancel):
+            agora = time.perf_counter()
+            pages.append(page)
+            yield dict(
+                page,
+                evento="pagina",
+                tempo_ms=round((agora - anterior) * 1000, 1),
+                decorrido_ms=round((agora - inicio) * 1000, 1),
+            )
+            anterior = agora
+        pages.sort(key=lambda p: p["pagina"])
+        text = "\n".join(p["texto"] for p in pages).strip()
+
+    if text and text.strip():
+        extraction_cache.set(key, text)
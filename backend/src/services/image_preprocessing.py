@@ -0,0 +1,92 @@
+"""
+Pré-processamento barato de páginas escaneadas antes do OCR
+(escala de cinza, binarização de Otsu e correção de inclinação)
+Usa apenas o Pillow para não adicionar dependências
+"""
+import os
+from typing import List, Tuple
+
+from PIL import Image
+
+# Inclinação máxima (em graus) procurada na correção de inclinação
+OCR_DESKEW_MAX_GRAUS = float(os.getenv("OCR_DESKEW_MAX_GRAUS", 3.0))
+OCR_DESKEW_PASSO_GRAUS = 0.5
+
+# Largura da miniatura usada para estimar a inclinação
+_DESKEW_THUMB_WIDTH = 600
+
+
+def otsu_threshold(histogram: List[int]) -> int:
+    """Limiar de Otsu a partir do histograma de uma imagem em escala de cinza"""
+    total = sum(histogram)
+    if total == 0:
+        return 128
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg = 0.0
+    weight_bg = 0
+    best_threshold, best_variance = 128, -1.0
+    for i, h in enumerate(histogram):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_variance, best_threshold = variance, i
+    return best_threshold
+
+
+def binarize(img: Image.Image) -> Tuple[Image.Image, float]:
+    """
+    Binariza a página (preto/branco) com o limiar de Otsu
+    Retorna a imagem e a fração de pixels escuros ("tinta")
+    """
+    gray = img.convert("L")
+    histogram = gray.histogram()
+    threshold = otsu_threshold(histogram)
+    total = sum(histogram) or 1
+    ink_ratio = sum(histogram[:threshold + 1]) / total
+    return gray.point(lambda p: 0 if p <= threshold else 255), ink_ratio
+
+
+def _row_profile_score(img: Image.Image) -> float:
+    """Variância das médias por linha: máxima quando as linhas de texto estão alinhadas"""
+    # Reduzir para largura 1 com filtro BOX calcula a média de cada linha
+    rows = list(img.resize((1, img.height), Image.BOX).getdata())
+    mean = sum(rows) / len(rows)
+    return sum((r - mean) ** 2 for r in rows) / len(rows)
+
+
+def estimate_skew(img: Image.Image) -> float:
+    """Estima a inclinação (em graus) pelo perfil de projeção horizontal"""
+    if OCR_DESKEW_MAX_GRAUS <= 0 or img.width == 0:
+        return 0.0
+    scale = min(1.0, _DESKEW_THUMB_WIDTH / img.width)
+    thumb = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+    steps = int(OCR_DESKEW_MAX_GRAUS / OCR_DESKEW_PASSO_GRAUS)
+    best_angle, best_score = 0.0, _row_profile_score(thumb)
+    for i in range(-steps, steps + 1):
+        angle = i * OCR_DESKEW_PASSO_GRAUS
+        if angle == 0:
+            continue
+        score = _row_profile_score(thumb.rotate(angle, fillcolor=255))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def preprocess_page(img: Image.Image) -> Tuple[Image.Image, float]:
+    """
+    Prepara a página para o OCR: escala de cinza, binarização e correção de inclinação
+    Retorna a imagem processada e a fração de tinta da página
+    """
+    binary, ink_ratio = binarize(img)
+    angle = estimate_skew(binary)
+    if angle:
+        binary = binary.rotate(angle, fillcolor=255)
+    return binary, ink_ratio
@@ -0,0 +1,219 @@
+"""
+Jobs de processamento em segundo plano
+O upload é gravado em disco na própria requisição e a extração vai para uma
+fila em memória (limitada), consumida por um número configurável de workers.
+O cliente recebe um job id na hora e acompanha o andamento por polling em
+/api/jobs/{id}: status, progresso por etapa e, ao final, o resultado.
+Cada job tem um prazo (JOBS_PRAZO_SEGUNDOS) e pode ser cancelado; o
+cancelamento chega às páginas de OCR ainda não processadas.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from ..utils.cancellation import MOTIVO_PRAZO, CancelToken, OperationCancelledError, cancel_scope
+from ..utils.executors import cliente_atual
+from ..utils.metrics import record_cancellation
+
+logger = logging.getLogger(__name__)
+
+# Workers que consomem a fila (jobs processados simultaneamente)
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", 2))
+# Tamanho máximo da fila de espera (acima disso o envio é recusado)
+JOBS_FILA_MAX = int(os.getenv("JOBS_FILA_MAX", 100))
+# Tempo que um job concluído fica disponível para consulta
+JOBS_TTL_SEGUNDOS = int(os.getenv("JOBS_TTL_SEGUNDOS", 3600))
+# Prazo de execução de um job, contado a partir do início do processamento (0 desativa)
+JOBS_PRAZO_SEGUNDOS = float(os.getenv("JOBS_PRAZO_SEGUNDOS", 3600))
+
+STATUS_NA_FILA = "na_fila"
+STATUS_PROCESSANDO = "processando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+STATUS_CANCELADO = "cancelado"
+
+
+class JobQueueFullError(Exception):
+    """A fila de jobs está cheia"""
+
+
+class Job:
+    """Estado de um job (atualizado pelo worker, lido pelas consultas)"""
+
+    def __init__(self, tipo: str, etapas, cliente: str = "anonimo"):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.cliente = cliente
+        self.status = STATUS_NA_FILA
+        self.criado_em = time.time()
+        self.iniciado_em = None
+        self.concluido_em = None
+        self.etapas = {nome: {"status": "pendente"} for nome in etapas}
+        self.resultado = None
+        self.erro = None
+        # Sinal de cancelamento repassado ao trabalho (DELETE /api/jobs/{id} ou prazo)
+        self.cancel = CancelToken()
+        self._lock = threading.Lock()
+
+    def set_stage(self, nome: str, status: str, **progresso):
+        """Atualiza o status (e campos de progresso) de uma etapa"""
+        with self._lock:
+            etapa = self.etapas.setdefault(nome, {})
+            etapa["status"] = status
+            etapa.update(progresso)
+
+    def update_stage(self, nome: str, **progresso):
+        """Atualiza campos de progresso de uma etapa sem mudar o status"""
+        with self._lock:
+            self.etapas.setdefault(nome, {"status": "processando"}).update(progresso)
+
+    def increment_stage(self, nome: str, campo: str, valor: int = 1):
+        """Soma `valor` a um contador de progresso da etapa (seguro entre threads)"""
+        with self._lock:
+            etapa = self.etapas.setdefault(nome, {"status": "processando"})
+            etapa[campo] = etapa.get(campo, 0) + valor
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            data = {
+                "job_id": self.id,
+                "tipo": self.tipo,
+                "status": self.status,
+                "criado_em": self.criado_em,
+                "iniciado_em": self.iniciado_em,
+                "concluido_em": self.concluido_em,
+                "etapas": {nome: dict(etapa) for nome, etapa in self.etapas.items()},
+            }
+        if self.status == STATUS_CONCLUIDO:
+            data["resultado"] = self.resultado
+        if self.status in (STATUS_ERRO, STATUS_CANCELADO):
+            data["erro"] = self.erro
+        return data
+
+
+class JobManager:
+    """Fila limitada de jobs consumida por workers assíncronos"""
+
+    def __init__(self, workers: int = JOBS_WORKERS, queue_size: int = JOBS_FILA_MAX,
+                 ttl: int = JOBS_TTL_SEGUNDOS):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    async def start(self):
+        """Cria a fila e os workers (no event loop da aplicação)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Fila de jobs pronta ({self.workers} workers, até {self.queue_size} na fila)")
+
+    async def shutdown(self):
+        """Interrompe os workers (jobs ainda na fila são descartados)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    async def submit(self, tipo: str, etapas, work: Callable[[Job], Awaitable[Dict]]) -> Job:
+        """
+        Enfileira um job; `work(job)` é executado por um worker e retorna o resultado
+        Levanta JobQueueFullError se a fila estiver cheia
+        """
+        await self.start()
+        self._prune()
+        job = Job(tipo, etapas, cliente_atual.get())
+        try:
+            self._queue.put_nowait((job, work))
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"Fila de jobs cheia ({self.queue_size} aguardando)")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancela um job na fila ou em processamento (None se não existir)
+        Um job na fila é descartado quando chegar a vez; um em processamento
+        para na próxima verificação (próxima página ou chamada)
+        """
+        job = self.get(job_id)
+        if job is not None and job.concluido_em is None:
+            job.cancel.cancel()
+        return job
+
+    def stats(self) -> Dict:
+        """Contagem de jobs por status e ocupação da fila"""
+        por_status = {}
+        for job in list(self._jobs.values()):
+            por_status[job.status] = por_status.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "fila": self._queue.qsize() if self._queue is not None else 0,
+            "fila_max": self.queue_size,
+            "jobs": por_status,
+        }
+
+    def _prune(self):
+        """Esquece jobs concluídos há mais de `ttl` segundos"""
+        limite = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.concluido_em is not None and job.concluido_em < limite:
+                self._jobs.pop(job_id, None)
+
+    async def _worker(self, index: int):
+        while True:
+            job, work = await self._queue.get()
+            job.status = STATUS_PROCESSANDO
+            job.iniciado_em = time.time()
+            job.cancel.set_deadline(JOBS_PRAZO_SEGUNDOS)
+            # O trabalho entra nas raias do agendador em nome de quem enviou o job
+            token = cliente_atual.set(job.cliente)
+            try:
+                # Interrompe o trabalho (inclusive esperas por orçamento e vaga) ao cancelar
+                async with cancel_scope(job.cancel):
+                    job.cancel.check()
+                    job.resultado = await work(job)
+                job.status = STATUS_CONCLUIDO
+            except OperationCancelledError as e:
+                record_cancellation("job", e.motivo)
+                logger.info(f"Job {job.id} ({job.tipo}) cancelado: {e.motivo}")
+                job.erro = {"status_code": 504 if e.motivo == MOTIVO_PRAZO else 499, "detail": str(e)}
+                job.status = STATUS_CANCELADO
+            except asyncio.CancelledError:
+                job.erro = {"status_code": 503, "detail": "Processamento interrompido"}
+                job.status = STATUS_ERRO
+                raise
+            except Exception as e:
+                # HTTPException dos controllers traz status_code e detail
+                status_code = getattr(e, "status_code", 500)
+                detail = getattr(e, "detail", None) or str(e)
+                logger.error(f"Erro no job {job.id} ({job.tipo}): {detail}")
+                job.erro = {"status_code": status_code, "detail": detail}
+                job.status = STATUS_ERRO
+            finally:
+                cliente_atual.reset(token)
+                job.concluido_em = time.time()
+                self._queue.task_done()
+
+
+_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """Gerenciador de jobs compartilhado pela aplicação"""
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
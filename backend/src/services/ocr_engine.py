@@ -0,0 +1,432 @@
+"""
+Motor de OCR com workers persistentes
+Cada processo do pool mantém uma instância do Tesseract com os modelos de
+idioma já carregados (via tesserocr, quando instalado). Sem tesserocr, os
+workers usam o pytesseract, que continua criando um processo por página.
+
+O total de threads do Tesseract (OpenMP) em uso por todas as requisições
+simultâneas é limitado por um orçamento de CPU (OCR_THREADS_TOTAL), evitando
+que várias extrações ao mesmo tempo disputem os mesmos núcleos.
+"""
+import os
+
+# O OpenMP lê o limite de threads ao carregar a biblioteca: sem isso, cada
+# Tesseract usa todos os núcleos e N páginas em paralelo criam N x núcleos
+# threads. O paralelismo passa a ser controlado pelo orçamento de CPU abaixo
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+import pytesseract
+import platform
+import shlex
+import shutil
+import logging
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .image_preprocessing import binarize, preprocess_page
+from ..utils.cancellation import CancelToken, check_cancel
+
+logger = logging.getLogger(__name__)
+
+# tesserocr é opcional: liga a API C do Tesseract direto ao processo Python
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Número de processos usados no OCR paralelo das páginas escaneadas
+# Padrão: número de núcleos da máquina. Use OCR_WORKERS=1 para OCR sequencial
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+
+# Orçamento de CPU do OCR: total de threads do Tesseract somando todas as
+# requisições simultâneas. Padrão: número de núcleos
+OCR_THREADS_TOTAL = int(os.getenv("OCR_THREADS_TOTAL", os.cpu_count() or 1))
+# Máximo de threads do Tesseract numa mesma página (o ganho do OpenMP do
+# Tesseract satura por volta de 4 threads)
+OCR_THREADS_POR_PAGINA_MAX = int(os.getenv("OCR_THREADS_POR_PAGINA_MAX", 4))
+
+# Perfis de OCR: variante do modelo (tessdata fast/best/padrão), modo de
+# segmentação de página (psm) e idiomas. "fallback" é o perfil, mais preciso,
+# usado para refazer páginas com confiança baixa ou quase sem texto
+OCR_PERFIS = {
+    "fast": {"modelo": "fast", "psm": 6, "idiomas": "por", "fallback": "best"},
+    "balanced": {"modelo": "padrao", "psm": 3, "idiomas": None, "fallback": "best"},
+    "best": {"modelo": "best", "psm": 3, "idiomas": None, "fallback": None},
+}
+# Perfil usado quando a requisição não escolhe um
+OCR_PERFIL = os.getenv("OCR_PERFIL", "balanced")
+# Diretórios com os modelos tessdata_fast e tessdata_best (opcionais). Se não
+# configurados, o perfil usa os modelos padrão instalados com o Tesseract
+TESSDATA_DIRS = {
+    "fast": os.getenv("TESSDATA_FAST_DIR"),
+    "best": os.getenv("TESSDATA_BEST_DIR"),
+}
+
+# Páginas com menos caracteres que isso contam como "quase sem texto"
+OCR_POUCO_TEXTO = 20
+
+# Detecção automática do caminho do Tesseract
+def _find_tesseract():
+    """Encontra o caminho do Tesseract automaticamente"""
+    # Verifica se já está no PATH
+    tesseract_path = shutil.which("tesseract")
+    if tesseract_path:
+        return tesseract_path
+    
+    # Caminhos comuns no Windows
+    if platform.system() == "Windows":
+        common_paths = [
+            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+            r"C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe".format(os.getenv("USERNAME", "")),
+        ]
+        for path in common_paths:
+            if os.path.exists(path):
+                return path
+    
+    # Linux/macOS - geralmente está no PATH, mas tenta alguns caminhos comuns
+    elif platform.system() in ["Linux", "Darwin"]:
+        common_paths = [
+            "/usr/bin/tesseract",
+            "/usr/local/bin/tesseract",
+            "/opt/homebrew/bin/tesseract",  # macOS Apple Silicon
+        ]
+        for path in common_paths:
+            if os.path.exists(path):
+                return path
+    
+    # Se não encontrou, retorna None e o pytesseract tentará usar o PATH
+    return None
+
+# Configura o caminho do Tesseract se encontrado
+tesseract_path = _find_tesseract()
+if tesseract_path:
+    pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+
+def detect_languages() -> List[str]:
+    """Idiomas instalados no Tesseract (lista vazia se não for possível consultar)"""
+    try:
+        if TESSEROCR_AVAILABLE:
+            _, available_langs = tesserocr.get_languages()
+        else:
+            available_langs = pytesseract.get_languages()
+        return list(available_langs)
+    except Exception:
+        return []
+
+
+def _default_lang(available_langs: List[str]) -> str:
+    """Idioma do OCR: português + inglês, ou só inglês se 'por' não estiver instalado"""
+    if 'por' not in available_langs:
+        return 'eng'  # Se português não disponível, usa inglês
+    return 'por+eng'  # Português + Inglês como fallback
+
+
+# Estado de cada processo worker (inicializado uma vez por processo)
+# Uma instância do Tesseract por combinação de idioma/modelo/psm
+_worker_apis: Dict[Tuple, object] = {}
+
+
+def _profile_key(profile: Dict) -> Tuple:
+    return (profile["idiomas"], profile["tessdata"], profile["psm"])
+
+
+def _get_worker_api(profile: Dict):
+    """Retorna (criando na primeira vez) a instância do tesserocr para o perfil"""
+    if not TESSEROCR_AVAILABLE:
+        return None
+    key = _profile_key(profile)
+    if key not in _worker_apis:
+        try:
+            kwargs = {"lang": profile["idiomas"], "psm": profile["psm"]}
+            if profile["tessdata"]:
+                kwargs["path"] = profile["tessdata"]
+            _worker_apis[key] = tesserocr.PyTessBaseAPI(**kwargs)
+        except Exception as e:
+            logger.warning(f"tesserocr indisponível no worker, usando pytesseract: {e}")
+            _worker_apis[key] = None
+    return _worker_apis[key]
+
+
+def _init_worker(profile: Dict):
+    """Carrega o Tesseract e os modelos do perfil padrão uma única vez por processo"""
+    _get_worker_api(profile)
+
+
+def _text_from_data(data: Dict) -> Tuple[str, List[float]]:
+    """
+    Remonta o texto a partir da saída de image_to_data (uma linha por linha
+    do Tesseract, parágrafos separados por linha em branco) e devolve as
+    confianças por palavra
+    """
+    lines, confidences = [], []
+    current_key, current_words, last_par = None, [], None
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if conf < 0 or not word.strip():
+            continue
+        confidences.append(conf)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if key != current_key:
+            if current_words:
+                lines.append(" ".join(current_words))
+            if last_par is not None and key[:2] != last_par:
+                lines.append("")
+            current_key, current_words, last_par = key, [], key[:2]
+        current_words.append(word)
+    if current_words:
+        lines.append(" ".join(current_words))
+    return "\n".join(lines), confidences
+
+
+def _pytesseract_config(profile: Dict) -> str:
+    config = f"--psm {profile['psm']}"
+    if profile["tessdata"]:
+        config += f' --tessdata-dir "{profile["tessdata"]}"'
+    return config
+
+
+def _tesseract_data(page: Image.Image, profile: Dict, threads: int) -> Dict:
+    """
+    Equivale ao pytesseract.image_to_data (saída em dict), com o limite de
+    threads do OpenMP só no ambiente deste subprocesso do Tesseract
+    O pytesseract repassa o os.environ inteiro; alterá-lo por página afetaria
+    as outras threads do processo (fallback sequencial, no servidor) e todo
+    subprocesso criado depois
+    """
+    with tempfile.TemporaryDirectory(prefix="tess_") as tmp_dir:
+        entrada = os.path.join(tmp_dir, "pagina.png")
+        saida = os.path.join(tmp_dir, "saida")
+        page.save(entrada, format="PNG")
+        cmd = [pytesseract.pytesseract.tesseract_cmd, entrada, saida, "-l", profile["idiomas"],
+               "-c", "tessedit_create_tsv=1"]
+        cmd += shlex.split(_pytesseract_config(profile), posix=platform.system() != "Windows")
+        env = dict(os.environ, OMP_THREAD_LIMIT=str(threads))
+        try:
+            proc = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True, env=env)
+        except FileNotFoundError:
+            raise pytesseract.TesseractNotFoundError()
+        if proc.returncode:
+            raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode("utf-8", "replace").strip())
+        with open(f"{saida}.tsv", "r", encoding="utf-8") as f:
+            tsv = f.read()
+    return pytesseract.pytesseract.file_to_dict(tsv, "\t", -1)
+
+
+def _ocr_page(image_path: str, preprocess: bool, profile: Dict, threads: int = 1) -> Optional[Dict]:
+    """
+    Executa OCR em uma página já rasterizada em disco
+    threads: threads do Tesseract para esta página (só se aplica ao pytesseract;
+    com tesserocr o limite é fixado em 1 quando o processo sobe)
+    Retorna {"texto", "confianca", "tinta"} ou None se a página falhar.
+    "confianca" é a média das confianças por palavra (None se não há palavras)
+    e "tinta" a fração de pixels escuros (só calculada quando necessária)
+    """
+    try:
+        with Image.open(image_path) as img:
+            ink_ratio = None
+            if preprocess:
+                page, ink_ratio = preprocess_page(img)
+            else:
+                page = img.convert("L")
+
+            api = _get_worker_api(profile)
+            if api is not None:
+                api.SetImage(page)
+                text = api.GetUTF8Text()
+                confidences = [float(c) for c in api.AllWordConfidences()]
+            else:
+                data = _tesseract_data(page, profile, threads)
+                text, confidences = _text_from_data(data)
+
+            if ink_ratio is None and (not confidences or len(text.strip()) < OCR_POUCO_TEXTO):
+                # Pouco texto: mede a tinta para distinguir página em branco de página ilegível
+                _, ink_ratio = binarize(page)
+
+        confidence = sum(confidences) / len(confidences) if confidences else None
+        return {"texto": text, "confianca": confidence, "tinta": ink_ratio}
+    except Exception:
+        return None
+
+
+class CpuBudget:
+    """
+    Orçamento de threads de OCR compartilhado por todas as requisições
+    Cada página reserva as threads que vai usar antes de ir para o pool e as
+    devolve ao terminar; quem não encontra threads livres espera a vez
+    """
+
+    def __init__(self, total: int):
+        self.total = max(1, total)
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, threads: int, cancel: Optional[CancelToken] = None) -> int:
+        threads = max(1, min(threads, self.total))
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._in_use + threads > self.total:
+                    # Com token, acorda periodicamente para desistir se cancelado
+                    self._cond.wait(timeout=0.5 if cancel is not None else None)
+                    check_cancel(cancel)
+                self._in_use += threads
+            finally:
+                self._waiting -= 1
+        return threads
+
+    def release(self, threads: int):
+        with self._cond:
+            self._in_use -= threads
+            self._cond.notify_all()
+
+    def plan(self, pages: int) -> int:
+        """
+        Decide quantas threads usar por página
+        Muitas páginas (ou máquina ocupada): várias páginas de 1 thread em
+        paralelo, que escala melhor. Poucas páginas com núcleos sobrando:
+        menos páginas, cada uma com mais threads
+        """
+        with self._cond:
+            free = self.total - self._in_use
+            busy = self._waiting > 0
+        if busy or pages >= free:
+            return 1
+        return max(1, min(OCR_THREADS_POR_PAGINA_MAX, free // max(1, pages)))
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {"threads_total": self.total, "threads_em_uso": self._in_use, "paginas_aguardando": self._waiting}
+
+
+class OCREngine:
+    """Pool de workers de OCR de longa duração"""
+
+    def __init__(self, workers: int = OCR_WORKERS, threads_total: int = OCR_THREADS_TOTAL):
+        self.workers = max(1, workers)
+        self.budget = CpuBudget(threads_total)
+        # Idiomas detectados uma única vez, na criação do motor
+        self.available_langs = detect_languages()
+        self.lang = _default_lang(self.available_langs)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.profile(OCR_PERFIL),),
+                )
+            return self._pool
+
+    def start(self):
+        """Sobe os workers antecipadamente (carrega os modelos antes do 1º documento)"""
+        pool = self._get_pool()
+        for future in [pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        """Encerra os workers"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def profile(self, name: Optional[str] = None) -> Dict:
+        """
+        Resolve um perfil de OCR para os parâmetros concretos do Tesseract
+        (idiomas instalados, diretório de modelos, psm)
+        """
+        name = name or OCR_PERFIL
+        if name not in OCR_PERFIS:
+            raise ValueError(f"Perfil de OCR desconhecido: {name}. Use: {', '.join(OCR_PERFIS)}")
+        spec = OCR_PERFIS[name]
+        lang = self.lang
+        if spec["idiomas"]:
+            lang = spec["idiomas"] if spec["idiomas"] in self.available_langs else 'eng'
+        return {
+            "nome": name,
+            "idiomas": lang,
+            "tessdata": TESSDATA_DIRS.get(spec["modelo"]),
+            "psm": spec["psm"],
+            "fallback": spec["fallback"],
+        }
+
+    def ocr_pages(self, image_paths: List[str], preprocess: bool = False,
+                  profile: Optional[Dict] = None, cancel: Optional[CancelToken] = None) -> List[Optional[Dict]]:
+        """
+        Executa OCR nas páginas usando os workers persistentes
+        O resultado mantém a ordem das páginas; páginas com falha voltam como None
+        Se `cancel` for acionado, páginas ainda não iniciadas são retiradas do
+        pool e OperationCancelledError é levantada (as páginas em andamento
+        terminam nos workers, mas o resultado é descartado)
+        """
+        if not image_paths:
+            return []
+        profile = profile or self.profile()
+        # Workers do tesserocr têm o OpenMP fixo em 1 thread
+        threads = 1 if TESSEROCR_AVAILABLE else self.budget.plan(len(image_paths))
+        pool = self._get_pool()
+        futures = []
+        try:
+            for image_path in image_paths:
+                check_cancel(cancel)
+                # Só envia a página ao pool quando houver threads livres no orçamento
+                reserved = self.budget.acquire(threads, cancel)
+                try:
+                    future = pool.submit(_ocr_page, image_path, preprocess, profile, reserved)
+                except BaseException:
+                    self.budget.release(reserved)
+                    raise
+                future.add_done_callback(lambda _, n=reserved: self.budget.release(n))
+                futures.append(future)
+            if cancel is not None:
+                pending = set(futures)
+                while pending:
+                    _, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    check_cancel(cancel)
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            # Um processo filho morreu (ex.: falta de memória): refaz sequencialmente
+            logger.warning("Pool de OCR quebrado; refazendo OCR sequencialmente")
+            for future in futures:
+                future.cancel()
+            self.shutdown()
+            results = []
+            for image_path in image_paths:
+                check_cancel(cancel)
+                reserved = self.budget.acquire(1, cancel)
+                try:
+                    results.append(_ocr_page(image_path, preprocess, profile, reserved))
+                finally:
+                    self.budget.release(reserved)
+            return results
+        except BaseException:
+            # Cancelamento (ou outro erro): não deixa páginas órfãs na fila do pool
+            for future in futures:
+                future.cancel()
+            raise
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> OCREngine:
+    """Retorna o motor de OCR compartilhado pelo processo"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = OCREngine()
+        return _engine
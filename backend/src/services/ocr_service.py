@@ -1,93 +1,313 @@
-import pytesseract
-from pdf2image import convert_from_path
-import pdfplumber
+from pdf2image import convert_from_path, pdfinfo_from_path
 import docx
 import os
-import platform
-import shutil
-
-# Detecção automática do caminho do Tesseract
-def _find_tesseract():
-    """Encontra o caminho do Tesseract automaticamente"""
-    # Verifica se já está no PATH
-    tesseract_path = shutil.which("tesseract")
-    if tesseract_path:
-        return tesseract_path
-    
-    # Caminhos comuns no Windows
-    if platform.system() == "Windows":
-        common_paths = [
-            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-            r"C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe".format(os.getenv("USERNAME", "")),
-        ]
-        for path in common_paths:
-            if os.path.exists(path):
-                return path
-    
-    # Linux/macOS - geralmente está no PATH, mas tenta alguns caminhos comuns
-    elif platform.system() in ["Linux", "Darwin"]:
-        common_paths = [
-            "/usr/bin/tesseract",
-            "/usr/local/bin/tesseract",
-            "/opt/homebrew/bin/tesseract",  # macOS Apple Silicon
-        ]
-        for path in common_paths:
-            if os.path.exists(path):
-                return path
-    
-    # Se não encontrou, retorna None e o pytesseract tentará usar o PATH
-    return None
-
-# Configura o caminho do Tesseract se encontrado
-tesseract_path = _find_tesseract()
-if tesseract_path:
-    pytesseract.pytesseract.tesseract_cmd = tesseract_path
-
-
-def extract_text_pdf(path):
-    """Extrai texto de PDF (combina pdfplumber e Tesseract)."""
-    # Tenta extrair texto direto (PDF digital)
+import json
+import logging
+import tempfile
+import xml.etree.ElementTree as ET
+from .docx_extractor import extract_text_docx_xml
+from .extraction_cache import page_cache, hash_file
+from .ocr_engine import OCR_WORKERS, OCR_PERFIL, OCR_POUCO_TEXTO, get_engine
+from .pdf_text_extractors import get_text_extractor
+from ..utils.cancellation import OperationCancelledError, check_cancel
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Resolução usada para rasterizar as páginas escaneadas
+OCR_DPI = int(os.getenv("OCR_DPI", 300))
+
+# OCR adaptativo: a primeira passada rasteriza em OCR_DPI_BAIXO e pré-processa
+# a página (binarização + correção de inclinação); só as páginas com confiança
+# média abaixo de OCR_CONFIANCA_MINIMA são refeitas em OCR_DPI
+OCR_ADAPTATIVO = os.getenv("OCR_ADAPTATIVO", "true").lower() == "true"
+OCR_DPI_BAIXO = int(os.getenv("OCR_DPI_BAIXO", 200))
+OCR_CONFIANCA_MINIMA = float(os.getenv("OCR_CONFIANCA_MINIMA", 75))
+# Páginas sem palavras e com menos tinta que isso são consideradas em branco
+OCR_TINTA_MINIMA = 0.005
+
+# Quantidade de páginas rasterizadas por vez. Cada janela é gravada em disco
+# (escala de cinza), processada e apagada antes da próxima, de modo que o uso
+# de memória não depende do número de páginas do arquivo
+OCR_JANELA_PAGINAS = int(os.getenv("OCR_JANELA_PAGINAS", max(OCR_WORKERS, 2)))
+
+# Mínimo de caracteres para considerar que a página tem camada de texto.
+# Páginas abaixo desse limite são tratadas como escaneadas e vão para o OCR
+MIN_CARACTERES_PAGINA = int(os.getenv("MIN_CARACTERES_PAGINA", 50))
+
+
+def _contiguous_runs(page_numbers):
+    """Agrupa números de página em sequências contíguas: [1,2,3,7,8] -> [[1,2,3],[7,8]]"""
+    runs = []
+    for page_number in page_numbers:
+        if runs and page_number == runs[-1][-1] + 1:
+            runs[-1].append(page_number)
+        else:
+            runs.append([page_number])
+    return runs
+
+
+def _iter_rendered_pages(path, page_numbers, dpi=OCR_DPI):
+    """
+    Rasteriza as páginas indicadas em janelas de OCR_JANELA_PAGINAS páginas
+    Gera listas de (numero_pagina, caminho_imagem); as imagens de cada janela
+    são apagadas assim que o consumidor pede a próxima janela, e o diretório
+    temporário é removido ao final (inclusive em caso de erro)
+    """
+    with tempfile.TemporaryDirectory(prefix="ocr_") as tmp_dir:
+        for start in range(0, len(page_numbers), OCR_JANELA_PAGINAS):
+            window = page_numbers[start:start + OCR_JANELA_PAGINAS]
+            rendered = []
+            try:
+                # Uma chamada ao pdftoppm por sequência contígua de páginas,
+                # gravando direto em escala de cinza no diretório temporário
+                for run in _contiguous_runs(window):
+                    paths = convert_from_path(
+                        path,
+                        dpi=dpi,
+                        first_page=run[0],
+                        last_page=run[-1],
+                        grayscale=True,
+                        output_folder=tmp_dir,
+                        output_file=f"p{run[0]:05d}",
+                        paths_only=True,
+                    )
+                    rendered.extend(zip(run, sorted(paths)))
+                yield rendered
+            finally:
+                for _, image_path in rendered:
+                    try:
+                        os.remove(image_path)
+                    except OSError:
+                        pass
+
+
+def _page_cache_get(fingerprint, cache_config):
+    if not fingerprint:
+        return None
+    cached = page_cache.get(page_cache.make_key(fingerprint, cache_config))
+    return json.loads(cached) if cached is not None else None
+
+
+def _page_cache_set(fingerprint, cache_config, result):
+    if fingerprint and result["texto"].strip():
+        page_cache.set(page_cache.make_key(fingerprint, cache_config), json.dumps(result, ensure_ascii=False))
+
+
+def iter_text_pdf(path, perfil_ocr=None, backend_texto=None, cancel=None):
+    """
+    Extrai o texto do PDF página a página
+    Páginas com camada de texto usam o texto do extrator configurado
+    (backend_texto: "pdfplumber" ou "pdfium"; padrão PDF_TEXT_BACKEND); as
+    demais são rasterizadas e passam pelo OCR (perfil_ocr: "fast", "balanced"
+    ou "best"; padrão OCR_PERFIL). Gera dicts {"pagina", "metodo", "texto"} à medida que
+    as páginas ficam prontas (primeiro as de camada de texto, depois as de
+    OCR, cada grupo em ordem de página)
+
+    O texto de cada página de OCR fica no cache de páginas, indexado pela
+    impressão digital da página: numa nova versão do documento só as páginas
+    nunca vistas passam pelo OCR
+
+    cancel: CancelToken verificado entre páginas e repassado ao OCR; se
+    acionado, as páginas restantes são abandonadas (OperationCancelledError)
+    """
+    done = set()
+    ocr_pages = []
+    fingerprints = {}
+    yielded = 0
     try:
-        with pdfplumber.open(path) as pdf:
-            pages = [p.extract_text() or "" for p in pdf.pages]
-        text = "\n".join(pages).strip()
-        if text and len(text) > 50:  # Se extraiu texto suficiente, retorna
-            return text
-    except Exception:
-        pass
-
-    # Se for PDF escaneado (imagem), usa Tesseract
+        for page in _iter_text_pdf(path, perfil_ocr, backend_texto, cancel, done, ocr_pages, fingerprints):
+            yielded += 1
+            yield page
+    except OperationCancelledError:
+        # Páginas conhecidas que não chegaram a ser entregues
+        abandonadas = max(0, len(done) + len(ocr_pages) - yielded)
+        metrics.incr("paginas_abandonadas", abandonadas)
+        logger.info(f"Extração de {path} cancelada; {abandonadas} páginas abandonadas")
+        raise
+
+
+def _iter_text_pdf(path, perfil_ocr, backend_texto, cancel, done, ocr_pages, fingerprints):
     try:
-        images = convert_from_path(path, dpi=300)
-        text_pages = []
-        # Tenta usar português, se não disponível usa inglês
-        lang = 'por+eng'  # Português + Inglês como fallback
+        for number, text, fingerprint in get_text_extractor(backend_texto).iter_pages(path):
+            check_cancel(cancel)
+            if len(text.strip()) >= MIN_CARACTERES_PAGINA:
+                done.add(number)
+                yield {"pagina": number, "metodo": "texto", "texto": text}
+            else:
+                ocr_pages.append(number)
+                fingerprints[number] = fingerprint()
+    except OperationCancelledError:
+        raise
+    except Exception as e:
+        # O extrator não conseguiu ler o arquivo: tenta OCR nas páginas restantes
+        logger.warning(f"Falha ao ler camada de texto de {path}: {e}")
         try:
-            # Verifica se o idioma português está disponível
-            available_langs = pytesseract.get_languages()
-            if 'por' not in available_langs:
-                lang = 'eng'  # Se português não disponível, usa inglês
+            page_count = pdfinfo_from_path(path)["Pages"]
         except Exception:
-            lang = 'eng'  # Se houver erro, usa inglês
-        
-        for img in images:
-            try:
-                text_page = pytesseract.image_to_string(img, lang=lang)
-                text_pages.append(text_page)
-            except Exception:
-                # Se falhar em uma página, continua com as outras
-                continue
-        
-        result = "\n".join(text_pages).strip()
-        return result if result else ""
+            return
+        ocr_pages[:] = [n for n in range(1, page_count + 1) if n not in done]
+
+    if not ocr_pages:
+        return
+
+    # Páginas escaneadas (imagem): primeiro as que já estão no cache de páginas
+    cache_config = get_extraction_config(perfil_ocr, backend_texto)
+    pending = []
+    for number in ocr_pages:
+        cached = _page_cache_get(fingerprints.get(number), cache_config)
+        if cached is not None:
+            yield dict(cached, pagina=number, metodo="ocr", cache=True)
+        else:
+            pending.append(number)
+
+    # As demais passam pelo Tesseract
+    try:
+        for number, result in _iter_ocr_pages(path, pending, perfil_ocr, fingerprints, cache_config, cancel):
+            yield {
+                "pagina": number,
+                "metodo": "ocr",
+                "texto": result["texto"],
+                "confianca": result["confianca"],
+                "dpi": result["dpi"],
+                "perfil": result["perfil"],
+                "cache": result.get("cache", False),
+            }
+    except OperationCancelledError:
+        raise
     except Exception as e:
-        # Se falhar o OCR completamente, retorna string vazia
-        # Log do erro pode ser adicionado aqui se necessário
-        return ""
+        # Se falhar o OCR completamente, mantém apenas as páginas já extraídas
+        logger.error(f"Falha no OCR de {path}: {e}")
+
+
+def _needs_retry(result):
+    """Indica se a página deve ser refeita (resolução maior e/ou perfil mais preciso)"""
+    if result is None:
+        return True
+    if result["confianca"] is None or len(result["texto"].strip()) < OCR_POUCO_TEXTO:
+        # Nenhuma ou quase nenhuma palavra: só refaz se a página não estiver em branco
+        return (result["tinta"] or 0.0) >= OCR_TINTA_MINIMA
+    return result["confianca"] < OCR_CONFIANCA_MINIMA
+
+
+def _best_result(first, second):
+    """Escolhe o resultado de maior confiança entre duas passadas de OCR"""
+    if first is None or first["confianca"] is None:
+        return second or first
+    if second is None or second["confianca"] is None:
+        return first
+    return second if second["confianca"] >= first["confianca"] else first
+
+
+def _iter_ocr_pages(path, page_numbers, perfil_ocr=None, fingerprints=None, cache_config=None, cancel=None):
+    """
+    Rasteriza e faz OCR das páginas em janelas pequenas (memória constante)
+    Gera (numero_pagina, resultado) em ordem de página dentro de cada janela;
+    páginas que falharem são omitidas
+
+    Páginas com confiança baixa ou quase sem texto são refeitas uma vez, em
+    OCR_DPI e com o perfil de fallback (mais preciso) quando houver.
+    Páginas sem impressão digital do PDF usam o hash da imagem rasterizada
+    para consultar e alimentar o cache de páginas
+    """
+    engine = get_engine()
+    profile = engine.profile(perfil_ocr)
+    retry_profile = engine.profile(profile["fallback"]) if profile["fallback"] else None
+    # Sem perfil mais preciso, a segunda passada só faz sentido se a resolução aumentar
+    if retry_profile is None and OCR_ADAPTATIVO:
+        retry_profile = profile
+    first_dpi = OCR_DPI_BAIXO if OCR_ADAPTATIVO else OCR_DPI
+    fingerprints = fingerprints if fingerprints is not None else {}
+    cache_config = cache_config or get_extraction_config(perfil_ocr)
+
+    def finish(number, result):
+        _page_cache_set(fingerprints.get(number), cache_config, result)
+        return number, result
+
+    for window in _iter_rendered_pages(path, page_numbers, dpi=first_dpi):
+        check_cancel(cancel)
+        to_ocr = []
+        for number, image_path in window:
+            if not fingerprints.get(number):
+                fingerprints[number] = "img:" + hash_file(image_path)
+                cached = _page_cache_get(fingerprints[number], cache_config)
+                if cached is not None:
+                    yield number, dict(cached, cache=True)
+                    continue
+            to_ocr.append((number, image_path))
+
+        results = engine.ocr_pages(
+            [image_path for _, image_path in to_ocr], preprocess=OCR_ADAPTATIVO, profile=profile, cancel=cancel
+        )
+        low_confidence = {}
+        for (number, _), result in zip(to_ocr, results):
+            if retry_profile is not None and _needs_retry(result):
+                low_confidence[number] = result
+            elif result is not None:
+                # Se falhar em uma página, continua com as outras
+                yield finish(number, dict(result, dpi=first_dpi, perfil=profile["nome"]))
+
+        if not low_confidence:
+            continue
+
+        # Segunda passada só para as páginas ruins
+        for retry_window in _iter_rendered_pages(path, list(low_confidence), dpi=OCR_DPI):
+            check_cancel(cancel)
+            retry_results = engine.ocr_pages(
+                [image_path for _, image_path in retry_window], preprocess=OCR_ADAPTATIVO, profile=retry_profile,
+                cancel=cancel
+            )
+            for (number, _), result in zip(retry_window, retry_results):
+                first = low_confidence[number]
+                best = _best_result(first, result)
+                if best is None:
+                    continue
+                if best is result:
+                    yield finish(number, dict(best, dpi=OCR_DPI, perfil=retry_profile["nome"]))
+                else:
+                    yield finish(number, dict(best, dpi=first_dpi, perfil=profile["nome"]))
+
+
+def get_extraction_config(perfil_ocr=None, backend_texto=None):
+    """
+    Parâmetros que influenciam o texto extraído
+    Usado para compor a chave do cache de extração: mudar qualquer um deles
+    invalida as entradas antigas
+    """
+    return {
+        "versao": 5,
+        "backend_texto": get_text_extractor(backend_texto).nome,
+        "perfil_ocr": perfil_ocr or OCR_PERFIL,
+        "ocr_dpi": OCR_DPI,
+        "ocr_adaptativo": OCR_ADAPTATIVO,
+        "ocr_dpi_baixo": OCR_DPI_BAIXO,
+        "ocr_confianca_minima": OCR_CONFIANCA_MINIMA,
+        "min_caracteres_pagina": MIN_CARACTERES_PAGINA,
+        "idiomas": get_engine().lang,
+    }
+
+
+def extract_text_pdf(path, perfil_ocr=None, backend_texto=None, on_page=None, cancel=None):
+    """
+    Extrai texto de PDF (camada de texto + OCR do Tesseract por página).
+    on_page: chamado com o dict de cada página assim que ela fica pronta
+    cancel: CancelToken; se acionado, abandona as páginas restantes
+    """
+    pages = []
+    for page in iter_text_pdf(path, perfil_ocr, backend_texto, cancel):
+        pages.append(page)
+        if on_page is not None:
+            on_page(page)
+    pages.sort(key=lambda p: p["pagina"])
+    return "\n".join(p["texto"] for p in pages).strip()
 
 
 def extract_text_docx(path):
-    """Extrai texto de arquivos .docx"""
-    d = docx.Document(path)
-    return "\n".join([p.text for p in d.paragraphs])
+    """Extrai texto de arquivos .docx (corpo, tabelas, cabeçalhos, rodapés e notas)"""
+    try:
+        return extract_text_docx_xml(path)
+    except (KeyError, ET.ParseError) as e:
+        # OOXML fora do padrão esperado: usa o python-docx (só parágrafos do corpo)
+        logger.warning(f"Falha na leitura direta do DOCX {path}, usando python-docx: {e}")
+        d = docx.Document(path)
+        return "\n".join([p.text for p in d.paragraphs])
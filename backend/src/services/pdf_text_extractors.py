@@ -0,0 +1,152 @@
+"""
+Extratores da camada de texto de PDFs (plugáveis)
+Cada backend percorre o arquivo uma página por vez e libera os caches da
+página antes de seguir para a próxima, mantendo a memória estável em
+arquivos com centenas de páginas.
+
+Backends:
+- pdfplumber: análise de layout do pdfminer (mais lento, texto bem ordenado)
+- pdfium: texto bruto via pypdfium2 (biblioteca C, bem mais rápido)
+"""
+import hashlib
+import logging
+import os
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import pdfplumber
+from pdfminer.pdftypes import PDFStream, resolve1
+
+logger = logging.getLogger(__name__)
+
+# pypdfium2 é dependência do pdfplumber >= 0.10, mas pode faltar em instalações antigas
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+# Backend usado para a camada de texto: pdfplumber ou pdfium
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "pdfplumber")
+
+# (numero_pagina, texto, função que calcula a impressão digital da página)
+# A função só pode ser chamada antes de pedir a próxima página
+PaginaTexto = Tuple[int, str, Callable[[], Optional[str]]]
+
+
+def _stream_bytes(stream):
+    """Bytes de um stream do PDF (brutos quando disponíveis, sem decodificar)"""
+    if stream.rawdata is not None:
+        return stream.rawdata
+    return stream.get_data()
+
+
+def _hash_resources(sha, resources, depth=0):
+    """Acrescenta ao hash os XObjects (imagens e formulários) usados pela página"""
+    resources = resolve1(resources) or {}
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for name in sorted(xobjects):
+        xobj = resolve1(xobjects[name])
+        if not isinstance(xobj, PDFStream):
+            continue
+        sha.update(str(name).encode("utf-8"))
+        sha.update(_stream_bytes(xobj))
+        # Formulários podem conter outras imagens
+        if depth < 3 and "Resources" in xobj.attrs:
+            _hash_resources(sha, xobj.attrs["Resources"], depth + 1)
+
+
+def page_fingerprint(page):
+    """
+    Impressão digital do conteúdo de uma página do pdfplumber: content streams,
+    XObjects referenciados (ex.: a imagem escaneada), tamanho e rotação.
+    A mesma página em outra versão do arquivo gera o mesmo valor.
+    Retorna None se não for possível calcular
+    """
+    try:
+        page_obj = page.page_obj
+        sha = hashlib.sha256()
+        sha.update(repr((page_obj.mediabox, page_obj.attrs.get("Rotate", 0))).encode("utf-8"))
+        for content in page_obj.contents:
+            content = resolve1(content)
+            if isinstance(content, PDFStream):
+                sha.update(_stream_bytes(content))
+        _hash_resources(sha, page_obj.resources)
+        return "pdf:" + sha.hexdigest()
+    except Exception:
+        return None
+
+
+class PdfTextExtractor:
+    """Interface dos extratores da camada de texto"""
+
+    nome = ""
+
+    def iter_pages(self, path: str) -> Iterator[PaginaTexto]:
+        """Gera (numero_pagina, texto, impressao_digital) página a página, em ordem"""
+        raise NotImplementedError
+
+
+class PdfplumberExtractor(PdfTextExtractor):
+    """Camada de texto via pdfplumber (análise de layout)"""
+
+    nome = "pdfplumber"
+
+    def iter_pages(self, path: str) -> Iterator[PaginaTexto]:
+        with pdfplumber.open(path) as pdf:
+            for number, page in enumerate(pdf.pages, start=1):
+                try:
+                    try:
+                        text = page.extract_text() or ""
+                    except Exception:
+                        text = ""
+                    yield number, text, lambda page=page: page_fingerprint(page)
+                finally:
+                    # Libera objetos e layout já calculados para esta página
+                    if hasattr(page, "close"):
+                        page.close()
+                    else:
+                        page.flush_cache()
+
+
+class PdfiumExtractor(PdfTextExtractor):
+    """Texto bruto via pypdfium2 (sem análise de layout)"""
+
+    nome = "pdfium"
+
+    def iter_pages(self, path: str) -> Iterator[PaginaTexto]:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                try:
+                    textpage = page.get_textpage()
+                    try:
+                        text = textpage.get_text_range() or ""
+                    finally:
+                        textpage.close()
+                except Exception:
+                    text = ""
+                try:
+                    # Sem acesso simples aos streams: a impressão digital vem da
+                    # imagem rasterizada, calculada na etapa de OCR
+                    yield index + 1, text, lambda: None
+                finally:
+                    page.close()
+        finally:
+            pdf.close()
+
+
+PDF_TEXT_BACKENDS: Dict[str, type] = {
+    PdfplumberExtractor.nome: PdfplumberExtractor,
+}
+if PDFIUM_AVAILABLE:
+    PDF_TEXT_BACKENDS[PdfiumExtractor.nome] = PdfiumExtractor
+
+
+def get_text_extractor(nome: Optional[str] = None) -> PdfTextExtractor:
+    """Retorna o extrator da camada de texto (padrão: PDF_TEXT_BACKEND)"""
+    nome = nome or PDF_TEXT_BACKEND
+    if nome not in PDF_TEXT_BACKENDS:
+        logger.warning(f"Backend de texto {nome} não disponível; usando pdfplumber")
+        nome = PdfplumberExtractor.nome
+    return PDF_TEXT_BACKENDS[nome]()
@@ -0,0 +1,216 @@
+"""
+Estimativa prévia de custo (preflight) e controle de admissão
+Antes de extrair, conta as páginas do PDF e quais têm camada de texto (sem
+extrair o texto nem rasterizar nada), e estima o custo em segundos de CPU.
+O controle de admissão compara a estimativa com dois orçamentos:
+- por requisição: acima dele o documento é rebaixado para o perfil de OCR
+  "fast" (se couber) ou recusado
+- global: soma das estimativas em processamento; acima dele o documento é
+  adiado (vai para a fila de jobs e espera orçamento)
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from .ocr_engine import OCR_PERFIL, OCR_WORKERS
+from .ocr_service import MIN_CARACTERES_PAGINA
+from .pdf_text_extractors import PDFIUM_AVAILABLE
+
+if PDFIUM_AVAILABLE:
+    import pypdfium2 as pdfium
+
+logger = logging.getLogger(__name__)
+
+# Custo estimado por página, em segundos de CPU
+PREFLIGHT_SEGUNDOS_PAGINA_TEXTO = float(os.getenv("PREFLIGHT_SEGUNDOS_PAGINA_TEXTO", 0.05))
+PREFLIGHT_SEGUNDOS_PAGINA_OCR = {
+    "fast": float(os.getenv("PREFLIGHT_SEGUNDOS_PAGINA_OCR_FAST", 1.5)),
+    "balanced": float(os.getenv("PREFLIGHT_SEGUNDOS_PAGINA_OCR_BALANCED", 3.0)),
+    "best": float(os.getenv("PREFLIGHT_SEGUNDOS_PAGINA_OCR_BEST", 6.0)),
+}
+PREFLIGHT_SEGUNDOS_DOCX = float(os.getenv("PREFLIGHT_SEGUNDOS_DOCX", 0.5))
+
+# Orçamentos (segundos de CPU estimados; 0 desativa o limite)
+ADMISSAO_ORCAMENTO_REQUISICAO = float(os.getenv("ADMISSAO_ORCAMENTO_REQUISICAO", 1800))
+ADMISSAO_ORCAMENTO_GLOBAL = float(os.getenv("ADMISSAO_ORCAMENTO_GLOBAL", 3600))
+# Permite trocar o perfil de OCR por "fast" quando o pedido excede o orçamento
+ADMISSAO_REBAIXAR = os.getenv("ADMISSAO_REBAIXAR", "true").lower() == "true"
+
+PERFIL_REBAIXADO = "fast"
+
+DECISAO_ACEITAR = "aceitar"
+DECISAO_REBAIXAR = "rebaixar"
+DECISAO_ADIAR = "adiar"
+DECISAO_REJEITAR = "rejeitar"
+
+
+def _inspect_pdf(path) -> Dict:
+    """Conta páginas e quantas têm camada de texto (sem análise de layout)"""
+    if PDFIUM_AVAILABLE:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            paginas = len(pdf)
+            paginas_texto = 0
+            for index in range(paginas):
+                page = pdf[index]
+                try:
+                    textpage = page.get_textpage()
+                    try:
+                        if textpage.count_chars() >= MIN_CARACTERES_PAGINA:
+                            paginas_texto += 1
+                    finally:
+                        textpage.close()
+                finally:
+                    page.close()
+            return {"paginas": paginas, "paginas_texto": paginas_texto}
+        finally:
+            pdf.close()
+
+    # Sem pdfium: página com fontes nos recursos conta como camada de texto
+    import pdfplumber
+    from pdfminer.pdftypes import resolve1
+    with pdfplumber.open(path) as pdf:
+        paginas = len(pdf.pages)
+        paginas_texto = 0
+        for page in pdf.pages:
+            resources = resolve1(page.page_obj.resources) or {}
+            if resolve1(resources.get("Font")):
+                paginas_texto += 1
+        return {"paginas": paginas, "paginas_texto": paginas_texto}
+
+
+def estimate_cost(file_path, filename: str, perfil_ocr: str = None) -> Dict:
+    """
+    Estimativa de custo da extração: páginas, páginas com camada de texto,
+    páginas que irão para o OCR e segundos de CPU (total e por perfil)
+    """
+    perfil = perfil_ocr or OCR_PERFIL
+    ext = os.path.splitext(filename)[1].lower()
+    if ext != ".pdf":
+        custos = {nome: PREFLIGHT_SEGUNDOS_DOCX for nome in PREFLIGHT_SEGUNDOS_PAGINA_OCR}
+        return {"paginas": None, "paginas_texto": None, "paginas_ocr": 0,
+                "perfil_ocr": perfil, "custo": custos[perfil], "custo_por_perfil": custos,
+                "tempo_estimado_s": custos[perfil]}
+
+    try:
+        info = _inspect_pdf(file_path)
+    except Exception as e:
+        # PDF que não abre aqui também não abre na extração; não bloqueia o fluxo
+        logger.warning(f"Preflight não conseguiu ler {filename}: {e}")
+        info = {"paginas": 0, "paginas_texto": 0}
+
+    paginas_ocr = info["paginas"] - info["paginas_texto"]
+    custo_texto = info["paginas_texto"] * PREFLIGHT_SEGUNDOS_PAGINA_TEXTO
+    custos = {
+        nome: round(custo_texto + paginas_ocr * segundos, 2)
+        for nome, segundos in PREFLIGHT_SEGUNDOS_PAGINA_OCR.items()
+    }
+    return {
+        **info,
+        "paginas_ocr": paginas_ocr,
+        "perfil_ocr": perfil,
+        "custo": custos[perfil],
+        "custo_por_perfil": custos,
+        # O OCR roda em paralelo nos workers do motor
+        "tempo_estimado_s": round(custo_texto + paginas_ocr * PREFLIGHT_SEGUNDOS_PAGINA_OCR[perfil] / max(1, OCR_WORKERS), 1),
+    }
+
+
+class AdmissionRejectedError(Exception):
+    """O documento excede o orçamento por requisição mesmo no perfil mais barato"""
+
+    def __init__(self, message: str, estimativa: Dict):
+        super().__init__(message)
+        self.estimativa = estimativa
+
+
+class AdmissionControl:
+    """Orçamentos por requisição e global para a extração"""
+
+    def __init__(self, orcamento_requisicao: float = ADMISSAO_ORCAMENTO_REQUISICAO,
+                 orcamento_global: float = ADMISSAO_ORCAMENTO_GLOBAL, rebaixar: bool = ADMISSAO_REBAIXAR):
+        self.orcamento_requisicao = orcamento_requisicao
+        self.orcamento_global = orcamento_global
+        self.rebaixar = rebaixar
+        self.em_uso = 0.0
+        self.em_execucao = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._stats = {DECISAO_ACEITAR: 0, DECISAO_REBAIXAR: 0, DECISAO_ADIAR: 0, DECISAO_REJEITAR: 0}
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def decide(self, estimativa: Dict, registrar: bool = True) -> Dict:
+        """
+        Aplica o orçamento por requisição e consulta o global
+        Retorna {"decisao", "perfil_ocr", "custo", "rebaixado"}; levanta AdmissionRejectedError
+        registrar=False apenas simula (não entra nas estatísticas)
+        """
+        perfil = estimativa["perfil_ocr"]
+        custo = estimativa["custo"]
+        rebaixado = False
+        if self.orcamento_requisicao and custo > self.orcamento_requisicao:
+            custo_rebaixado = estimativa["custo_por_perfil"].get(PERFIL_REBAIXADO, custo)
+            if self.rebaixar and perfil != PERFIL_REBAIXADO and custo_rebaixado <= self.orcamento_requisicao:
+                rebaixado, perfil, custo = True, PERFIL_REBAIXADO, custo_rebaixado
+            else:
+                if registrar:
+                    self._stats[DECISAO_REJEITAR] += 1
+                raise AdmissionRejectedError(
+                    f"Documento excede o orçamento de processamento: custo estimado {custo:.0f}s de CPU "
+                    f"({estimativa['paginas_ocr']} páginas para OCR), limite {self.orcamento_requisicao:.0f}s",
+                    estimativa,
+                )
+        if not self._fits(custo):
+            decisao = DECISAO_ADIAR
+        else:
+            decisao = DECISAO_REBAIXAR if rebaixado else DECISAO_ACEITAR
+        if registrar:
+            self._stats[decisao] += 1
+        return {"decisao": decisao, "perfil_ocr": perfil, "custo": custo, "rebaixado": rebaixado}
+
+    def _fits(self, custo: float) -> bool:
+        # Sempre admite um documento quando nada está em execução
+        if not self.orcamento_global or self.em_execucao == 0:
+            return True
+        return self.em_uso + custo <= self.orcamento_global
+
+    @asynccontextmanager
+    async def reserve(self, custo: float):
+        """Reserva `custo` do orçamento global, esperando se necessário"""
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._fits(custo))
+            self.em_uso += custo
+            self.em_execucao += 1
+        try:
+            yield
+        finally:
+            async with condition:
+                self.em_uso -= custo
+                self.em_execucao -= 1
+                condition.notify_all()
+
+    def stats(self) -> Dict:
+        return {
+            "orcamento_requisicao": self.orcamento_requisicao,
+            "orcamento_global": self.orcamento_global,
+            "em_uso": round(self.em_uso, 2),
+            "em_execucao": self.em_execucao,
+            "decisoes": dict(self._stats),
+        }
+
+
+_admission: Optional[AdmissionControl] = None
+
+
+def get_admission() -> AdmissionControl:
+    """Controle de admissão compartilhado pela aplicação"""
+    global _admission
+    if _admission is None:
+        _admission = AdmissionControl()
+    return _admission
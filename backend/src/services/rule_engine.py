@@ -0,0 +1,444 @@
+"""
+Motor de regras declarativas compiladas a partir dos requisitos do modelo
+Cada requisito de `modelo["requisitos"]` (ex.: lote_1 -> i) vira uma regra
+pontuada: uma lista de critérios e os cortes de pontuação para "corretos" e
+"duvidosos". A regra parte de um modelo de regra escolhido pela chave do
+requisito ou pelo seu "tipo" (e "area_especifica"); os limiares vêm do
+próprio requisito:
+
+- quantidade_minima: N       -> critério "menciona a quantidade N"
+- valores_minimos: V         -> critério "algum valor monetário >= V"
+- periodo: "últimos N anos"  -> critério "menciona a janela de N anos"
+- termos: [...] ou [[...]]   -> critérios extras (algum dos termos aparece)
+- pontuacao: {"corretos": N, "duvidosos": M} -> substitui os cortes
+- obrigatorio: false         -> fica fora da decisão de aprovação
+- proximidade: N ou "frase"  -> só pontuam os critérios atendidos juntos numa
+  janela de N tokens (ou numa mesma frase), e não em qualquer ponto do documento
+
+Critérios "quantidade", "valor" e "periodo" do modelo de regra ficam de fora
+quando o requisito não traz o campo correspondente. Requisitos sem modelo de
+regra e sem "termos" (textos descritivos, regras gerais) não geram regra.
+
+O plano compilado fica em cache por conteúdo dos requisitos, e todos os
+modelos usam um único TermMatcher (a união dos termos de todos os planos): as
+características de um documento são extraídas uma vez para qualquer modelo.
+Termos, tipos e áreas passam pela mesma normalização do texto (acentos,
+caixa), e cada regra traz o trecho exato do original em que o primeiro
+termo dela foi encontrado.
+"""
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .document_features import NUMEROS_EXTENSO, DocumentFeatures, get_document_features, parse_valor
+from .document_index import PROXIMIDADE_FRASES, PROXIMIDADE_TOKENS
+from .term_matcher import TermMatcher, get_matcher
+from .text_normalizer import NormalizedText, normalize_term, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Planos compilados mantidos em cache (modelos distintos)
+PLANOS_CACHE_ITENS = 32
+# Caracteres do original em volta da ocorrência no trecho de evidência
+TRECHO_CONTEXTO = 80
+
+CRITERIO_TERMOS = "termos"
+CRITERIO_QUANTIDADE = "quantidade"
+CRITERIO_VALOR = "valor"
+CRITERIO_PERIODO = "periodo"
+CRITERIO_RESULTADOS = "resultados"
+
+# Critério do modelo de regra -> campo do requisito que traz o limiar
+CAMPOS_LIMIAR = {
+    CRITERIO_QUANTIDADE: "quantidade_minima",
+    CRITERIO_VALOR: "valores_minimos",
+    CRITERIO_PERIODO: "periodo",
+}
+
+MENSAGEM_PARCIAL = "Menção parcial: encontrou {pontos} de {total} critérios necessários"
+
+# Requisito só com "termos" (sem modelo de regra): todos os critérios para
+# "corretos", ao menos um para "duvidosos"
+MODELO_REGRA_GENERICO = {"criterios": [], "tolerancia": 0, "minimo_duvidoso": 1}
+
+_ANOS_RE = re.compile(r"(\d+|" + "|".join(NUMEROS_EXTENSO.values()) + r")\s*anos?")
+_TOKENS_RE = re.compile(r"(\d+)(?:\s*(?:tokens?|palavras?))?")
+
+
+class RuleCompileError(ValueError):
+    """Requisito do modelo que não pode ser compilado em regra"""
+
+
+class Criterio:
+    """Critério pontuável: termos, quantidade, valor mínimo, período ou resultados"""
+
+    def __init__(self, tipo: str, termos: Iterable[str] = (), limiar=None):
+        self.tipo = tipo
+        # Variantes que só diferem em acento/caixa viram um termo só
+        self.termos = tuple(dict.fromkeys(filter(None, map(normalize_term, termos))))
+        self.limiar = limiar
+
+    def avaliar(self, doc: DocumentFeatures) -> bool:
+        if self.tipo == CRITERIO_TERMOS:
+            return doc.hits.any(self.termos)
+        if self.tipo == CRITERIO_QUANTIDADE:
+            return doc.tem_quantidade(self.limiar)
+        if self.tipo == CRITERIO_VALOR:
+            return doc.tem_valor_minimo(self.limiar)
+        if self.tipo == CRITERIO_PERIODO:
+            return doc.tem_periodo(self.limiar)
+        return doc.tem_resultados
+
+    def ocorrencias(self, doc: DocumentFeatures) -> List[int]:
+        """Offsets (no texto normalizado) em que o critério é atendido"""
+        if self.tipo == CRITERIO_TERMOS:
+            return doc.hits.offsets(self.termos)
+        if self.tipo == CRITERIO_QUANTIDADE:
+            return doc.quantidades[self.limiar]
+        if self.tipo == CRITERIO_VALOR:
+            return doc.valores_minimos(self.limiar)
+        if self.tipo == CRITERIO_PERIODO:
+            return doc.periodos[self.limiar]
+        return doc.resultados
+
+
+class Regra:
+    """Requisito compilado: critérios, cortes de pontuação e mensagens de evidência"""
+
+    def __init__(self, chave: str, criterios: List[Criterio], corretos: int, duvidosos: Optional[int],
+                 mensagens: Dict[str, str], parametros: Dict = None, obrigatorio: bool = True,
+                 proximidade: Optional[Tuple[str, int]] = None):
+        self.chave = chave
+        self.criterios = criterios
+        self.corretos = corretos
+        self.duvidosos = duvidosos
+        # Mensagens com {pontos}, {total} e os parâmetros ({quantidade}, {valor}, {anos})
+        self.mensagens = mensagens
+        self.parametros = parametros or {}
+        self.obrigatorio = obrigatorio
+        # (unidade, largura): critérios pontuam juntos numa janela (ver DocumentIndex.janela)
+        self.proximidade = proximidade
+
+    def avaliar(self, doc: DocumentFeatures, resultado: Dict, normalizado: Optional[NormalizedText] = None):
+        """Pontua os critérios e classifica o requisito em corretos/duvidosos/faltando"""
+        janela = None
+        if self.proximidade is None:
+            pontos = sum(1 for criterio in self.criterios if criterio.avaliar(doc))
+        else:
+            # Precisa do índice posicional (pedido na extração)
+            unidade, largura = self.proximidade
+            pontos, inicio, fim = doc.indice.janela(
+                [criterio.ocorrencias(doc) for criterio in self.criterios], largura, unidade
+            )
+            janela = (inicio, fim + 1) if pontos else None
+        if pontos >= self.corretos:
+            situacao = "corretos"
+        elif self.duvidosos is not None and pontos >= self.duvidosos:
+            situacao = "duvidosos"
+        else:
+            situacao = "faltando"
+        resultado[situacao].append(self.chave)
+        resultado["evidencias"][self.chave] = self.mensagens[situacao].format(
+            pontos=pontos, total=len(self.criterios), **self.parametros
+        )
+        if normalizado is not None:
+            if janela is not None:
+                # A janela inteira em que os critérios foram atendidos juntos
+                resultado["trechos"][self.chave] = normalizado.trecho(*janela, contexto=TRECHO_CONTEXTO)
+                return
+            primeiro = doc.hits.first(termo for criterio in self.criterios for termo in criterio.termos)
+            if primeiro is not None:
+                termo, inicio = primeiro
+                resultado["trechos"][self.chave] = normalizado.trecho(
+                    inicio, inicio + len(termo), contexto=TRECHO_CONTEXTO
+                )
+
+
+class PlanoRegras:
+    """Regras compiladas de um modelo, na ordem dos requisitos"""
+
+    def __init__(self, regras: List[Regra]):
+        self.regras = regras
+        self.termos: Set[str] = {t for r in regras for c in r.criterios for t in c.termos}
+        self.quantidades = {c.limiar for r in regras for c in r.criterios if c.tipo == CRITERIO_QUANTIDADE}
+        self.anos = {c.limiar for r in regras for c in r.criterios if c.tipo == CRITERIO_PERIODO}
+        self.obrigatorios = [regra.chave for regra in regras if regra.obrigatorio]
+        # Alguma regra consulta o índice posicional
+        self.indexar = any(regra.proximidade is not None for regra in regras)
+
+    def avaliar(self, doc: DocumentFeatures, normalizado: Optional[NormalizedText] = None) -> Dict:
+        """Avalia as regras; com o texto normalizado, inclui os trechos do original"""
+        resultado = {
+            "corretos": [],
+            "faltando": [],
+            "duvidosos": [],
+            "evidencias": {},
+            "trechos": {}
+        }
+        for regra in self.regras:
+            regra.avaliar(doc, resultado, normalizado)
+        return resultado
+
+
+def _inteiro(valor) -> bool:
+    """Número inteiro vindo do JSON (2 ou 2.0; não bool, NaN nem infinito)"""
+    if isinstance(valor, bool):
+        return False
+    return isinstance(valor, int) or (isinstance(valor, float) and valor.is_integer())
+
+
+def _parse_quantidade(valor, chave: str) -> int:
+    if not _inteiro(valor) or valor < 1:
+        raise RuleCompileError(f"{chave}: quantidade_minima deve ser um inteiro positivo ({valor!r})")
+    return int(valor)
+
+
+def _parse_corte(valor, campo: str, chave: str) -> int:
+    if not _inteiro(valor) or valor < 0:
+        raise RuleCompileError(f"{chave}: pontuacao.{campo} deve ser um inteiro não negativo ({valor!r})")
+    return int(valor)
+
+
+def _parse_valor_minimo(valor, chave: str) -> float:
+    if isinstance(valor, str):
+        valor = parse_valor(valor)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor) or valor <= 0:
+        raise RuleCompileError(f"{chave}: valores_minimos deve ser um valor positivo ({valor!r})")
+    return valor
+
+
+def _parse_periodo(valor, chave: str) -> int:
+    if _inteiro(valor) and valor >= 1:
+        return int(valor)
+    if isinstance(valor, bool) or isinstance(valor, (int, float)):
+        raise RuleCompileError(f"{chave}: periodo deve ser um número inteiro de anos ({valor!r})")
+    m = _ANOS_RE.search(normalize_term(str(valor)))
+    if not m:
+        raise RuleCompileError(f"{chave}: periodo não reconhecido ({valor!r}); use \"últimos N anos\"")
+    numero = m.group(1)
+    if numero.isdigit():
+        return int(numero)
+    return next(n for n, extenso in NUMEROS_EXTENSO.items() if extenso == numero)
+
+
+def _parse_proximidade(valor, chave: str) -> Tuple[str, int]:
+    """N (tokens), "N tokens" ou "frase" -> (unidade, largura)"""
+    if _inteiro(valor) and valor >= 1:
+        return PROXIMIDADE_TOKENS, int(valor)
+    if isinstance(valor, str):
+        texto = normalize_term(valor)
+        if texto in ("frase", "mesma frase"):
+            return PROXIMIDADE_FRASES, 0
+        m = _TOKENS_RE.fullmatch(texto)
+        if m and int(m.group(1)) >= 1:
+            return PROXIMIDADE_TOKENS, int(m.group(1))
+    raise RuleCompileError(f"{chave}: proximidade deve ser um número de tokens ou \"frase\" ({valor!r})")
+
+
+def _formatar_valor(valor: float) -> str:
+    """2500000 -> "2.500.000" (como nas mensagens de evidência)"""
+    texto = f"{valor:,.0f}" if valor == int(valor) else f"{valor:,.2f}"
+    return texto.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+class RuleEngine:
+    """
+    Compila requisitos de modelos em planos de regras (em cache) e avalia
+    documentos com um único TermMatcher compartilhado por todos os planos
+    modelos_regra: modelos de regra (ver rule_validator.MODELOS_REGRA)
+    requisitos_padrao: requisitos usados quando o modelo não traz os seus
+    """
+
+    def __init__(self, modelos_regra: List[Dict], requisitos_padrao: Dict,
+                 cache_itens: int = PLANOS_CACHE_ITENS):
+        self.modelos_regra = modelos_regra
+        self.requisitos_padrao = requisitos_padrao
+        self.cache_itens = cache_itens
+        self._planos: "OrderedDict[str, PlanoRegras]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Os termos de todos os modelos de regra entram no matcher desde o início
+        self._termos: Set[str] = {
+            termo
+            for modelo_regra in modelos_regra
+            for criterio in modelo_regra["criterios"] if not isinstance(criterio, str)
+            for termo in Criterio(CRITERIO_TERMOS, criterio).termos
+        }
+        self._quantidades: Set[int] = set()
+        self._anos: Set[int] = set()
+        # Índice posicional montado só depois que algum plano tem regra com proximidade
+        self._indexar = False
+        self._matcher: TermMatcher = get_matcher(self._termos)
+
+    # Compilação
+
+    def _modelo_regra(self, chave: str, requisito: Dict) -> Optional[Dict]:
+        """
+        Modelo de regra pela chave do requisito ou pelo tipo; com area_especifica,
+        o modelo daquela área (se houver) tem preferência sobre o geral do tipo
+        """
+        tipo = normalize_term(str(requisito.get("tipo", "")))
+        area = normalize_term(str(requisito.get("area_especifica", "")))
+        geral = None
+        for modelo_regra in self.modelos_regra:
+            if "chave" in modelo_regra:
+                if modelo_regra["chave"] == chave:
+                    return modelo_regra
+                continue
+            if normalize_term(modelo_regra.get("tipo", "")) != tipo:
+                continue
+            area_regra = modelo_regra.get("area")
+            if area_regra is None:
+                geral = geral or modelo_regra
+            elif normalize_term(area_regra) in area:
+                return modelo_regra
+        return geral
+
+    def _compile_regra(self, chave: str, requisito: Dict) -> Optional[Regra]:
+        modelo_regra = self._modelo_regra(chave, requisito)
+        extras = requisito.get("termos")
+        if modelo_regra is None and not extras:
+            return None
+        modelo_regra = modelo_regra or MODELO_REGRA_GENERICO
+
+        parametros = dict(modelo_regra.get("parametros", {}))
+        criterios = []
+        for criterio in modelo_regra["criterios"]:
+            if not isinstance(criterio, str):
+                criterios.append(Criterio(CRITERIO_TERMOS, criterio))
+                continue
+            campo = CAMPOS_LIMIAR.get(criterio)
+            if campo is None:
+                criterios.append(Criterio(criterio))
+                continue
+            if requisito.get(campo) in (None, ""):
+                continue
+            if criterio == CRITERIO_QUANTIDADE:
+                limiar = parametros["quantidade"] = _parse_quantidade(requisito[campo], chave)
+            elif criterio == CRITERIO_VALOR:
+                limiar = _parse_valor_minimo(requisito[campo], chave)
+                parametros["valor"] = _formatar_valor(limiar)
+            else:
+                limiar = parametros["anos"] = _parse_periodo(requisito[campo], chave)
+            criterios.append(Criterio(criterio, limiar=limiar))
+
+        if extras:
+            if not isinstance(extras, list) or not all(isinstance(t, (str, list)) for t in extras):
+                raise RuleCompileError(f"{chave}: termos deve ser uma lista de termos ou de listas de termos")
+            grupos = extras if all(isinstance(t, list) for t in extras) else [extras]
+            for grupo in grupos:
+                criterio = Criterio(CRITERIO_TERMOS, [str(termo) for termo in grupo])
+                if not criterio.termos:
+                    raise RuleCompileError(f"{chave}: lista de termos vazia")
+                criterios.append(criterio)
+        if not criterios:
+            return None
+
+        total = len(criterios)
+        corretos = max(1, total - modelo_regra.get("tolerancia", 0))
+        tolerancia_duvidoso = modelo_regra.get("tolerancia_duvidoso")
+        duvidosos = max(1, total - tolerancia_duvidoso) if tolerancia_duvidoso is not None else None
+        duvidosos = modelo_regra.get("minimo_duvidoso", duvidosos)
+        pontuacao = requisito.get("pontuacao") or {}
+        if pontuacao:
+            if not isinstance(pontuacao, dict):
+                raise RuleCompileError(f"{chave}: pontuacao deve ser um objeto com corretos/duvidosos")
+            corretos = _parse_corte(pontuacao.get("corretos", corretos), "corretos", chave)
+            duvidosos = pontuacao.get("duvidosos", duvidosos)
+            duvidosos = _parse_corte(duvidosos, "duvidosos", chave) if duvidosos is not None else None
+        if not 1 <= corretos <= total or (duvidosos is not None and not 1 <= duvidosos <= corretos):
+            raise RuleCompileError(f"{chave}: cortes de pontuação inválidos para {total} critérios")
+
+        proximidade = requisito.get("proximidade", modelo_regra.get("proximidade"))
+        if proximidade is not None:
+            proximidade = _parse_proximidade(proximidade, chave)
+
+        # A descrição vem do modelo enviado: chaves literais não podem virar campos do format
+        descricao = str(requisito.get("descricao") or chave).replace("{", "{{").replace("}", "}}")
+        mensagens = modelo_regra.get("mensagens", {})
+        return Regra(
+            chave,
+            criterios,
+            corretos,
+            duvidosos,
+            {
+                "corretos": mensagens.get("corretos", f"Encontrou evidências de: {descricao}"),
+                "duvidosos": mensagens.get("duvidosos", MENSAGEM_PARCIAL),
+                "faltando": mensagens.get("faltando", f"Não encontrou evidências suficientes de: {descricao}"),
+            },
+            parametros,
+            obrigatorio=bool(requisito.get("obrigatorio", modelo_regra.get("obrigatorio", True))),
+            proximidade=proximidade,
+        )
+
+    def compile_requisitos(self, requisitos: Dict) -> PlanoRegras:
+        """Compila os requisitos (sem cache); levanta RuleCompileError"""
+        if not isinstance(requisitos, dict):
+            raise RuleCompileError("requisitos deve ser um objeto")
+        regras = []
+        for chave, requisito in requisitos.items():
+            if not isinstance(requisito, dict):
+                continue
+            regra = self._compile_regra(chave, requisito)
+            if regra is not None:
+                regras.append(regra)
+                continue
+            # Grupo de itens (ex.: lote_1 -> i, ii, ...): cada item vira "lote_1_i"
+            for item, sub in requisito.items():
+                if isinstance(sub, dict):
+                    regra = self._compile_regra(f"{chave}_{item}", sub)
+                    if regra is not None:
+                        regras.append(regra)
+        # Regras avaliadas em todo documento, mesmo sem requisito correspondente
+        chaves = {regra.chave for regra in regras}
+        for modelo_regra in self.modelos_regra:
+            if modelo_regra.get("sempre") and modelo_regra["chave"] not in chaves:
+                regras.append(self._compile_regra(modelo_regra["chave"], {}))
+        return PlanoRegras(regras)
+
+    def compile(self, modelo: Dict) -> PlanoRegras:
+        """Plano de regras do modelo (compilado uma vez por conteúdo de requisitos)"""
+        requisitos = modelo.get("requisitos") or self.requisitos_padrao
+        chave = hashlib.sha256(
+            json.dumps(requisitos, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+        with self._lock:
+            plano = self._planos.get(chave)
+            if plano is not None:
+                self._planos.move_to_end(chave)
+                return plano
+
+        plano = self.compile_requisitos(requisitos)
+        with self._lock:
+            self._planos[chave] = plano
+            while len(self._planos) > self.cache_itens:
+                self._planos.popitem(last=False)
+            if not plano.termos <= self._termos:
+                self._termos |= plano.termos
+                self._matcher = get_matcher(self._termos)
+            self._quantidades |= plano.quantidades
+            self._anos |= plano.anos
+            self._indexar = self._indexar or plano.indexar
+        logger.info(f"Plano de regras compilado: {len(plano.regras)} regras, {len(plano.termos)} termos")
+        return plano
+
+    # Avaliação
+
+    def features(self, texto_normalizado: str) -> DocumentFeatures:
+        """Características do texto (normalizado) para todos os planos compilados"""
+        with self._lock:
+            matcher, quantidades, anos = self._matcher, tuple(self._quantidades), tuple(self._anos)
+            indexar = self._indexar
+        return get_document_features(texto_normalizado, matcher, quantidades, anos, indexar)
+
+    def validate(self, plano: PlanoRegras, texto: str) -> Dict:
+        """
+        Avalia o plano sobre o texto; retorna dict com corretos, faltando,
+        duvidosos, evidencias e os trechos do original que sustentam cada regra
+        """
+        normalizado = normalize_text(texto)
+        return plano.avaliar(self.features(normalizado.texto), normalizado)
@@ -0,0 +1,114 @@
+"""
+Busca de vários termos numa única passada pelo texto
+Os termos são compilados uma vez numa trie, escrita como uma regex (ramos
+por prefixo comum, continuações opcionais gulosas). Em cada posição a regex
+casa o termo mais longo que começa ali; os demais termos que começam na
+mesma posição são prefixos dele e saem de uma tabela pré-calculada. A busca
+recomeça logo depois do início de cada casamento, então termos sobrepostos
+(ex.: "favorável" dentro de "sentença favorável") também são encontrados.
+
+O resultado equivale a `termo in texto` para cada termo, com os offsets de
+todas as ocorrências.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_FIM = ""  # marca de fim de termo na trie (nunca é um caractere do texto)
+
+
+class TermHits:
+    """Ocorrências encontradas: termo -> offsets de início, em ordem"""
+
+    def __init__(self, posicoes: Dict[str, List[int]]):
+        self.posicoes = posicoes
+
+    def __contains__(self, termo: str) -> bool:
+        return termo in self.posicoes
+
+    def any(self, termos: Iterable[str]) -> bool:
+        """Algum dos termos aparece no texto"""
+        return any(termo in self.posicoes for termo in termos)
+
+    def count(self, termos: Iterable[str]) -> int:
+        """Total de ocorrências dos termos"""
+        return sum(len(self.posicoes.get(termo, ())) for termo in termos)
+
+    def offsets(self, termos: Iterable[str]) -> List[int]:
+        """Offsets de início das ocorrências de qualquer um dos termos, em ordem"""
+        return sorted(offset for termo in termos for offset in self.posicoes.get(termo, ()))
+
+    def spans(self, termo: str) -> List[Tuple[int, int]]:
+        """Intervalos (início, fim) de cada ocorrência do termo"""
+        return [(inicio, inicio + len(termo)) for inicio in self.posicoes.get(termo, ())]
+
+    def first(self, termos: Iterable[str]) -> Optional[Tuple[str, int]]:
+        """Primeira ocorrência (termo, offset) entre os termos, ou None"""
+        melhor = None
+        for termo in termos:
+            posicoes = self.posicoes.get(termo)
+            if posicoes and (melhor is None or posicoes[0] < melhor[1]):
+                melhor = (termo, posicoes[0])
+        return melhor
+
+
+def _trie_regex(node: Dict) -> str:
+    ramos = [re.escape(ch) + _trie_regex(filho) for ch, filho in sorted(node.items()) if ch != _FIM]
+    if not ramos:
+        return ""
+    corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+    # Nó que já é fim de termo: a continuação é opcional (gulosa: prefere o termo mais longo)
+    return f"(?:{corpo})?" if _FIM in node else corpo
+
+
+class TermMatcher:
+    """Conjunto de termos compilado para busca em uma passada"""
+
+    def __init__(self, termos: Iterable[str]):
+        self.termos = tuple(sorted({termo for termo in termos if termo}))
+        trie: Dict = {}
+        for termo in self.termos:
+            node = trie
+            for ch in termo:
+                node = node.setdefault(ch, {})
+            node[_FIM] = True
+        # Sem ramo opcional na raiz: a regex nunca casa vazio
+        ramos = [re.escape(ch) + _trie_regex(filho) for ch, filho in sorted(trie.items())]
+        self._regex = re.compile("|".join(ramos)) if ramos else None
+        # termo mais longo casado -> todos os termos que são prefixo dele
+        self._prefixos = {
+            termo: [outro for outro in self.termos if termo.startswith(outro)]
+            for termo in self.termos
+        }
+
+    def scan(self, texto: str) -> TermHits:
+        """Percorre o texto uma vez e retorna todas as ocorrências de todos os termos"""
+        posicoes: Dict[str, List[int]] = {}
+        if self._regex is None:
+            return TermHits(posicoes)
+        search = self._regex.search
+        prefixos = self._prefixos
+        pos = 0
+        while True:
+            m = search(texto, pos)
+            if m is None:
+                break
+            inicio = m.start()
+            for termo in prefixos[m.group()]:
+                lista = posicoes.get(termo)
+                if lista is None:
+                    posicoes[termo] = [inicio]
+                else:
+                    lista.append(inicio)
+            pos = inicio + 1
+        return TermHits(posicoes)
+
+
+@lru_cache(maxsize=64)
+def _cached_matcher(termos: Tuple[str, ...]) -> TermMatcher:
+    return TermMatcher(termos)
+
+
+def get_matcher(termos: Iterable[str]) -> TermMatcher:
+    """Matcher compilado para o conjunto de termos (reaproveitado entre chamadas)"""
+    return _cached_matcher(tuple(sorted({termo for termo in termos if termo})))
@@ -0,0 +1,203 @@
+"""
+Normalização do texto para as regras, com mapa de offsets para o original
+Uma passada por documento: remove acentos ("securitização" -> "securitizacao"),
+aplica casefold, junta palavras hifenizadas na quebra de linha do OCR
+("tribu-\ntário" -> "tributario"), remove hífens invisíveis (soft hyphen) e
+reduz sequências de espaços/quebras a um espaço. Os termos das regras passam
+pela mesma normalização, então uma grafia cobre as variantes com e sem acento.
+
+O mapa de offsets é compacto: só guarda os pontos em que o deslocamento entre
+o texto normalizado e o original muda (espaços repetidos, hifenização,
+caracteres que viram mais de um ou nenhum). Uma ocorrência no texto
+normalizado volta para o trecho exato do original.
+"""
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_right
+from typing import Dict, Optional, Tuple
+
+# Hífens que quebram palavras no fim da linha (inclui o soft hyphen)
+_HIFENS = "-\u00ad\u2010\u2011"
+# Letra + hífen + quebra de linha (com espaços em volta) + letra (começa pelo
+# hífen: a regex descarta rápido as posições que não são hífen)
+_HIFENIZACAO = rf"[{_HIFENS}](?<=[^\W\d_][{_HIFENS}])[^\S\r\n]*(?:\r\n|\r|\n)\s*(?=[^\W\d_])"
+
+
+def _ajustes(invisiveis: str = "", irregulares: str = "") -> str:
+    """
+    Trechos que mudam de tamanho: hifenização, sequências de espaços (com
+    caracteres invisíveis no meio: soft hyphen, marcas combinantes), soft
+    hyphens soltos e, se informados, os caracteres irregulares
+    """
+    padrao = rf"(?P<hifen>{_HIFENIZACAO})|(?P<espacos>[\s\u00ad{invisiveis}]{{2,}}|\u00ad)"
+    if irregulares:
+        padrao += f"|[{irregulares}]"
+    # O lookahead com os caracteres iniciais possíveis deixa a regex pular o resto (~2x mais rápido)
+    return rf"(?=[{_HIFENS}\s{irregulares}])(?:{padrao})"
+
+
+_tabela: Optional[Dict[int, str]] = None
+_ajustes_re = re.compile(_ajustes())
+_irregular_re = None
+_irregular_split_re = None
+_marcas_re = None
+_lock = threading.Lock()
+_ESPACO_RE = re.compile(r"[^\S ]")
+
+
+def _dobrar(ch: str) -> str:
+    """Casefold e remoção de acentos (marcas combinantes) de um caractere"""
+    return "".join(c for c in unicodedata.normalize("NFD", ch.casefold()) if not unicodedata.combining(c))
+
+
+def _preparar():
+    """
+    Monta (uma vez) a tabela de translate dos caracteres que viram exatamente
+    um caractere e a regex dos trechos que mudam de tamanho
+    """
+    global _tabela, _irregular_re, _irregular_split_re, _marcas_re
+    with _lock:
+        if _tabela is not None:
+            return
+        tabela = {}
+        irregulares = []
+        marcas = []
+        for codigo in range(0x10000):
+            if 0xD800 <= codigo <= 0xDFFF:
+                continue
+            ch = chr(codigo)
+            if unicodedata.combining(ch):
+                marcas.append(codigo)
+            dobrado = _dobrar(ch)
+            if len(dobrado) == 1:
+                if dobrado != ch:
+                    tabela[codigo] = dobrado
+            else:
+                irregulares.append(codigo)
+        classe = _classe(irregulares)
+        _irregular_re = re.compile(_ajustes(_classe(marcas), classe))
+        _irregular_split_re = re.compile(f"([{classe}])")
+        _marcas_re = re.compile(f"[{_classe(marcas)}]+")
+        _tabela = tabela
+
+
+def _classe(codigos) -> str:
+    """Faixas contíguas de code points no formato de uma classe de regex"""
+    faixas = []
+    for codigo in codigos:
+        if faixas and faixas[-1][1] == codigo - 1:
+            faixas[-1][1] = codigo
+        else:
+            faixas.append([codigo, codigo])
+    return "".join(
+        f"\\u{inicio:04x}" if inicio == fim else f"\\u{inicio:04x}-\\u{fim:04x}" for inicio, fim in faixas
+    )
+
+
+def _dobrar_alinhado(texto: str) -> Tuple[str, bool]:
+    """
+    Casefold e remoção de acentos caractere a caractere (mesmo tamanho do
+    original); caracteres que mudariam de tamanho ficam como estão
+    Retorna (texto, se há caracteres irregulares)
+    """
+    # Entre os caracteres irregulares, cada caractere vira exatamente um: as
+    # operações sobre a string inteira são bem mais rápidas que o translate
+    pedacos = _irregular_split_re.split(texto)
+    for i in range(0, len(pedacos), 2):
+        pedaco = pedacos[i]
+        dobrado = _marcas_re.sub("", unicodedata.normalize("NFD", pedaco.casefold()))
+        # Fora do BMP (não coberto pela tabela) pode mudar de tamanho: vai pelo translate
+        pedacos[i] = dobrado if len(dobrado) == len(pedaco) else pedaco.translate(_tabela)
+    return "".join(pedacos), len(pedacos) > 1
+
+
+class NormalizedText:
+    """Texto normalizado e o mapa de offsets de volta para o original"""
+
+    def __init__(self, original: str, texto: str, norm: array, orig: array, orig_fim: array):
+        self.original = original
+        self.texto = texto
+        # Segmentos: a partir de norm[k], offsets no original começam em orig[k];
+        # orig_fim[k] >= 0 indica segmento "expandido" (todo ele vem de orig[k]:orig_fim[k])
+        self._norm = norm
+        self._orig = orig
+        self._orig_fim = orig_fim
+
+    def __len__(self) -> int:
+        return len(self.texto)
+
+    def _segmento(self, pos: int) -> int:
+        return bisect_right(self._norm, pos) - 1
+
+    def to_original(self, pos: int) -> int:
+        """Offset no original do caractere `pos` do texto normalizado"""
+        if pos >= len(self.texto):
+            return len(self.original)
+        k = self._segmento(pos)
+        if self._orig_fim[k] >= 0:
+            return self._orig[k]
+        return self._orig[k] + pos - self._norm[k]
+
+    def span_original(self, inicio: int, fim: int) -> Tuple[int, int]:
+        """Intervalo [inicio, fim) do texto normalizado -> intervalo exato no original"""
+        inicio_original = self.to_original(inicio)
+        if fim <= inicio:
+            return inicio_original, inicio_original
+        k = self._segmento(fim - 1)
+        if self._orig_fim[k] >= 0:
+            return inicio_original, self._orig_fim[k]
+        return inicio_original, self._orig[k] + fim - self._norm[k]
+
+    def trecho(self, inicio: int, fim: int, contexto: int = 0) -> str:
+        """Trecho do original correspondente a [inicio, fim), com `contexto` caracteres em volta"""
+        inicio_original, fim_original = self.span_original(inicio, fim)
+        return self.original[max(0, inicio_original - contexto):fim_original + contexto]
+
+
+def normalize_text(texto: str) -> NormalizedText:
+    """Normaliza o texto (acentos, caixa, hifenização, espaços) guardando o mapa de offsets"""
+    _preparar()
+    # Caracteres que viram exatamente um: preserva os offsets
+    base, irregulares = _dobrar_alinhado(texto)
+    partes = []
+    norm, orig, orig_fim = array("q", [0]), array("q", [0]), array("q", [-1])
+    anterior = 0
+    tamanho = 0
+    for m in (_irregular_re if irregulares else _ajustes_re).finditer(base):
+        inicio, fim = m.span()
+        grupo = m.lastgroup
+        if grupo == "hifen":
+            substituto = ""
+        elif grupo == "espacos":
+            substituto = " " if any(ch.isspace() for ch in m.group()) else ""
+        else:
+            substituto = _dobrar(m.group())
+        partes.append(base[anterior:inicio])
+        tamanho += inicio - anterior
+        if substituto:
+            # Um caractere que vira vários: todo o segmento aponta para ele
+            _adicionar(norm, orig, orig_fim, tamanho, inicio, fim if len(substituto) > fim - inicio else -1)
+            partes.append(substituto)
+            tamanho += len(substituto)
+        _adicionar(norm, orig, orig_fim, tamanho, fim, -1)
+        anterior = fim
+    partes.append(base[anterior:])
+    # Quebras e espaços isolados viram " " (mesmo tamanho: não entram no mapa)
+    return NormalizedText(texto, _ESPACO_RE.sub(" ", "".join(partes)), norm, orig, orig_fim)
+
+
+def _adicionar(norm: array, orig: array, orig_fim: array, pos: int, inicio: int, fim: int):
+    if norm[-1] == pos:
+        # Segmento anterior ficou vazio: substitui
+        orig[-1], orig_fim[-1] = inicio, fim
+    else:
+        norm.append(pos)
+        orig.append(inicio)
+        orig_fim.append(fim)
+
+
+def normalize_term(termo: str) -> str:
+    """Termo na mesma forma do texto normalizado"""
+    return normalize_text(termo).texto.strip()
@@ -0,0 +1,296 @@
+"""
+Sessões de upload retomável (em partes numeradas)
+O cliente cria a sessão, envia as partes em ordem (PUT), consulta o quanto
+já foi recebido e finaliza. Cada parte é gravada direto no arquivo de spool
+da sessão, com os limites de tamanho verificados à medida que chega; se a
+conexão cair, basta retomar a partir do offset recebido.
+
+Estado em disco (uploads/sessoes): {id}.part com os bytes e {id}.json com os
+metadados, de modo que as sessões sobrevivem a um reinício do servidor.
+
+Ao finalizar, o arquivo vai para uploads/{id}/ e a sessão fica "finalizando"
+até a extração ser aceita (job na fila) ou concluída; se ela falhar (admissão,
+prazo, cliente desconectou), basta finalizar de novo, sem reenviar as partes.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from ..utils.file_handler import UploadTooLargeError, discard_upload, unique_upload_path
+
+logger = logging.getLogger(__name__)
+
+# Tamanho das partes (todas têm esse tamanho, exceto a última)
+UPLOAD_PARTE_BYTES = int(os.getenv("UPLOAD_PARTE_BYTES", 5 * 1024 * 1024))  # 5MB padrão
+# Sessões sem atividade por mais tempo que isso são descartadas
+UPLOAD_SESSAO_TTL_SEGUNDOS = int(os.getenv("UPLOAD_SESSAO_TTL_SEGUNDOS", 24 * 3600))
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+ESTADO_RECEBENDO = "recebendo"
+ESTADO_FINALIZANDO = "finalizando"
+
+
+class UploadSessionNotFoundError(Exception):
+    """Sessão de upload inexistente ou expirada"""
+
+
+class UploadSessionConflictError(Exception):
+    """Parte fora de ordem, de tamanho errado ou sessão ocupada"""
+
+    def __init__(self, message: str, recebido: int):
+        super().__init__(message)
+        self.recebido = recebido
+
+
+class ChunkWriter:
+    """Grava uma parte no spool da sessão; só avança o offset em commit()"""
+
+    def __init__(self, store: "UploadSessionStore", session: Dict, lock: threading.Lock):
+        self.store = store
+        self.session = session
+        self._lock = lock
+        # threading.Lock não tem dono: liberar duas vezes soltaria o lock de outra requisição
+        self._released = False
+        self._offset = session["recebido"]
+        self._size = 0
+        self._file = open(store._part_path(session["id"]), "r+b")
+        self._file.seek(self._offset)
+
+    def write(self, data: bytes):
+        """Acrescenta bytes à parte, verificando os limites a cada bloco"""
+        self._size += len(data)
+        total = self._offset + self._size
+        if self._size > self.session["tamanho_parte"]:
+            raise UploadSessionConflictError(
+                f"Parte maior que {self.session['tamanho_parte']} bytes", self._offset
+            )
+        if total > self.store.max_size:
+            raise UploadTooLargeError(total, self.store.max_size)
+        tamanho_total = self.session.get("tamanho_total")
+        if tamanho_total is not None and total > tamanho_total:
+            raise UploadSessionConflictError(
+                f"Dados além do tamanho declarado ({tamanho_total} bytes)", self._offset
+            )
+        self._file.write(data)
+
+    def commit(self) -> Dict:
+        """Confirma a parte e retorna o estado atualizado da sessão"""
+        try:
+            session = self.session
+            total = self._offset + self._size
+            tamanho_total = session.get("tamanho_total")
+            # Só a última parte pode ser menor que tamanho_parte
+            if self._size < session["tamanho_parte"]:
+                if tamanho_total is None and self._size > 0:
+                    # Sem tamanho declarado, a parte menor marca o fim do arquivo
+                    session["ultima_parte_recebida"] = True
+                elif tamanho_total is None or total != tamanho_total:
+                    raise UploadSessionConflictError(
+                        f"Parte incompleta: {self._size} de {session['tamanho_parte']} bytes", self._offset
+                    )
+            self._file.truncate(total)
+            self._file.close()
+            session["recebido"] = total
+            session["partes"] = session.get("partes", 0) + 1
+            self.store._save(session)
+            return dict(session)
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self._release()
+
+    def abort(self):
+        """Descarta os bytes desta parte (o offset da sessão não muda)"""
+        try:
+            if not self._file.closed:
+                self._file.truncate(self._offset)
+                self._file.close()
+        finally:
+            self._release()
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self._lock.release()
+
+
+class UploadSessionStore:
+    """Sessões de upload persistidas em disco"""
+
+    def __init__(self, base_dir: Path, max_size: int, tamanho_parte: int = UPLOAD_PARTE_BYTES,
+                 ttl: int = UPLOAD_SESSAO_TTL_SEGUNDOS):
+        self.base_dir = Path(base_dir)
+        self.max_size = max_size
+        self.tamanho_parte = tamanho_parte
+        self.ttl = ttl
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        # Sessões cuja extração está sendo despachada agora (finalize -> finish)
+        self._despachando: Set[str] = set()
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.base_dir / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.base_dir / f"{upload_id}.json"
+
+    def _save(self, session: Dict):
+        session["atualizado_em"] = time.time()
+        meta_path = self._meta_path(session["id"])
+        tmp_path = meta_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(session, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def _session_lock(self, upload_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def create(self, filename: str, tamanho_total: Optional[int] = None) -> Dict:
+        """Cria uma sessão e o arquivo de spool vazio"""
+        if tamanho_total is not None and tamanho_total > self.max_size:
+            raise UploadTooLargeError(tamanho_total, self.max_size)
+        self.prune()
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        session = {
+            "id": uuid.uuid4().hex,
+            "filename": Path(filename).name,
+            "tamanho_total": tamanho_total,
+            "tamanho_parte": self.tamanho_parte,
+            "recebido": 0,
+            "partes": 0,
+            "estado": ESTADO_RECEBENDO,
+            "criado_em": time.time(),
+        }
+        self._part_path(session["id"]).touch()
+        self._save(session)
+        return dict(session)
+
+    def get(self, upload_id: str) -> Dict:
+        """Estado da sessão (levanta UploadSessionNotFoundError)"""
+        if not _ID_RE.match(upload_id or ""):
+            raise UploadSessionNotFoundError(f"Sessão de upload {upload_id} não encontrada")
+        try:
+            with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                session = json.load(f)
+        except FileNotFoundError:
+            raise UploadSessionNotFoundError(f"Sessão de upload {upload_id} não encontrada")
+        if session["atualizado_em"] < time.time() - self.ttl and upload_id not in self._despachando:
+            self.delete(upload_id)
+            raise UploadSessionNotFoundError(f"Sessão de upload {upload_id} expirada")
+        return session
+
+    def open_chunk(self, upload_id: str, numero: int) -> Optional[ChunkWriter]:
+        """
+        Prepara a gravação da parte `numero` (começando em 0)
+        Retorna None se a parte já foi recebida (reenvio após falha de rede)
+        """
+        lock = self._session_lock(upload_id)
+        if not lock.acquire(blocking=False):
+            session = self.get(upload_id)
+            raise UploadSessionConflictError("Outra parte desta sessão está sendo recebida", session["recebido"])
+        try:
+            session = self.get(upload_id)
+            if session.get("estado") == ESTADO_FINALIZANDO:
+                raise UploadSessionConflictError("Sessão já finalizada; finalize de novo para extrair",
+                                                 session["recebido"])
+            esperada = session["partes"]
+            if numero < esperada:
+                lock.release()
+                return None
+            if numero > esperada or session.get("ultima_parte_recebida"):
+                raise UploadSessionConflictError(
+                    f"Parte {numero} fora de ordem; esperada a parte {esperada}", session["recebido"]
+                )
+            return ChunkWriter(self, session, lock)
+        except BaseException:
+            if lock.locked():
+                lock.release()
+            raise
+
+    def finalize(self, upload_id: str) -> Dict:
+        """
+        Confere o tamanho e move o spool para o diretório do upload
+        Retorna a sessão com "file_path"; ela fica "finalizando" até finish().
+        Chamar de novo depois de uma extração que falhou devolve o mesmo arquivo
+        """
+        lock = self._session_lock(upload_id)
+        if not lock.acquire(blocking=False):
+            session = self.get(upload_id)
+            raise UploadSessionConflictError("Há uma parte desta sessão sendo recebida", session["recebido"])
+        try:
+            session = self.get(upload_id)
+            if upload_id in self._despachando:
+                raise UploadSessionConflictError("A finalização desta sessão já está em andamento",
+                                                 session["recebido"])
+            if session.get("estado") == ESTADO_FINALIZANDO:
+                if not Path(session["file_path"]).exists():
+                    raise UploadSessionNotFoundError(f"Arquivo da sessão de upload {upload_id} não encontrado")
+                self._despachando.add(upload_id)
+                return session
+            tamanho_total = session.get("tamanho_total")
+            if tamanho_total is not None and session["recebido"] != tamanho_total:
+                raise UploadSessionConflictError(
+                    f"Upload incompleto: {session['recebido']} de {tamanho_total} bytes", session["recebido"]
+                )
+            if session["recebido"] == 0:
+                raise UploadSessionConflictError("Nenhum dado recebido", 0)
+            # Diretório próprio da sessão: não sobrescreve outro upload com o mesmo nome
+            file_path = unique_upload_path(session["filename"], upload_id)
+            os.replace(self._part_path(upload_id), file_path)
+            session["estado"] = ESTADO_FINALIZANDO
+            session["file_path"] = str(file_path)
+            self._save(session)
+            self._despachando.add(upload_id)
+            return session
+        finally:
+            lock.release()
+
+    def finish(self, upload_id: str, concluido: bool):
+        """
+        Encerra a finalização: com `concluido` (job aceito ou extração feita) a
+        sessão deixa de existir e o arquivo fica com quem o processa; senão a
+        sessão continua "finalizando", pronta para outra tentativa
+        """
+        self._despachando.discard(upload_id)
+        if concluido:
+            self._meta_path(upload_id).unlink(missing_ok=True)
+            with self._locks_lock:
+                self._locks.pop(upload_id, None)
+
+    def delete(self, upload_id: str):
+        """Descarta a sessão e os bytes recebidos (também o arquivo já finalizado)"""
+        if upload_id in self._despachando:
+            raise UploadSessionConflictError("A finalização desta sessão está em andamento", 0)
+        try:
+            with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                file_path = json.load(f).get("file_path")
+        except (OSError, ValueError):
+            file_path = None
+        if file_path:
+            discard_upload(file_path)
+        self._part_path(upload_id).unlink(missing_ok=True)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+        with self._locks_lock:
+            self._locks.pop(upload_id, None)
+
+    def prune(self):
+        """Remove sessões abandonadas há mais de `ttl` segundos"""
+        if not self.base_dir.exists():
+            return
+        limite = time.time() - self.ttl
+        for meta_path in self.base_dir.glob("*.json"):
+            try:
+                if meta_path.stat().st_mtime < limite:
+                    logger.info(f"Descartando sessão de upload expirada {meta_path.stem}")
+                    self.delete(meta_path.stem)
+            except (FileNotFoundError, UploadSessionConflictError):
+                continue
@@ -1,10 +1,11 @@
 """
 Serviço principal de validação que combina regras e IA
 """
-from typing import Dict
+from typing import Dict, Optional
 import logging
 from .rule_validator import RuleValidator
 from .ai_validator import AIValidator
+from ..utils.cancellation import CancelToken, OperationCancelledError, check_cancel
 
 logger = logging.getLogger(__name__)
 
@@ -24,23 +25,34 @@ class ValidationService:
         Retorna resultado final consolidado
         """
         # Validação com regras programadas
-        resultado_regras = self.rule_validator.validate(texto_documento)
+        resultado_regras = self.validate_rules(texto_documento)
         
         # Validação com IA (se habilitada)
-        resultado_ai = {}
-        if self.use_ai and self.ai_validator:
-            try:
-                resultado_ai = self.ai_validator.validate(texto_documento, self.modelo)
-            except Exception as e:
-                logger.error(f"Erro na validação IA: {e}")
-                resultado_ai = {}
+        resultado_ai = self.validate_ai(texto_documento)
         
         # Consolida resultados
-        resultado_final = self._consolidate_results(resultado_regras, resultado_ai)
+        resultado_final = self.consolidate_results(resultado_regras, resultado_ai)
         
         return resultado_final
     
-    def _consolidate_results(self, regras: Dict, ai: Dict) -> Dict:
+    def validate_rules(self, texto_documento: str, cancel: Optional[CancelToken] = None) -> Dict:
+        """Validação com regras programadas"""
+        check_cancel(cancel)
+        return self.rule_validator.validate(texto_documento)
+    
+    def validate_ai(self, texto_documento: str, cancel: Optional[CancelToken] = None) -> Dict:
+        """Validação com IA ({} se desabilitada ou se a chamada falhar; cancelamento é repassado)"""
+        if not (self.use_ai and self.ai_validator):
+            return {}
+        try:
+            return self.ai_validator.validate(texto_documento, self.modelo, cancel)
+        except OperationCancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro na validação IA: {e}")
+            return {}
+    
+    def consolidate_results(self, regras: Dict, ai: Dict) -> Dict:
         """
         Consolida resultados de regras programadas e IA
         Prioriza regras programadas, mas incorpora insights da IA
@@ -50,6 +62,7 @@ class ValidationService:
             "faltando": [],
             "duvidosos": [],
             "evidencias": {},
+            "trechos": {},
             "status_geral": "REPROVADO"
         }
         
@@ -58,6 +71,8 @@ class ValidationService:
         resultado["faltando"].extend(regras.get("faltando", []))
         resultado["duvidosos"].extend(regras.get("duvidosos", []))
         resultado["evidencias"].update(regras.get("evidencias", {}))
+        # Trechos do documento original que sustentam cada regra
+        resultado["trechos"].update(regras.get("trechos", {}))
         
         # Incorpora insights da IA (se disponível)
         if ai:
@@ -84,13 +99,8 @@ class ValidationService:
             elif ai_status == "APROVADO" and len(resultado["faltando"]) == 0:
                 resultado["status_geral"] = "APROVADO"
         
-        # Determina status geral final baseado nos requisitos obrigatórios
-        requisitos_obrigatorios = [
-            "experiencia_geral",
-            "lote_1_i", "lote_1_ii", "lote_1_iii", "lote_1_iv",
-            "lote_2_i", "lote_2_ii", "lote_2_iii", "lote_2_iv",
-            "comprovacoes"
-        ]
+        # Determina status geral final baseado nos requisitos obrigatórios (do plano de regras do modelo)
+        requisitos_obrigatorios = self.rule_validator.plano.obrigatorios
         
         faltando_obrigatorios = [req for req in requisitos_obrigatorios if req in resultado["faltando"]]
         corretos_obrigatorios = [req for req in requisitos_obrigatorios if req in resultado["corretos"]]
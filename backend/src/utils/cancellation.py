@@ -0,0 +1,124 @@
+"""
+Cancelamento e prazos de ponta a ponta
+Um CancelToken acompanha o trabalho de uma requisição (ou job) até as
+threads e processos que fazem a extração e a chamada à IA: o loop de páginas,
+o envio de páginas aos workers de OCR e a chamada à API verificam o token e
+abandonam o restante quando o cliente desconecta, o prazo esgota ou o job é
+cancelado.
+"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from .metrics import record_cancellation
+
+MOTIVO_DESCONECTOU = "cliente_desconectou"
+MOTIVO_PRAZO = "prazo_esgotado"
+MOTIVO_CANCELADO = "cancelado"
+
+
+class OperationCancelledError(Exception):
+    """O trabalho foi cancelado (cliente desconectou, prazo esgotado ou job cancelado)"""
+
+    def __init__(self, motivo: str):
+        super().__init__(f"Operação cancelada: {motivo}")
+        self.motivo = motivo
+
+
+class CancelToken:
+    """Sinal de cancelamento compartilhado entre o event loop e as threads"""
+
+    def __init__(self, prazo_s: Optional[float] = None):
+        self._event = threading.Event()
+        self.motivo: Optional[str] = None
+        self.deadline: Optional[float] = None
+        self.set_deadline(prazo_s)
+
+    def set_deadline(self, prazo_s: Optional[float]):
+        """Define o prazo a partir de agora (None ou 0: sem prazo)"""
+        self.deadline = time.monotonic() + prazo_s if prazo_s else None
+
+    def cancel(self, motivo: str = MOTIVO_CANCELADO):
+        if not self._event.is_set():
+            self.motivo = motivo
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(MOTIVO_PRAZO)
+            return True
+        return False
+
+    def remaining(self) -> Optional[float]:
+        """Segundos até o prazo (None se não houver prazo)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Levanta OperationCancelledError se o trabalho deve parar"""
+        if self.cancelled:
+            raise OperationCancelledError(self.motivo)
+
+
+def check_cancel(cancel: Optional[CancelToken]):
+    """Atalho para verificar um token opcional"""
+    if cancel is not None:
+        cancel.check()
+
+
+@asynccontextmanager
+async def cancel_scope(token: CancelToken, request=None, intervalo: float = 0.5):
+    """
+    Vigia o token (e, com `request`, a conexão do cliente) enquanto o bloco
+    roda. Ao desconectar, esgotar o prazo ou cancelar, marca o token (o que
+    para as threads de extração/IA) e interrompe a tarefa atual, inclusive se
+    ela estiver esperando vaga numa raia. O bloco termina com
+    OperationCancelledError.
+
+    Só use `request` depois que o corpo foi lido (uploads multipart e corpos
+    JSON já chegam lidos ao endpoint)
+    """
+    task = asyncio.current_task()
+    interrompida = False
+
+    async def watch():
+        nonlocal interrompida
+        while True:
+            if not token.cancelled and request is not None and await request.is_disconnected():
+                token.cancel(MOTIVO_DESCONECTOU)
+            if token.cancelled:
+                interrompida = True
+                task.cancel()
+                return
+            await asyncio.sleep(intervalo)
+
+    watcher = asyncio.create_task(watch())
+    try:
+        yield token
+    except asyncio.CancelledError:
+        if not interrompida:
+            raise
+        if hasattr(task, "uncancel"):
+            task.uncancel()
+        raise OperationCancelledError(token.motivo)
+    finally:
+        watcher.cancel()
+
+
+def to_http_exception(e: OperationCancelledError, etapa: str):
+    """
+    Registra o cancelamento nas métricas e converte em HTTPException:
+    504 para prazo esgotado, 499 (cliente fechou a conexão) nos demais casos
+    """
+    from fastapi import HTTPException  # type: ignore
+
+    record_cancellation(etapa, e.motivo)
+    if e.motivo == MOTIVO_PRAZO:
+        return HTTPException(status_code=504, detail="Prazo de processamento esgotado")
+    return HTTPException(status_code=499, detail="Processamento cancelado")
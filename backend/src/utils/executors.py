@@ -0,0 +1,225 @@
+"""
+Agendador de trabalho bloqueante em raias (lanes)
+Cada tipo de trabalho tem a sua raia, com limite próprio de concorrência e
+pool de threads próprio, fora do event loop do uvicorn:
+- texto: extração de DOCX e de PDFs com camada de texto
+- ocr: extração de PDFs com páginas escaneadas
+- regras: validação programada (RuleValidator)
+- ia: chamadas à API de IA
+- relatorio: geração do PDF de relatório
+- arquivos: leitura/escrita de arquivos
+
+Assim uma validação de DOCX não espera atrás dos PDFs escaneados: a raia de
+OCR pode ficar saturada sem ocupar as demais. Dentro de cada raia a espera é
+justa entre clientes (round-robin por cliente): um cliente que envia 50
+dossiês não bloqueia quem envia um.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Concorrência máxima de cada raia
+LANE_CONCORRENCIA = {
+    "texto": int(os.getenv("LANE_TEXTO_CONCORRENCIA", 4)),
+    # Documentos escaneados em extração simultânea (o OCR em si roda no pool de processos do motor)
+    "ocr": int(os.getenv("LANE_OCR_CONCORRENCIA", 2)),
+    "regras": int(os.getenv("LANE_REGRAS_CONCORRENCIA", 4)),
+    "ia": int(os.getenv("LANE_IA_CONCORRENCIA", 8)),
+    "relatorio": int(os.getenv("LANE_RELATORIO_CONCORRENCIA", 2)),
+    "arquivos": int(os.getenv("LANE_ARQUIVOS_CONCORRENCIA", 4)),
+}
+
+# Cliente da requisição atual (definido pelo middleware em main.py)
+cliente_atual: contextvars.ContextVar = contextvars.ContextVar("cliente_atual", default="anonimo")
+
+
+class Lane:
+    """Raia com limite de concorrência e fila justa por cliente"""
+
+    def __init__(self, nome: str, concorrencia: int):
+        self.nome = nome
+        self.concorrencia = max(1, concorrencia)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._ativos = 0
+        # cliente -> fila de espera; a ordem do dict é a vez de cada cliente
+        self._filas: "OrderedDict[str, deque]" = OrderedDict()
+        self._stats = {"executados": 0, "esperas": 0, "espera_total_s": 0.0, "espera_max_s": 0.0}
+
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concorrencia, thread_name_prefix=self.nome)
+        return self._executor
+
+    async def acquire(self, cliente: str):
+        """Ocupa uma vaga da raia, esperando a vez do cliente se estiver cheia"""
+        if self._ativos < self.concorrencia and not self._filas:
+            self._ativos += 1
+            self._stats["executados"] += 1
+            return
+        inicio = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._filas.setdefault(cliente, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # A vaga chegou junto com o cancelamento: repassa adiante
+                self.release()
+            else:
+                self._discard(cliente, waiter)
+            raise
+        espera = time.perf_counter() - inicio
+        self._stats["executados"] += 1
+        self._stats["esperas"] += 1
+        self._stats["espera_total_s"] += espera
+        self._stats["espera_max_s"] = max(self._stats["espera_max_s"], espera)
+
+    def release(self):
+        """Libera a vaga, entregando-a ao próximo cliente da vez"""
+        while self._filas:
+            cliente, fila = next(iter(self._filas.items()))
+            waiter = fila.popleft()
+            if fila:
+                self._filas.move_to_end(cliente)
+            else:
+                del self._filas[cliente]
+            if not waiter.done():
+                # A vaga passa direto para quem esperava (_ativos não muda)
+                waiter.set_result(None)
+                return
+        self._ativos -= 1
+
+    def _discard(self, cliente: str, waiter):
+        fila = self._filas.get(cliente)
+        if fila is None:
+            return
+        try:
+            fila.remove(waiter)
+        except ValueError:
+            pass
+        if not fila:
+            del self._filas[cliente]
+
+    async def submit(self, func: Callable) -> asyncio.Future:
+        """
+        Ocupa uma vaga (na vez do cliente atual) e executa func() no pool da raia
+        A vaga só é liberada quando a thread termina: se quem espera for
+        cancelado, o trabalho em andamento continua contando em "ativos" e
+        ninguém passa na frente da fila justa pelo pool de threads
+        """
+        await self.acquire(cliente_atual.get())
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self.executor(), func)
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: asyncio.Future):
+        self.release()
+        # Resultado de quem já foi cancelado: marca a exceção como recuperada
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats["espera_total_s"] = round(stats["espera_total_s"], 3)
+        stats["espera_max_s"] = round(stats["espera_max_s"], 3)
+        stats.update({
+            "concorrencia": self.concorrencia,
+            "ativos": self._ativos,
+            "aguardando": sum(len(fila) for fila in self._filas.values()),
+            "clientes_aguardando": len(self._filas),
+        })
+        return stats
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_lanes: Dict[str, Lane] = {}
+_lock = threading.Lock()
+
+
+def get_lane(nome: str) -> Lane:
+    """Retorna (criando sob demanda) a raia com o nome dado"""
+    if nome not in LANE_CONCORRENCIA:
+        raise ValueError(f"Raia desconhecida: {nome}. Use: {', '.join(LANE_CONCORRENCIA)}")
+    with _lock:
+        lane = _lanes.get(nome)
+        if lane is None:
+            lane = Lane(nome, LANE_CONCORRENCIA[nome])
+            _lanes[nome] = lane
+        return lane
+
+
+async def run_in(nome: str, func: Callable, *args, **kwargs):
+    """Executa func(*args, **kwargs) na raia `nome` sem bloquear o event loop"""
+    future = await get_lane(nome).submit(functools.partial(func, *args, **kwargs))
+    # shield: cancelar quem espera não cancela o future (que libera a vaga ao terminar)
+    return await asyncio.shield(future)
+
+
+_FIM = object()
+
+
+async def iterate_in(nome: str, func: Callable[..., Iterator], *args, **kwargs) -> AsyncIterator:
+    """
+    Consome o gerador func(*args, **kwargs) na raia `nome`, entregando cada
+    item ao event loop assim que é gerado. A vaga da raia fica ocupada até a
+    thread do gerador terminar. Se quem consome parar (ex.: cliente
+    desconectou), o gerador é interrompido antes do próximo item
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in func(*args, **kwargs):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (_FIM, e))
+            return
+        loop.call_soon_threadsafe(queue.put_nowait, (_FIM, None))
+
+    await get_lane(nome).submit(produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _FIM:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        # Não espera o produtor: ele para sozinho no próximo item (e então libera a vaga)
+        stop.set()
+
+
+def lanes_stats() -> Dict:
+    """Ocupação e espera de cada raia"""
+    return {nome: get_lane(nome).stats() for nome in LANE_CONCORRENCIA}
+
+
+def shutdown_executors():
+    """Encerra os pools de todas as raias (chamado no shutdown da aplicação)"""
+    with _lock:
+        lanes = list(_lanes.values())
+        _lanes.clear()
+    for lane in lanes:
+        lane.shutdown()
@@ -2,9 +2,36 @@
 Utilitários para manipulação de arquivos
 """
 import os
+import re
 import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Tuple
+from .executors import run_in
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos lidos do upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+# Uploads esquecidos em disco (job descartado na fila, queda do servidor) são removidos depois disso
+UPLOADS_TTL_SEGUNDOS = int(os.getenv("UPLOADS_TTL_SEGUNDOS", 24 * 3600))
+
+# Diretório próprio de cada upload: uploads/<id hex>/
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadTooLargeError(Exception):
+    """Upload ultrapassou o tamanho máximo permitido"""
+
+    def __init__(self, size: int, max_size: int):
+        super().__init__(f"Arquivo com {size} bytes excede o limite de {max_size} bytes")
+        self.size = size
+        self.max_size = max_size
 
 
 def ensure_upload_dir() -> Path:
@@ -14,6 +41,45 @@ def ensure_upload_dir() -> Path:
     return upload_dir
 
 
+def unique_upload_path(filename: str, upload_id: str = None) -> Path:
+    """
+    Caminho exclusivo do upload: uploads/<id>/<nome do arquivo>
+    Uploads simultâneos com o mesmo nome não se sobrescrevem (o texto extraído
+    fica em cache pelo hash dos bytes de cada upload); o nome enviado pelo
+    cliente só entra no fim do caminho, sem diretórios
+    """
+    prune_uploads()
+    upload_dir = ensure_upload_dir() / (upload_id or uuid.uuid4().hex)
+    upload_dir.mkdir(exist_ok=True)
+    nome = Path(filename).name
+    if nome in ("", ".", ".."):
+        nome = "upload"
+    return upload_dir / nome
+
+
+def discard_upload(file_path) -> None:
+    """Remove o arquivo do upload e o seu diretório (uploads/<id>/), se existirem"""
+    path = Path(file_path)
+    try:
+        path.unlink(missing_ok=True)
+        if _UPLOAD_ID_RE.match(path.parent.name):
+            path.parent.rmdir()
+    except OSError as e:
+        logger.warning(f"Não foi possível remover o upload {path}: {e}")
+
+
+def prune_uploads(ttl: int = UPLOADS_TTL_SEGUNDOS) -> None:
+    """Remove diretórios de upload sem alteração há mais de `ttl` segundos"""
+    limite = time.time() - ttl
+    for upload_dir in ensure_upload_dir().iterdir():
+        try:
+            if _UPLOAD_ID_RE.match(upload_dir.name) and upload_dir.stat().st_mtime < limite:
+                logger.info(f"Descartando upload esquecido {upload_dir.name}")
+                shutil.rmtree(upload_dir, ignore_errors=True)
+        except FileNotFoundError:
+            continue
+
+
 def save_modelo_json(data: dict, filename: str = "modelo.json") -> str:
     """Salva o modelo oficial em JSON"""
     modelo_path = Path(filename)
@@ -32,13 +98,36 @@ def load_modelo_json(filename: str = "modelo.json") -> dict:
         return json.load(f)
 
 
-def save_uploaded_file(file_content: bytes, filename: str) -> Path:
-    """Salva arquivo enviado no diretório de uploads"""
-    upload_dir = ensure_upload_dir()
-    file_path = upload_dir / filename
-    with open(file_path, "wb") as f:
-        f.write(file_content)
-    return file_path
+async def spool_upload(file, filename: str, max_size: int) -> Tuple[Path, int, str]:
+    """
+    Grava o upload em disco bloco a bloco, verificando o tamanho e calculando
+    o SHA-256 na mesma passada (o arquivo nunca fica inteiro em memória)
+    Retorna (caminho, tamanho, sha256). Levanta UploadTooLargeError se exceder max_size
+    """
+    file_path = await run_in("arquivos", unique_upload_path, filename)
+    sha = hashlib.sha256()
+    total_size = 0
+    fd, tmp_name = await run_in("arquivos", tempfile.mkstemp, dir=file_path.parent, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total_size += len(chunk)
+                if total_size > max_size:
+                    raise UploadTooLargeError(total_size, max_size)
+                sha.update(chunk)
+                await run_in("arquivos", f.write, chunk)
+        await run_in("arquivos", os.replace, tmp_name, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+            file_path.parent.rmdir()
+        except OSError:
+            pass
+        raise
+    return file_path, total_size, sha.hexdigest()
 
 
 def list_modelos() -> list:
@@ -0,0 +1,31 @@
+"""
+Contadores de operação do processo
+Nomes hierárquicos separados por ponto, ex.: "cancelamentos.extracao.prazo_esgotado"
+"""
+import threading
+from typing import Dict
+
+
+class Metrics:
+    """Contadores seguros entre threads"""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, nome: str, valor: float = 1):
+        with self._lock:
+            self._counters[nome] = self._counters.get(nome, 0) + valor
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+
+metrics = Metrics()
+
+
+def record_cancellation(etapa: str, motivo: str):
+    """Conta um trabalho cancelado (por etapa e por motivo)"""
+    metrics.incr("cancelamentos.total")
+    metrics.incr(f"cancelamentos.{etapa}.{motivo}")
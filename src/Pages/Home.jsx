@@ -22,7 +22,7 @@ export default function Home() {
 
       // Validação com o backend usando o modelo padrão interno
       const analysis = await apiClient.documents.validate({
-        texto_extraido: uploadResult.texto_extraido,
+        document_id: uploadResult.document_id,
         modelo_id: "default",
       });
 
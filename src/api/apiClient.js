@@ -95,7 +95,8 @@ const apiClient = {
         const formData = new FormData();
         formData.append('file', file);
         
-        const response = await fetch(`${API_BASE_URL}/uploadDocumento`, {
+        // O texto fica no servidor; a validação usa o document_id
+        const response = await fetch(`${API_BASE_URL}/uploadDocumento?incluir_texto=false`, {
           method: 'POST',
           body: formData,
         });
@@ -108,7 +109,8 @@ const apiClient = {
         
         return {
           file_url: result.filename,
-          texto_extraido: result.texto_extraido,
+          document_id: result.document_id,
+          caracteres: result.caracteres,
           filename: result.filename,
         };
       } catch (error) {
@@ -120,7 +122,7 @@ const apiClient = {
         throw error;
       }
     },
-    validate: async ({ texto_extraido, modelo_id }) => {
+    validate: async ({ document_id, texto_extraido, modelo_id }) => {
       try {
         const response = await fetch(`${API_BASE_URL}/validar`, {
           method: 'POST',
@@ -128,7 +130,7 @@ const apiClient = {
             'Content-Type': 'application/json',
           },
           body: JSON.stringify({
-            texto_documento: texto_extraido || '',
+            ...(document_id ? { document_id } : { texto_documento: texto_extraido || '' }),
             modelo_id: modelo_id || 'default',
             use_ai: true,
           }),
@@ -160,6 +162,22 @@ const apiClient = {
         throw error;
       }
     },
+    // Trecho do texto extraído guardado no servidor (para exibição paginada)
+    text: async (documentId, inicio = 0, limite) => {
+      const params = new URLSearchParams({ inicio: String(inicio) });
+      if (limite) {
+        params.set('limite', String(limite));
+      }
+      const response = await fetch(`${API_BASE_URL}/documentos/${documentId}/texto?${params}`, {
+        method: 'GET',
+      });
+      
+      if (!response.ok) {
+        throw new Error(`Erro ao ler documento: ${response.statusText}`);
+      }
+      
+      return response.json();
+    },
   },
   validationResults: {
     list: async (orderBy = "-created_date") => {